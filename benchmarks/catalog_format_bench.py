@@ -0,0 +1,117 @@
+"""
+Compare the full and the normalized processed catalog (pipelines/catalog_format.py).
+
+A processed catalog, either ``--input`` or a synthetic one per ``--sizes``
+(see synthetic_catalog.py; synthetic courses carry only fields the app reads,
+so they have no extras), is written in both forms. The table reports bytes on
+disk and gzipped, the time to parse each file and, for the normalized one, the
+time to re-hydrate it into the usual course dicts. The round trip is checked
+against the original courses. Results can be written as JSON so runs can be
+compared between commits.
+
+    python benchmarks/catalog_format_bench.py --sizes 10000 60000 --output pipelines/data/bench_catalog_format.json
+    python benchmarks/catalog_format_bench.py --input pipelines/data/all_courses_data.json
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_catalog import generate_catalog
+
+PIPELINES_DIR = Path(__file__).resolve().parent.parent / "pipelines"
+
+
+def timed(fn, runs):
+    """Median seconds of ``runs`` calls of ``fn`` and its last result."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def compare(label, courses, runs):
+    from catalog_format import extras_path, hydrate, load_extras, write_normalized
+    from course_stream import write_course_files
+
+    with tempfile.TemporaryDirectory(prefix="catalog_format_") as tmp:
+        full_path = Path(tmp) / "catalog.json"
+        normalized_path = Path(tmp) / "catalog.normalized.json"
+        write_course_files(courses, full_path, jsonl=False)
+        write_normalized(courses, normalized_path)
+
+        full_raw = full_path.read_bytes()
+        normalized_raw = normalized_path.read_bytes()
+        extras_raw = extras_path(normalized_path).read_bytes()
+        full_parse, full_document = timed(lambda: json.loads(full_raw), runs)
+        normalized_parse, _ = timed(lambda: json.loads(normalized_raw), runs)
+        hydrate_seconds, hydrated = timed(lambda: hydrate(json.loads(normalized_raw), load_extras(normalized_path)), runs)
+
+    return {
+        "catalog": label,
+        "courses": len(courses),
+        "full_bytes": len(full_raw),
+        "full_gzip_bytes": len(gzip.compress(full_raw, mtime=0)),
+        "normalized_bytes": len(normalized_raw),
+        "normalized_gzip_bytes": len(gzip.compress(normalized_raw, mtime=0)),
+        "extras_bytes": len(extras_raw),
+        "full_parse_ms": full_parse * 1000,
+        "normalized_parse_ms": normalized_parse * 1000,
+        "normalized_load_ms": hydrate_seconds * 1000,
+        "round_trip": hydrated == full_document["courses"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the full and the normalized processed catalog")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 60000],
+        help="Synthetic catalog sizes (default: 10000 60000)",
+    )
+    parser.add_argument("--input", type=Path, help="Compare this processed catalog instead of synthetic ones")
+    parser.add_argument("--runs", type=int, default=3, help="Parse timings per file, median reported (default: 3)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for synthetic catalogs (default: 42)")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(PIPELINES_DIR))
+    from catalog_format import load_catalog
+
+    results = []
+    if args.input:
+        print(f"📦 Comparing formats for {args.input}...")
+        results.append(compare(str(args.input), load_catalog(args.input), args.runs))
+    else:
+        for size in args.sizes:
+            print(f"📦 Comparing formats for a synthetic catalog of {size} courses...")
+            results.append(compare(f"synthetic-{size}", generate_catalog(size, args.seed), args.runs))
+
+    print(
+        f"{'courses':>8} {'full MB':>8} {'norm MB':>8} {'extras MB':>9} {'full gz':>8} {'norm gz':>8} "
+        f"{'parse ms':>9} {'norm ms':>8} {'load ms':>8} {'round trip':>10}"
+    )
+    for result in results:
+        print(
+            f"{result['courses']:8d} {result['full_bytes'] / 1e6:8.2f} {result['normalized_bytes'] / 1e6:8.2f} "
+            f"{result['extras_bytes'] / 1e6:9.2f} {result['full_gzip_bytes'] / 1e6:8.2f} "
+            f"{result['normalized_gzip_bytes'] / 1e6:8.2f} {result['full_parse_ms']:9.1f} "
+            f"{result['normalized_parse_ms']:8.1f} {result['normalized_load_ms']:8.1f} "
+            f"{'ok' if result['round_trip'] else 'MISMATCH':>10}"
+        )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps({"seed": args.seed, "runs": args.runs, "results": results}, indent=2))
+        print(f"Saved results to {args.output}")
+    return 0 if all(result["round_trip"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
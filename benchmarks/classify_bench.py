@@ -0,0 +1,242 @@
+"""
+Benchmark AI course classification (pipelines/fetch_courses_data.py) against a local stub API.
+
+A stub of the OpenAI chat completions endpoint runs in-process. Each request
+takes a fixed latency plus a little per course it asks about. It answers
+single and batched requests with a discipline derived from the course name,
+and can be told to throttle (429) or answer with a discipline outside the
+allowed list a share of the time. Synthetic courses (see
+synthetic_catalog.py) are classified through
+DisciplineClassifier.classify_stream once per ``--concurrency`` and
+``--batch-size`` combination, with no persistent cache. The table reports:
+
+* total time and courses per second
+* speedup over the first run
+* requests, retries and prompt tokens sent
+* whether every run assigned the same disciplines
+
+Results can be written as JSON so runs can be compared between commits.
+
+    python benchmarks/classify_bench.py --count 400 --concurrency 1 4 16 --latency 0.05 --output pipelines/data/bench_classify.json
+    python benchmarks/classify_bench.py --count 400 --concurrency 4 --batch-size 1 10 25
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from synthetic_catalog import generate_catalog
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PIPELINES_DIR = REPO_ROOT / "pipelines"
+
+
+# Stub API
+
+
+def stub_handler(disciplines, latency, item_latency, throttle_rate, invalid_rate, seed):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def answer(question, roll):
+        if roll < invalid_rate:
+            return "Astrologia"
+        return disciplines[int(hashlib.sha256(question.encode()).hexdigest(), 16) % len(disciplines)]
+
+    class Handler(BaseHTTPRequestHandler):
+        # Prompt tokens received, at about four characters per token.
+        prompt_tokens = 0
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            message = request["messages"][-1]["content"]
+            batched = request["response_format"]["json_schema"]["name"] == "CourseDisciplines"
+            # Batched lines read "<index>: Course Name: ..., Course Materia: ...".
+            questions = [line.split(": ", 1) for line in message.splitlines()] if batched else [("0", message)]
+            with lock:
+                Handler.prompt_tokens += sum(len(m["content"]) for m in request["messages"]) // 4
+                throttle = rng.random() < throttle_rate
+                rolls = [rng.random() for _ in questions]
+            time.sleep(latency + item_latency * len(questions))
+            if throttle:
+                self.reply(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, {"Retry-After": "0"})
+                return
+            if batched:
+                content = {"items": [
+                    {"index": int(index), "name": answer(question, roll)}
+                    for (index, question), roll in zip(questions, rolls)
+                ]}
+            else:
+                content = {"name": answer(message, rolls[0])}
+            self.reply(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(content), "refusal": None},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": {"prompt_tokens": 200, "completion_tokens": 8, "total_tokens": 208},
+            })
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for every connection the classifier opens at once.
+    request_queue_size = 128
+
+
+def start_stub(handler):
+    server = StubServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Measurement
+
+
+def measure(courses, concurrency, batch_size, handler, args):
+    from fetch_courses_data import DisciplineClassifier
+    from gpt_classify_courses import DisciplineAPI
+
+    api = DisciplineAPI(args.requests_per_minute, args.tokens_per_minute, max_retries=args.max_retries, backoff_factor=0.05)
+    classifier = DisciplineClassifier(True, api=api, concurrency=concurrency, batch_size=batch_size)
+    items = (({**course}, False) for course in courses)
+    handler.prompt_tokens = 0
+    start = time.perf_counter()
+    disciplines = [course["discipline"]["name"] for course, _ in classifier.classify_stream(items)]
+    seconds = time.perf_counter() - start
+    return seconds, disciplines, {
+        **api.stats,
+        "prompt_tokens": handler.prompt_tokens,
+        "batch_fallbacks": classifier.batch_fallbacks,
+        "fallbacks": classifier.failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AI course classification against a local stub API")
+    parser.add_argument("--count", type=int, default=400, help="Synthetic courses to classify (default: 400)")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 4, 16],
+        help="Classification requests in flight to measure (default: 1 4 16)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, nargs="+", default=[1],
+        help="Courses per request to measure (default: 1)",
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub seconds per request (default: 0.05)")
+    parser.add_argument(
+        "--item-latency", type=float, default=0.002,
+        help="Extra stub seconds per course in a request (default: 0.002)",
+    )
+    parser.add_argument("--throttle-rate", type=float, default=0.02, help="Share of 429 answers (default: 0.02)")
+    parser.add_argument("--invalid-rate", type=float, default=0.02, help="Share of invalid disciplines (default: 0.02)")
+    parser.add_argument(
+        "--requests-per-minute", type=float, default=60000,
+        help="Client request limit (default: 60000, effectively none)",
+    )
+    parser.add_argument(
+        "--tokens-per-minute", type=float, default=100_000_000,
+        help="Client token limit (default: 100000000, effectively none)",
+    )
+    parser.add_argument("--max-retries", type=int, default=4, help="Retries per course (default: 4)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for courses and the stub (default: 42)")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    output = args.output.resolve() if args.output else None
+    # fetch_courses_data logs to pipelines/logs relative to the repository root.
+    os.chdir(REPO_ROOT)
+    (PIPELINES_DIR / "logs").mkdir(exist_ok=True)
+    sys.path.insert(0, str(PIPELINES_DIR))
+    logging.basicConfig(level=logging.ERROR)
+    from gpt_classify_courses import DISCIPLINES, get_client
+
+    handler = stub_handler(DISCIPLINES, args.latency, args.item_latency, args.throttle_rate, args.invalid_rate, args.seed)
+    server = start_stub(handler)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub"
+    get_client.cache_clear()
+    print(f"🤖 Stub API on {os.environ['OPENAI_BASE_URL']} ({args.latency * 1000:.0f} ms per request)")
+
+    courses = generate_catalog(args.count, args.seed)
+    unique = len({(course["nomeCorso"], course["classe"]["descrizione"]) for course in courses})
+    results = []
+    baseline = None
+    for batch_size in args.batch_size:
+        for concurrency in sorted(args.concurrency):
+            print(
+                f"🧠 Classifying {args.count} courses ({unique} distinct) with {concurrency} in flight, "
+                f"{batch_size} per request..."
+            )
+            seconds, disciplines, stats = measure(courses, concurrency, batch_size, handler, args)
+            baseline = baseline or (seconds, disciplines)
+            results.append({
+                "concurrency": concurrency,
+                "batch_size": batch_size,
+                "seconds": round(seconds, 3),
+                "courses_per_second": round(args.count / seconds, 1),
+                "speedup": round(baseline[0] / seconds, 2),
+                "same_disciplines": disciplines == baseline[1],
+                **stats,
+            })
+    server.shutdown()
+
+    print(
+        f"{'in flight':>9} {'batch':>5} {'seconds':>8} {'courses/s':>10} {'speedup':>8} {'requests':>9} "
+        f"{'retries':>8} {'429s':>5} {'prompt tok':>11} {'unbatched':>9} {'fallback':>9} {'output':>8}"
+    )
+    for result in results:
+        print(
+            f"{result['concurrency']:9d} {result['batch_size']:5d} {result['seconds']:8.2f} "
+            f"{result['courses_per_second']:10.1f} {result['speedup']:7.2f}x {result['requests']:9d} "
+            f"{result['retries']:8d} {result['throttled']:5d} {result['prompt_tokens']:11d} "
+            f"{result['batch_fallbacks']:9d} {result['fallbacks']:9d} "
+            f"{'same' if result['same_disciplines'] else 'DIFFERS':>8}"
+        )
+
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "count": args.count,
+            "distinct": unique,
+            "latency": args.latency,
+            "item_latency": args.item_latency,
+            "throttle_rate": args.throttle_rate,
+            "invalid_rate": args.invalid_rate,
+            "seed": args.seed,
+            "results": results,
+        }, indent=2))
+        print(f"Saved results to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Measure the cold-start cost of each Cloud Function in functions/main.py.
+
+Every function is measured in a fresh interpreter: the time to import main,
+then the latency of its first invocation. Results are printed as a table and
+optionally written as JSON so runs can be compared between commits.
+
+    python benchmarks/cold_start.py --runs 5 --output pipelines/data/cold_start.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "functions"
+
+HTTP_FUNCTIONS = {
+    "search_courses": {"term": "ingegneria"},
+    "search_universities": {"term": "milano"},
+    "search_locations": {"term": "roma"},
+}
+
+TRIGGER_FUNCTIONS = (
+    "increment_course_counters_on_create",
+    "update_course_counters_on_update",
+    "decrement_course_counters_on_delete",
+)
+
+SAMPLE_COURSE = {
+    "id": "cold_start_sample",
+    "nomeCorso": "Ingegneria Informatica",
+    "discipline": {"id": "ingegneria", "name": "Ingegneria"},
+    "university": {"id": "politecnico_di_milano", "name": "Politecnico di Milano"},
+    "location": {"id": "milano", "name": "Milano"},
+    "degree_type": {"id": "laurea_triennale", "name": "Laurea Triennale"},
+    "program_type": {"id": "accesso_libero", "name": "Accesso libero"},
+    "language": {"id": "italiano", "name": "Italiano"},
+}
+
+
+def snapshot(data):
+    return SimpleNamespace(to_dict=lambda: dict(data))
+
+
+def invoke(main, name):
+    """Call one function the way the runtime would, with a representative input."""
+    if name in HTTP_FUNCTIONS:
+        import flask
+
+        app = flask.Flask("cold_start")
+        with app.test_request_context("/", query_string=HTTP_FUNCTIONS[name]):
+            return getattr(main, name)(flask.request)
+
+    # Trigger wrappers expect a raw CloudEvent; call the decorated function
+    # directly with an event exposing the same attributes.
+    handler = getattr(main, name).__wrapped__
+    if name == "update_course_counters_on_update":
+        moved = dict(SAMPLE_COURSE, location={"id": "torino", "name": "Torino"})
+        data = SimpleNamespace(before=snapshot(SAMPLE_COURSE), after=snapshot(moved))
+    else:
+        data = snapshot(SAMPLE_COURSE)
+    return handler(SimpleNamespace(data=data, params={"courseId": SAMPLE_COURSE["id"]}))
+
+
+def measure_child(name):
+    """Runs inside the fresh interpreter and prints one JSON result line."""
+    os.chdir(FUNCTIONS_DIR)
+    sys.path.insert(0, str(FUNCTIONS_DIR))
+
+    start = time.perf_counter()
+    import main
+
+    imported = time.perf_counter()
+    invoke(main, name)
+    done = time.perf_counter()
+
+    print(json.dumps({
+        "function": name,
+        "import_ms": (imported - start) * 1000,
+        "first_request_ms": (done - imported) * 1000,
+        "modules_loaded": len(sys.modules),
+    }))
+
+
+def run_once(name, env):
+    completed = subprocess.run(
+        [sys.executable, __file__, "--child", name],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    # The function may print its own logs; the result is the last line.
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples, key):
+    values = [sample[key] for sample in samples]
+    return {
+        "min": min(values),
+        "median": statistics.median(values),
+        "max": max(values),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for functions/main.py")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per function (default: 3)")
+    parser.add_argument(
+        "--function",
+        action="append",
+        choices=list(HTTP_FUNCTIONS) + list(TRIGGER_FUNCTIONS),
+        help="Function to measure (repeatable, default: all)",
+    )
+    parser.add_argument("--prewarm", action="store_true", help="Set CATALOG_PREWARM=1 in the child")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure_child(args.child)
+        return 0
+
+    env = dict(os.environ)
+    if args.prewarm:
+        env["CATALOG_PREWARM"] = "1"
+
+    results = {}
+    for name in args.function or list(HTTP_FUNCTIONS) + list(TRIGGER_FUNCTIONS):
+        samples = [run_once(name, env) for _ in range(args.runs)]
+        results[name] = {
+            "runs": args.runs,
+            "import_ms": summarize(samples, "import_ms"),
+            "first_request_ms": summarize(samples, "first_request_ms"),
+            "modules_loaded": samples[-1]["modules_loaded"],
+        }
+
+    print(f"{'function':40} {'import ms':>10} {'first req ms':>13} {'modules':>8}")
+    for name, result in results.items():
+        print(
+            f"{name:40} {result['import_ms']['median']:10.1f} "
+            f"{result['first_request_ms']['median']:13.1f} {result['modules_loaded']:8d}"
+        )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps({"prewarm": args.prewarm, "results": results}, indent=2))
+        print(f"Saved results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,502 @@
+"""
+Load test for the search functions against synthetic catalogs.
+
+For every catalog size a synthetic catalog (see synthetic_catalog.py) is
+published with DATA_BACKEND=local into a temporary directory, exactly as
+pipelines/update_courses.py would publish it. A fresh interpreter then imports
+functions/main.py and replays an autocomplete-style query mix (mostly short
+prefixes, some typos, full words and facet-filtered searches) against
+search_courses, search_universities and search_locations:
+
+* in-process, through a Flask test client, and
+* over HTTP, through a local threaded werkzeug server, and optionally
+* over HTTP, through functions/server.py with each ``--workers`` count,
+
+at each requested concurrency, mirroring a function instance that serves
+several requests at once. Throughput, p50/p95/p99 latency, throughput scaling
+relative to the lowest concurrency, the cold first request and RSS are printed
+and optionally written as JSON so runs can be compared between commits.
+
+    python benchmarks/load_test.py --sizes 1000 10000 --requests 500 --output pipelines/data/load_test.json
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from synthetic_catalog import generate_catalog
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FUNCTIONS_DIR = REPO_ROOT / "functions"
+PIPELINES_DIR = REPO_ROOT / "pipelines"
+
+SEARCH_FUNCTIONS = ("search_courses", "search_universities", "search_locations")
+TRANSPORTS = ("inprocess", "http")
+# The self-hosted pre-fork server (functions/server.py) is measured only on request.
+SERVER = "server"
+
+# Share of each query kind in the replayed mix; autocomplete traffic is
+# dominated by short prefixes typed one keystroke at a time.
+QUERY_MIX = {"prefix": 60, "typo": 20, "word": 10, "filtered": 10}
+
+
+# Query mix
+
+
+def typo(word, rng):
+    """Drop, swap, double or replace one character."""
+    if len(word) < 3:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(("drop", "swap", "double", "replace"))
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    if kind == "swap":
+        return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+    if kind == "double":
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + rng.choice("aeiourstnl") + word[i + 1:]
+
+
+def build_queries(courses, count, seed):
+    """Deterministic ``(function, params, kind)`` tuples drawn from the catalog's own names."""
+    rng = random.Random(seed)
+    names = {
+        "search_courses": sorted({c["nomeCorso"] for c in courses}),
+        "search_universities": sorted({c["university"]["name"] for c in courses}),
+        "search_locations": sorted({c["location"]["name"] for c in courses}),
+    }
+    locations = sorted({c["location"]["id"] for c in courses})
+    disciplines = sorted({c["discipline"]["id"] for c in courses})
+    kinds = list(QUERY_MIX)
+    weights = list(QUERY_MIX.values())
+
+    queries = []
+    for _ in range(count):
+        function = rng.choice(SEARCH_FUNCTIONS)
+        name = rng.choice(names[function]).lower()
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "filtered" and function != "search_courses":
+            kind = "prefix"
+
+        words = name.split()
+        if kind == "prefix":
+            # Everything typed so far: whole words and part of the next one.
+            cut = rng.randrange(len(words))
+            word = words[cut]
+            term = " ".join(words[:cut] + [word[:rng.randint(min(2, len(word)), len(word))]])
+        elif kind == "typo":
+            i = rng.choice([i for i, w in enumerate(words) if len(w) > 3] or [0])
+            term = " ".join(words[:i] + [typo(words[i], rng)] + words[i + 1:])
+        else:
+            term = rng.choice([w for w in words if len(w) > 3] or words)
+
+        params = {"term": term}
+        if kind == "filtered":
+            if rng.random() < 0.5:
+                params["location"] = rng.choice(locations)
+            else:
+                params["discipline"] = rng.choice(disciplines)
+        queries.append((function, params, kind))
+    return queries
+
+
+# Measurements
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def rss_mb():
+    """Current resident set size, from /proc where available."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def summarize(latencies_ms, errors, elapsed_s):
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": len(values) / elapsed_s if elapsed_s else None,
+        "mean_ms": statistics.fmean(values) if values else None,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else None,
+    }
+
+
+def replay(call, queries, concurrency):
+    """Run ``call(function, params)`` for every query; returns per-function and overall summaries."""
+    latencies = {name: [] for name in SEARCH_FUNCTIONS}
+    errors = {name: 0 for name in SEARCH_FUNCTIONS}
+    lock = threading.Lock()
+
+    def one(query):
+        function, params, _ = query
+        start = time.perf_counter()
+        ok = call(function, params)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies[function].append(elapsed)
+            if not ok:
+                errors[function] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, queries))
+    elapsed_s = time.perf_counter() - start
+
+    result = {
+        name: summarize(latencies[name], errors[name], elapsed_s) for name in SEARCH_FUNCTIONS
+    }
+    result["all"] = summarize(
+        [ms for values in latencies.values() for ms in values], sum(errors.values()), elapsed_s
+    )
+    return result
+
+
+def scaling(results, concurrency_levels):
+    """Overall throughput at each concurrency relative to the lowest one, per run setup."""
+    base = min(concurrency_levels)
+    ratios = {}
+    for run in results:
+        setup = run.rsplit("/", 1)[0]
+        baseline = results[f"{setup}/c{base}"]["all"]["throughput_rps"]
+        ratios[setup] = {
+            concurrency: results[f"{setup}/c{concurrency}"]["all"]["throughput_rps"] / baseline
+            for concurrency in concurrency_levels
+        }
+    return ratios
+
+
+def process_tree_memory_mb(pid):
+    """RSS and PSS summed over a process and its children (Linux only).
+
+    PSS splits shared pages between the processes mapping them, so it shows
+    whether memory really multiplies per worker; RSS counts shared pages in
+    every process.
+    """
+    pids = [pid]
+    try:
+        for child in Path(f"/proc/{pid}/task/{pid}/children").read_text().split():
+            pids.append(int(child))
+        totals = {"rss_mb": 0.0, "pss_mb": 0.0}
+        for p in pids:
+            for line in Path(f"/proc/{p}/smaps_rollup").read_text().splitlines():
+                field, _, value = line.partition(":")
+                if field in ("Rss", "Pss"):
+                    totals[f"{field.lower()}_mb"] += int(value.split()[0]) / 1024
+        return totals
+    except (OSError, ValueError):
+        return None
+
+
+def start_server(workers):
+    """Start functions/server.py on a free port; returns the process and its base URL."""
+    process = subprocess.Popen(
+        [sys.executable, str(FUNCTIONS_DIR / "server.py"), "--port", "0", "--workers", str(workers),
+         "--index-dir", tempfile.mkdtemp(prefix="load_test_index_")],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    for line in process.stdout:
+        if line.startswith("Listening on "):
+            base_url = line.split()[2]
+            break
+    else:
+        raise RuntimeError(f"server.py exited with {process.wait()} before listening")
+    # Keep draining the server's log output so it never blocks on a full pipe.
+    threading.Thread(target=lambda: [None for _ in process.stdout], daemon=True).start()
+    return process, base_url
+
+
+def wait_until_serving(call, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not call("search_locations", {"term": "roma"}):
+        if time.monotonic() > deadline:
+            raise RuntimeError("server.py workers did not start serving")
+        time.sleep(0.2)
+
+
+# Child processes
+
+
+def prepare_child(size, seed):
+    """Publish a synthetic catalog and facet collections into LOCAL_DATA_DIR."""
+    sys.path.insert(0, str(PIPELINES_DIR))
+    import update_courses
+    from data_backend import get_backend
+
+    courses = generate_catalog(size, seed)
+    catalog_raw = json.dumps({"courses": courses}).encode()
+    generation = update_courses.publish_generation(courses, catalog_raw, None)
+    update_courses.write_pointer(generation, [])
+
+    backend = get_backend()
+    for facet, collection in (("university", "universities"), ("location", "locations")):
+        counts = {}
+        for course in courses:
+            entry = counts.setdefault(course[facet]["id"], [course[facet]["name"], 0])
+            entry[1] += 1
+        for facet_id, (name, count) in counts.items():
+            backend.adjust_facet_counter(collection, facet_id, name, count)
+    backend.flush()
+    print(json.dumps({"generation": generation, "catalog_bytes": len(catalog_raw)}))
+
+
+def make_app(main):
+    """A Flask app exposing each search function at /<name>, as the emulator does."""
+    import flask
+
+    app = flask.Flask("load_test")
+
+    def route(name):
+        def view():
+            return getattr(main, name)(flask.request)
+
+        view.__name__ = name
+        return view
+
+    for name in SEARCH_FUNCTIONS:
+        app.add_url_rule(f"/{name}", view_func=route(name))
+    return app
+
+
+def inprocess_caller(app):
+    local = threading.local()
+
+    def call(function, params):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        response = client.get(f"/{function}", query_string=params)
+        response.get_data()
+        return response.status_code == 200
+
+    return call
+
+
+def http_caller(base_url):
+    def call(function, params):
+        url = f"{base_url}/{function}?{urllib.parse.urlencode(params)}"
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+                return response.status == 200
+        except OSError:
+            return False
+
+    return call
+
+
+def measure_server(queries, concurrency_levels, workers_counts, results):
+    memory = {}
+    for workers in workers_counts:
+        process, base_url = start_server(workers)
+        try:
+            call = http_caller(base_url)
+            wait_until_serving(call)
+            for concurrency in concurrency_levels:
+                results[f"{SERVER}-w{workers}/c{concurrency}"] = replay(call, queries, concurrency)
+            memory[workers] = process_tree_memory_mb(process.pid)
+        finally:
+            process.terminate()
+            process.wait()
+    return memory
+
+
+def measure_child(size, seed, requests, concurrency_levels, transports, workers_counts):
+    """Runs inside a fresh interpreter and prints one JSON result line."""
+    os.chdir(FUNCTIONS_DIR)
+    sys.path.insert(0, str(FUNCTIONS_DIR))
+
+    rss_before_import = rss_mb()
+    start = time.perf_counter()
+    import main
+
+    import_ms = (time.perf_counter() - start) * 1000
+    app = make_app(main)
+    courses = generate_catalog(size, seed)
+    queries = build_queries(courses, requests, seed)
+    del courses
+
+    # The first call per function pays for loading the catalog, imports and
+    # client construction; it is reported separately and not replayed.
+    call = inprocess_caller(app)
+    first_request_ms = {}
+    for function in SEARCH_FUNCTIONS:
+        start = time.perf_counter()
+        call(function, {"term": "ingegneria"})
+        first_request_ms[function] = (time.perf_counter() - start) * 1000
+
+    results = {}
+    server_memory = None
+    server = None
+    try:
+        for transport in transports:
+            if transport == SERVER:
+                server_memory = measure_server(queries, concurrency_levels, workers_counts, results)
+                continue
+            if transport == "http":
+                from werkzeug.serving import make_server
+
+                server = make_server("127.0.0.1", 0, app, threaded=True)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                call = http_caller(f"http://127.0.0.1:{server.server_port}")
+            else:
+                call = inprocess_caller(app)
+            for concurrency in concurrency_levels:
+                results[f"{transport}/c{concurrency}"] = replay(call, queries, concurrency)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print(json.dumps({
+        "size": size,
+        "import_ms": import_ms,
+        "first_request_ms": first_request_ms,
+        "rss_mb": {"before_import": rss_before_import, "after": rss_mb(), "peak": peak_rss_mb()},
+        "query_mix": {kind: sum(1 for q in queries if q[2] == kind) for kind in QUERY_MIX},
+        "results": results,
+        "scaling": scaling(results, concurrency_levels),
+        "server_memory_mb": server_memory,
+    }))
+
+
+def run_child(args, env):
+    completed = subprocess.run(
+        [sys.executable, __file__, *args],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    # The functions log one JSON line per request; the result is the last line.
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the search functions in functions/main.py")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+        help="Synthetic catalog sizes (default: 1000 10000 100000)",
+    )
+    parser.add_argument("--requests", type=int, default=1000, help="Queries replayed per run (default: 1000)")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 8],
+        help="Concurrent clients to replay with (default: 1 8)",
+    )
+    parser.add_argument(
+        "--transport", action="append", choices=TRANSPORTS + (SERVER,),
+        help="in-process test client, local HTTP server and/or the pre-fork server.py "
+        "(repeatable, default: inprocess and http)",
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4],
+        help="server.py worker counts to measure with --transport server (default: 1 2 4)",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Seed for catalogs and queries (default: 42)")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    parser.add_argument("--prepare", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        sys.path.insert(0, str(FUNCTIONS_DIR))
+        prepare_child(args.prepare, args.seed)
+        return 0
+    if args.child:
+        measure_child(
+            args.child, args.seed, args.requests, args.concurrency, args.transport or TRANSPORTS, args.workers
+        )
+        return 0
+
+    passthrough = ["--seed", str(args.seed), "--requests", str(args.requests), "--concurrency"]
+    passthrough += [str(c) for c in args.concurrency]
+    for transport in args.transport or ():
+        passthrough += ["--transport", transport]
+    passthrough += ["--workers"] + [str(w) for w in args.workers]
+
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix=f"load_test_{size}_") as data_dir:
+            env = dict(os.environ, DATA_BACKEND="local", LOCAL_DATA_DIR=data_dir, LOG_LEVEL="WARNING")
+            print(f"📦 Publishing a synthetic catalog of {size} courses...")
+            published = run_child(["--prepare", str(size), "--seed", str(args.seed)], env)
+            print(f"🚀 Replaying {args.requests} queries against {size} courses...")
+            result = run_child(["--child", str(size), *passthrough], env)
+            result["catalog_bytes"] = published["catalog_bytes"]
+            results.append(result)
+
+    print(
+        f"{'size':>7} {'run':14} {'function':20} {'req/s':>8} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    )
+    for result in results:
+        for run, by_function in result["results"].items():
+            for function, summary in by_function.items():
+                print(
+                    f"{result['size']:7d} {run:14} {function:20} {summary['throughput_rps']:8.1f} "
+                    f"{summary['p50_ms']:8.2f} {summary['p95_ms']:8.2f} {summary['p99_ms']:8.2f} "
+                    f"{summary['errors']:7d}"
+                )
+        for transport, ratios in result["scaling"].items():
+            print(
+                f"{result['size']:7d} {transport} throughput vs c{min(args.concurrency)}: "
+                + ", ".join(f"c{c} {ratio:.2f}x" for c, ratio in ratios.items())
+            )
+        print(
+            f"{result['size']:7d} first request ms: "
+            + ", ".join(f"{name} {ms:.1f}" for name, ms in result["first_request_ms"].items())
+            + f"; peak RSS {result['rss_mb']['peak']:.1f} MB"
+        )
+        for workers, memory in (result["server_memory_mb"] or {}).items():
+            if memory:
+                print(
+                    f"{result['size']:7d} server.py with {workers} workers: "
+                    f"RSS {memory['rss_mb']:.1f} MB, PSS {memory['pss_mb']:.1f} MB"
+                )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps({
+            "seed": args.seed,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "results": results,
+        }, indent=2))
+        print(f"Saved results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
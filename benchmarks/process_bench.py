@@ -0,0 +1,101 @@
+"""
+Benchmark course processing (pipelines/fetch_courses_data.py) across worker counts.
+
+Synthetic raw courses (see synthetic_catalog.py) are run through
+process_stream without classification, once per ``--workers`` count, and the
+output is compared against the single-process run. Throughput in courses per
+second, the speedup over one worker and whether the output matched are
+printed and optionally written as JSON so runs can be compared between
+commits.
+
+    python benchmarks/process_bench.py --count 50000 --workers 1 2 4 8 --output pipelines/data/bench_process.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from synthetic_catalog import generate_raw_courses
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PIPELINES_DIR = REPO_ROOT / "pipelines"
+
+
+def measure(count, seed, workers, chunk_size):
+    """Process ``count`` courses with ``workers`` processes; returns seconds and an output digest."""
+    from fetch_courses_data import process_stream
+
+    digest = hashlib.sha256()
+    processed = 0
+    start = time.perf_counter()
+    for course in process_stream(
+        generate_raw_courses(count, seed), enable_classification=False, workers=workers, chunk_size=chunk_size
+    ):
+        digest.update(json.dumps(course).encode())
+        processed += 1
+    return time.perf_counter() - start, processed, digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark course processing across worker counts")
+    parser.add_argument("--count", type=int, default=50000, help="Synthetic raw courses to process (default: 50000)")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+        help="Worker process counts to measure (default: 1 2 4 8)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=500, help="Courses per worker chunk (default: 500)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the synthetic courses (default: 42)")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    output = args.output.resolve() if args.output else None
+    # fetch_courses_data logs to pipelines/logs relative to the repository root.
+    os.chdir(REPO_ROOT)
+    (PIPELINES_DIR / "logs").mkdir(exist_ok=True)
+    sys.path.insert(0, str(PIPELINES_DIR))
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.setdefault("TQDM_DISABLE", "1")
+
+    print(f"🖥️ {os.cpu_count()} CPUs available")
+    results = []
+    baseline = None
+    for workers in sorted(set([1] + args.workers)):
+        print(f"⚙️ Processing {args.count} courses with {workers} worker{'s' if workers != 1 else ''}...")
+        seconds, processed, digest = measure(args.count, args.seed, workers, args.chunk_size)
+        baseline = baseline or (seconds, digest)
+        results.append({
+            "workers": workers,
+            "seconds": round(seconds, 3),
+            "courses": processed,
+            "courses_per_second": round(processed / seconds, 1),
+            "speedup": round(baseline[0] / seconds, 2),
+            "matches_single_process": digest == baseline[1],
+        })
+
+    print(f"{'workers':>7} {'seconds':>8} {'courses/s':>10} {'speedup':>8} {'output':>8}")
+    for result in results:
+        print(
+            f"{result['workers']:7d} {result['seconds']:8.2f} {result['courses_per_second']:10.1f} "
+            f"{result['speedup']:7.2f}x {'same' if result['matches_single_process'] else 'DIFFERS':>8}"
+        )
+
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "count": args.count,
+            "seed": args.seed,
+            "chunk_size": args.chunk_size,
+            "cpus": os.cpu_count(),
+            "results": results,
+        }, indent=2))
+        print(f"Saved results to {output}")
+    return 0 if all(result["matches_single_process"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Synthetic course catalogs for benchmarks.
+
+Generates Universitaly-shaped raw course records with realistic Italian names
+and, from them, catalogs in the shape process_courses writes to
+all_courses_data.json. Generation is deterministic for a given seed, so runs
+on different commits see the same data.
+
+    python benchmarks/synthetic_catalog.py --count 10000 --output pipelines/data/synthetic_courses.json
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import unicodedata
+from pathlib import Path
+
+CITIES = [
+    "Milano", "Roma", "Napoli", "Torino", "Bologna", "Firenze", "Padova", "Pisa",
+    "Genova", "Bari", "Palermo", "Catania", "Trento", "Trieste", "Udine", "Verona",
+    "Venezia", "Pavia", "Parma", "Modena", "Perugia", "Siena", "Cagliari", "Sassari",
+    "Salerno", "Messina", "Ferrara", "Bergamo", "Brescia", "Macerata", "Camerino",
+    "Urbino", "Ancona", "L'Aquila", "Teramo", "Chieti", "Cosenza", "Catanzaro",
+    "Lecce", "Foggia", "Potenza", "Campobasso", "Bolzano", "Aosta", "Varese", "Como",
+]
+
+UNIVERSITY_PATTERNS = [
+    "Università degli Studi di {city}",
+    "Politecnico di {city}",
+    "Università di {city}",
+    "Scuola Superiore di {city}",
+]
+
+PRIVATE_UNIVERSITIES = [
+    ("Università Commerciale Luigi Bocconi", "Milano"),
+    ("Università Cattolica del Sacro Cuore", "Milano"),
+    ("Libera Università Internazionale degli Studi Sociali Guido Carli", "Roma"),
+    ("Università Vita-Salute San Raffaele", "Milano"),
+    ("Libera Università di Bolzano", "Bolzano"),
+    ("Università Telematica Pegaso", "Napoli"),
+]
+
+DISCIPLINES = [
+    "Agricoltura", "Antropologia", "Architettura, Edilizia e Pianificazione",
+    "Scienze Biologiche", "Economia Aziendale e Management", "Chimica",
+    "Comunicazione e Studi sui Media", "Informatica", "Arti Creative e Design",
+    "Economia", "Scienze dell'Educazione", "Ingegneria", "Scienze Ambientali",
+    "Finanza", "Scienze Alimentari", "Geografia", "Geologia",
+    "Storia e Archeologia", "Lingue", "Giurisprudenza", "Lettere", "Matematica",
+    "Medicina", "Professioni sanitarie tecniche", "Filosofia", "Fisica",
+    "Scienze Politiche e Governo", "Psicologia", "Servizio Sociale", "Sociologia",
+    "Scienze Veterinarie", "Farmacia",
+]
+
+COURSE_STEMS = [
+    "Ingegneria", "Scienze", "Economia", "Lettere", "Lingue", "Scienze e Tecnologie",
+    "Tecniche", "Studi", "Management", "Architettura", "Biotecnologie", "Design",
+]
+
+COURSE_QUALIFIERS = [
+    "Informatica", "Gestionale", "Meccanica", "Civile", "Elettronica", "Biomedica",
+    "dell'Ambiente e del Territorio", "Aerospaziale", "Chimica", "Energetica",
+    "Politiche", "della Comunicazione", "Biologiche", "Farmaceutiche", "Agrarie",
+    "Alimentari", "Motorie", "dell'Educazione", "Psicologiche", "Giuridiche",
+    "e Commercio", "Aziendale", "e Finanza", "Moderne", "Classiche",
+    "e Culture Straniere", "per il Turismo", "Infermieristiche", "di Laboratorio Biomedico",
+    "della Prevenzione", "Internazionali", "del Patrimonio Culturale", "Statistiche",
+    "Matematiche", "Fisiche", "Geologiche", "Forestali", "Veterinarie",
+]
+
+DEGREE_TYPES = [
+    ("L", "Laurea", 3, 180),
+    ("LM", "Laurea Magistrale", 2, 120),
+    ("LMCU", "Laurea Magistrale a Ciclo Unico", 5, 300),
+]
+
+PROGRAM_TYPES = ["Accesso libero", "Programmato locale", "Programmato nazionale"]
+ADMISSIONS = ["Accesso libero con prova", "Accesso libero", "Accesso con test"]
+DELIVERY = ["Convenzionale", "Prevalentemente a distanza", "Integralmente a distanza"]
+LANGUAGES = [("IT", "Italiano"), ("EN", "Inglese"), ("mu", "Multilingua")]
+
+LOWERCASE_WORDS = {"della", "di", "e", "con", "per", "dell", "degli", "del", "a", "da", "in", "su", "tra", "fra"}
+
+
+def slugify(name):
+    """Same ids as create_id_from_name for the ASCII-foldable names used here."""
+    name = unicodedata.normalize("NFKD", name.lower()).encode("ascii", "ignore").decode()
+    name = re.sub(r"\s+", "_", name)
+    return re.sub(r"[^a-z0-9_]", "", name)
+
+
+def build_universities(rng):
+    universities = []
+    for city in CITIES:
+        for pattern in rng.sample(UNIVERSITY_PATTERNS, k=rng.randint(1, 2)):
+            universities.append((pattern.format(city=city), city))
+    return universities + PRIVATE_UNIVERSITIES
+
+
+def generate_raw_courses(count, seed=42):
+    """Yield ``count`` raw records shaped like the Universitaly cerca-corsi results."""
+    rng = random.Random(seed)
+    universities = build_universities(rng)
+    for course_id in range(1, count + 1):
+        university, city = rng.choice(universities)
+        code, degree, years, cfu = rng.choice(DEGREE_TYPES)
+        stem = rng.choice(COURSE_STEMS)
+        qualifier = rng.choice(COURSE_QUALIFIERS)
+        discipline = rng.choice(DISCIPLINES)
+        language_code, _ = rng.choices(LANGUAGES, weights=[85, 12, 3])[0]
+        yield {
+            "id": course_id,
+            "nomeCorso": f"{stem} {qualifier}".upper(),
+            "nomeStruttura": university.upper(),
+            "lingua": language_code,
+            "classe": {
+                "codice": f"{code}-{rng.randint(1, 99)}",
+                "descrizione": discipline,
+                "totaleCfu": cfu,
+            },
+            "sede": {"comuneDescrizione": city.upper()},
+            "tipoLaurea": {"descrizione": degree},
+            "programmazione": {"descrizione": rng.choice(PROGRAM_TYPES)},
+            "modalitaAccesso": {"descrizione": rng.choice(ADMISSIONS)},
+            "modalitaDidattica": {"descrizione": rng.choice(DELIVERY)},
+            "anno": {"descrizione": "2025/2026"},
+            "durataAnni": years,
+            "url": f"https://www.universitaly.it/corso/{course_id}",
+        }
+
+
+def capitalize_name(name):
+    words = name.split()
+    return " ".join(
+        [words[0].capitalize()]
+        + [w.lower() if w.lower() in LOWERCASE_WORDS else w.capitalize() for w in words[1:]]
+    )
+
+
+def facet(name):
+    return {"id": slugify(name), "name": name}
+
+
+def to_processed(raw):
+    """Attach facets the way process_courses does (without classification)."""
+    course = dict(raw)
+    course["nomeCorso"] = capitalize_name(raw["nomeCorso"])
+    course["nomeStruttura"] = capitalize_name(raw["nomeStruttura"])
+    course["lingua"] = dict(LANGUAGES)[raw["lingua"]]
+    course["discipline"] = facet(raw["classe"]["descrizione"])
+    course["university"] = facet(course["nomeStruttura"])
+    course["location"] = facet(raw["sede"]["comuneDescrizione"].lower().capitalize())
+    course["degree_type"] = facet(raw["tipoLaurea"]["descrizione"])
+    course["program_type"] = facet(raw["programmazione"]["descrizione"])
+    course["language"] = facet(course["lingua"])
+    return course
+
+
+def generate_catalog(count, seed=42):
+    """A processed catalog of ``count`` courses, as written to all_courses_data.json."""
+    return [to_processed(raw) for raw in generate_raw_courses(count, seed)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic processed catalog")
+    parser.add_argument("--count", type=int, default=1000, help="Number of courses (default: 1000)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("--output", type=Path, required=True, help="JSON file to write, in the all_courses_data.json shape")
+    args = parser.parse_args()
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps({"courses": generate_catalog(args.count, args.seed)}, ensure_ascii=False))
+    print(f"Wrote {args.count} synthetic courses to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
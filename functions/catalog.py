@@ -0,0 +1,388 @@
+"""In-memory course catalog backed by generation-stamped catalog blobs.
+
+The pipeline publishes every catalog under ``catalog/generations/<generation>/``
+and then flips the small ``catalog/current.json`` pointer. Function instances
+keep one :class:`CatalogSnapshot` per generation, poll the pointer at most every
+``CATALOG_POLL_INTERVAL`` seconds and build the next snapshot in a background
+thread, so requests never wait on a reload.
+
+Instances serve many requests concurrently. Snapshots and indexes are never
+mutated once visible to a request, only replaced by swapping a single
+reference; the lazily loaded parts (the full catalog, shards, filtered views)
+are built under a lock per key, so one slow download never blocks the others.
+
+When an instance is at most ``CATALOG_MAX_DELTAS`` generations behind, the
+new snapshot is built by applying each generation's ``delta.json`` to the
+catalog already in memory instead of downloading it again.
+
+Set ``CATALOG_PIN_GENERATION`` to serve a fixed generation (instant rollback).
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+
+from data_backend import BlobNotFound, get_backend
+from instrumentation import logger, span
+from shared_cache import SharedCache
+
+# Storage layout, shared with pipelines/update_courses.py which publishes it.
+CATALOG_PREFIX = "catalog"
+POINTER_PATH = f"{CATALOG_PREFIX}/current.json"
+CATALOG_NAME = "all_courses_data.json"
+LEGACY_CATALOG_PATH = "all_courses_data.json"
+
+# Facets with their own catalog shard, in the order they are preferred when a
+# request filters on several.
+SHARD_FACETS = ("location", "discipline")
+
+POLL_INTERVAL = float(os.environ.get("CATALOG_POLL_INTERVAL", "60"))
+PIN_GENERATION = os.environ.get("CATALOG_PIN_GENERATION") or None
+MAX_DELTAS = int(os.environ.get("CATALOG_MAX_DELTAS", "5"))
+# Filtered views of one index kept for reuse (per facet filter combination).
+FILTER_CACHE_SIZE = int(os.environ.get("CATALOG_FILTER_CACHE_SIZE", "256"))
+# Shards kept in memory per snapshot.
+SHARD_CACHE_SIZE = int(os.environ.get("CATALOG_SHARD_CACHE_SIZE", "256"))
+
+
+def generation_path(generation, name):
+    return f"{CATALOG_PREFIX}/generations/{generation}/{name}"
+
+
+def catalog_path(generation):
+    # Generation None means the catalog predates versioned publishing.
+    return generation_path(generation, CATALOG_NAME) if generation else LEGACY_CATALOG_PATH
+
+
+def shard_name(facet, facet_id):
+    return f"shards/{facet}/{facet_id}.json"
+
+
+def shard_path(generation, facet, facet_id):
+    name = shard_name(facet, facet_id)
+    return generation_path(generation, name) if generation else name
+
+
+def delta_path(generation):
+    return generation_path(generation, "delta.json")
+
+
+def manifest_path(generation):
+    return generation_path(generation, "manifest.json")
+
+
+def download_json(path):
+    """Download and decode a JSON blob, raising BlobNotFound if it does not exist."""
+    payload = get_backend().read_blob(path)
+    # The pipeline uploads blobs gzipped with Content-Encoding: gzip. Storage
+    # normally decompresses them for us, but emulators and raw downloads may
+    # hand back the compressed bytes.
+    if payload[:2] == b"\x1f\x8b":
+        payload = gzip.decompress(payload)
+    return json.loads(payload)
+
+
+def read_pointer():
+    """Return the generation named by the pointer object, or None if there is none."""
+    try:
+        return download_json(POINTER_PATH).get("generation")
+    except BlobNotFound:
+        return None
+
+
+def load_courses(path):
+    try:
+        with span("storage"):
+            return download_json(path)["courses"]
+    except BlobNotFound:
+        logger.warning(f"Catalog blob {path} not found, serving an empty catalog.")
+        return []
+
+
+def apply_delta(courses, delta, keep=None):
+    """Return a new course list with a generation delta applied.
+
+    ``keep`` restricts the result to one shard: updated courses that no
+    longer satisfy it drop out, and added or updated ones that now do join.
+    """
+    by_id = {course["id"]: course for course in courses}
+    for course_id in delta["deleted"]:
+        by_id.pop(course_id, None)
+    for course in delta["updated"] + delta["added"]:
+        if keep is None or keep(course):
+            by_id[course["id"]] = course
+        else:
+            by_id.pop(course["id"], None)
+    return [by_id[course_id] for course_id in delta["order"] if course_id in by_id]
+
+
+def delta_chain(from_generation, to_generation):
+    """Download the deltas leading from one generation to another, oldest first.
+
+    Returns None when ``from_generation`` is not reachable within MAX_DELTAS
+    steps (or a delta is missing), meaning a full load is needed.
+    """
+    if not from_generation:
+        return None
+    chain = []
+    generation = to_generation
+    while generation != from_generation:
+        if len(chain) >= MAX_DELTAS:
+            return None
+        try:
+            delta = download_json(delta_path(generation))
+        except BlobNotFound:
+            return None
+        chain.append(delta)
+        generation = delta["from"]
+    chain.reverse()
+    return chain
+
+
+def facet_filter(facet, facet_id):
+    return lambda course: (course.get(facet) or {}).get("id") == facet_id
+
+
+class ShardNotFound(Exception):
+    """A shard the manifest lists is missing from Storage; never cached."""
+
+
+class CatalogSnapshot:
+    """Courses of one catalog generation plus the lookups search needs.
+
+    The full catalog and the per-facet shards are loaded lazily, so an instance
+    that only serves filtered views never pulls the whole catalog. Only shards
+    listed in the generation's manifest are fetched; any other facet id matches
+    no course and is answered with an empty index without touching Storage.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self._full_lock = threading.Lock()
+        self._full = None
+        self._shards = SharedCache(max_entries=SHARD_CACHE_SIZE)
+        self._manifest_lock = threading.Lock()
+        self._manifest_loaded = False
+        self._manifest = None
+
+    @property
+    def full_loaded(self):
+        return self._full is not None
+
+    def courses(self):
+        if self._full is None:
+            with self._full_lock:
+                if self._full is None:
+                    self._full = CatalogIndex(load_courses(catalog_path(self.generation)))
+        return self._full
+
+    def manifest(self):
+        """The generation's shard manifest, or None when there is none (legacy catalogs)."""
+        if not self._manifest_loaded:
+            with self._manifest_lock:
+                if not self._manifest_loaded:
+                    if self.generation:
+                        try:
+                            with span("storage"):
+                                self._manifest = download_json(manifest_path(self.generation))
+                        except BlobNotFound:
+                            logger.warning(f"No manifest for generation {self.generation}, fetching shards unchecked.")
+                    self._manifest_loaded = True
+        return self._manifest
+
+    def has_shard(self, facet, facet_id):
+        manifest = self.manifest()
+        return manifest is None or facet_id in manifest["facets"].get(facet, {})
+
+    def _load_shard(self, facet, facet_id):
+        path = shard_path(self.generation, facet, facet_id)
+        try:
+            with span("storage"):
+                return CatalogIndex(download_json(path)["courses"])
+        except BlobNotFound:
+            raise ShardNotFound(path) from None
+
+    def shard(self, facet, facet_id):
+        if not self.has_shard(facet, facet_id):
+            return EMPTY_INDEX
+        try:
+            return self._shards.get((facet, facet_id), lambda: self._load_shard(facet, facet_id))
+        except ShardNotFound as e:
+            logger.warning(f"Catalog shard {e} not found, serving an empty shard.")
+            return EMPTY_INDEX
+
+    def is_loaded(self, filters):
+        """Whether :meth:`select` can answer these filters without touching Storage."""
+        if self._full is not None:
+            return True
+        if not filters:
+            return False
+        key = next(iter(filters.items()))
+        return key in self._shards or (self._manifest_loaded and not self.has_shard(*key))
+
+    def select(self, filters):
+        """Return the index covering the given ``{facet: id}`` filters."""
+        if not filters:
+            return self.courses()
+        if self._full is not None:
+            return self._full.filtered(filters)
+
+        facet, facet_id = next(iter(filters.items()))
+        index = self.shard(facet, facet_id)
+        remaining = {f: v for f, v in filters.items() if f != facet}
+        return index.filtered(remaining) if remaining else index
+
+    def patched(self, generation, deltas):
+        """Build the snapshot for a later generation from this one plus deltas."""
+        replacement = CatalogSnapshot(generation)
+        if self._full is not None:
+            courses = self._full.courses
+            for delta in deltas:
+                courses = apply_delta(courses, delta)
+            replacement._full = CatalogIndex(courses)
+        for (facet, facet_id), index in self._shards.items():
+            if replacement._full is not None:
+                replacement._shards.put((facet, facet_id), replacement._full.filtered({facet: facet_id}))
+                continue
+            courses = index.courses
+            for delta in deltas:
+                courses = apply_delta(courses, delta, keep=facet_filter(facet, facet_id))
+            replacement._shards.put((facet, facet_id), CatalogIndex(courses))
+        return replacement
+
+    def warm_like(self, other):
+        """Preload whatever the snapshot being replaced had already loaded."""
+        if other is None or other.full_loaded:
+            self.courses()
+        if other is not None:
+            for facet, facet_id in other._shards.keys():
+                self.shard(facet, facet_id)
+
+
+class CatalogIndex:
+    """A read-only sequence of courses with name and facet lookups built once.
+
+    Everything is built in the constructor and never changed afterwards, so
+    an index is safe to share between threads; only the cache of filtered
+    views grows, under its own locks.
+    """
+
+    def __init__(self, courses):
+        self.courses = tuple(courses)
+        self.names = tuple(course["nomeCorso"] for course in self.courses)
+        # Search resolves a matched name to the first course carrying it.
+        self.first_by_name = {}
+        for position, name in enumerate(self.names):
+            self.first_by_name.setdefault(name, position)
+        by_facet = {facet: {} for facet in SHARD_FACETS}
+        for position, course in enumerate(self.courses):
+            for facet in SHARD_FACETS:
+                facet_id = (course.get(facet) or {}).get("id")
+                if facet_id:
+                    by_facet[facet].setdefault(facet_id, []).append(position)
+        self.by_facet = {
+            facet: {facet_id: tuple(positions) for facet_id, positions in ids.items()}
+            for facet, ids in by_facet.items()
+        }
+        self._filtered = SharedCache(max_entries=FILTER_CACHE_SIZE)
+
+    def __len__(self):
+        return len(self.courses)
+
+    def course_named(self, name):
+        return self.courses[self.first_by_name[name]]
+
+    def filtered(self, filters):
+        return self._filtered.get(tuple(sorted(filters.items())), lambda: self._build_filtered(filters))
+
+    def _build_filtered(self, filters):
+        positions = None
+        for facet, facet_id in filters.items():
+            matching = set(self.by_facet.get(facet, {}).get(facet_id, ()))
+            positions = matching if positions is None else positions & matching
+        return CatalogIndex([self.courses[p] for p in sorted(positions or ())])
+
+
+EMPTY_INDEX = CatalogIndex(())
+
+
+_snapshot = None
+_load_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_last_poll = 0.0
+# Set when something else (the self-hosted server's master process) decides
+# which generation is served; get_snapshot then never polls the pointer.
+_managed = False
+
+
+def target_generation():
+    return PIN_GENERATION or read_pointer()
+
+
+def get_snapshot():
+    """Return the current snapshot, scheduling a background refresh when due.
+
+    Only the very first call on an instance blocks on Storage; later calls
+    always return immediately with whichever snapshot is current.
+    """
+    global _snapshot, _last_poll
+    snapshot = _snapshot
+    if _managed:
+        return snapshot
+    if snapshot is None:
+        with _load_lock:
+            if _snapshot is None:
+                _snapshot = CatalogSnapshot(target_generation())
+                _last_poll = time.monotonic()
+            return _snapshot
+
+    if PIN_GENERATION is None and time.monotonic() - _last_poll >= POLL_INTERVAL:
+        _last_poll = time.monotonic()
+        if _refresh_lock.acquire(blocking=False):
+            threading.Thread(target=_refresh, args=(snapshot,), daemon=True).start()
+    return snapshot
+
+
+def prewarm():
+    """Load the full catalog in a background thread so the first search finds it ready."""
+    threading.Thread(target=lambda: get_snapshot().courses(), daemon=True).start()
+
+
+def serve_snapshot(snapshot):
+    """Serve ``snapshot`` to every following request and stop polling the pointer.
+
+    Anything with the :class:`CatalogSnapshot` interface works; server.py
+    installs a memory-mapped snapshot and swaps it when the master publishes
+    a new generation.
+    """
+    global _snapshot, _managed
+    _snapshot = snapshot
+    _managed = True
+
+
+def _refresh(current):
+    global _snapshot
+    try:
+        generation = read_pointer()
+        if generation == current.generation:
+            return
+        replacement = None
+        deltas = delta_chain(current.generation, generation)
+        if deltas is not None:
+            try:
+                replacement = current.patched(generation, deltas)
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Could not apply catalog deltas, falling back to a full load: {e}")
+        if replacement is None:
+            replacement = CatalogSnapshot(generation)
+            replacement.warm_like(current)
+        # A single reference assignment: requests already holding the old
+        # snapshot finish on it, new requests see the new generation.
+        _snapshot = replacement
+        logger.info(f"Catalog swapped from generation {current.generation} to {generation}.")
+    except Exception as e:
+        logger.warning(f"Catalog refresh failed, keeping generation {current.generation}: {e}")
+    finally:
+        _refresh_lock.release()
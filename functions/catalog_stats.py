@@ -0,0 +1,76 @@
+"""The precomputed ``stats/catalog`` document the home page reads.
+
+One pass over the catalog yields the total course count and, per facet, the
+number of distinct values and the ``STATS_TOP_N`` values with the most
+courses. The frontend reads this single document instead of running one
+counter-ordered query per facet. The upload pipeline writes it after every
+publish; the ``refresh_catalog_stats`` function rewrites it on a schedule from
+the catalog generation currently served.
+"""
+
+import os
+from datetime import datetime, timezone
+
+from data_backend import get_backend
+
+STATS_COLLECTION = "stats"
+STATS_DOCUMENT = "catalog"
+STATS_TOP_N = int(os.environ.get("STATS_TOP_N", "50"))
+FORMAT_VERSION = 1
+
+# Facet -> key of its entry in the document (the collection names the
+# frontend already uses).
+STATS_FACETS = {
+    "discipline": "disciplines",
+    "university": "universities",
+    "location": "locations",
+    "degree_type": "degree_types",
+    "program_type": "program_types",
+    "language": "languages",
+}
+
+
+def compute_stats(courses, generation=None, top_n=STATS_TOP_N):
+    counts = {facet: {} for facet in STATS_FACETS}
+    names = {facet: {} for facet in STATS_FACETS}
+    total = 0
+    for course in courses:
+        total += 1
+        for facet in STATS_FACETS:
+            facet_data = course.get(facet)
+            if not isinstance(facet_data, dict) or not facet_data.get("id"):
+                continue
+            facet_id = facet_data["id"]
+            counts[facet][facet_id] = counts[facet].get(facet_id, 0) + 1
+            if facet_data.get("name"):
+                names[facet].setdefault(facet_id, facet_data["name"])
+
+    facets = {}
+    for facet, key in STATS_FACETS.items():
+        ranked = sorted(
+            counts[facet].items(),
+            key=lambda item: (-item[1], names[facet].get(item[0]) or "", item[0]),
+        )
+        facets[key] = {
+            "count": len(ranked),
+            "top": [
+                {"id": facet_id, "name": names[facet].get(facet_id), "coursesCounter": count}
+                for facet_id, count in ranked[:top_n]
+            ],
+        }
+
+    return {
+        "version": FORMAT_VERSION,
+        "generation": generation,
+        "computed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "top_n": top_n,
+        "total_courses": total,
+        "facets": facets,
+    }
+
+
+def write_stats(courses, generation=None):
+    """Compute the stats document and store it; returns the document."""
+    stats = compute_stats(courses, generation)
+    get_backend().write_document(STATS_COLLECTION, STATS_DOCUMENT, stats)
+    return stats
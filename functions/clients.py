@@ -0,0 +1,78 @@
+"""Lazily constructed, memoized Firebase clients.
+
+Nothing here runs at import time: the Firebase app, the Firestore client (and
+its gRPC channel to the emulator) and the Storage bucket are created the first
+time a function actually needs them, once per instance.
+"""
+
+import functools
+import os
+import threading
+from pathlib import Path
+
+env = "development"
+# Resolved from the repository so functions and pipeline scripts share it
+# regardless of their working directory.
+DEV_CREDENTIALS = Path(__file__).resolve().parent.parent / "dev_firebase_config.json"
+# FIREBASE_STORAGE_BUCKET overrides the bucket of the current environment.
+DEV_STORAGE_BUCKET = "guidauniversitaria.appspot.com"
+PROD_STORAGE_BUCKET = "prod_project_id.appspot.com"
+
+
+def storage_bucket():
+    default = DEV_STORAGE_BUCKET if env == "development" else PROD_STORAGE_BUCKET
+    return os.environ.get("FIREBASE_STORAGE_BUCKET") or default
+
+
+def memoized(factory):
+    """Call ``factory`` once, even when several threads ask for it at the same time."""
+    lock = threading.Lock()
+    result = []
+
+    @functools.wraps(factory)
+    def get():
+        if not result:
+            with lock:
+                if not result:
+                    result.append(factory())
+        return result[0]
+
+    return get
+
+
+@memoized
+def get_app():
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if env == "development":
+        cred = credentials.Certificate(str(DEV_CREDENTIALS))
+        os.environ["STORAGE_EMULATOR_HOST"] = "http://127.0.0.1:9199"
+        return firebase_admin.initialize_app(cred, {"storageBucket": storage_bucket()})
+    return firebase_admin.initialize_app(options={"storageBucket": storage_bucket()})
+
+
+@memoized
+def get_db():
+    from firebase_admin import firestore
+
+    db = firestore.client(app=get_app())
+    if env == "development":
+        import grpc
+        from google.cloud.firestore_v1.services.firestore import FirestoreClient
+        from google.cloud.firestore_v1.services.firestore.transports import (
+            FirestoreGrpcTransport,
+        )
+
+        # Create a channel and transport for Firestore client
+        channel = grpc.insecure_channel("localhost:8080")
+        transport = FirestoreGrpcTransport(channel=channel)
+        db._firestore_api_internal = FirestoreClient(transport=transport)
+    return db
+
+
+@memoized
+def get_bucket():
+    from firebase_admin import storage
+
+    return storage.bucket(app=get_app())
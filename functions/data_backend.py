@@ -0,0 +1,337 @@
+"""Data access for the catalog blobs, facet collections and course documents.
+
+Functions and the upload pipeline talk to storage only through a
+:class:`DataBackend`. ``DATA_BACKEND`` selects the implementation:
+
+* ``firebase`` (default): Cloud Storage and Firestore via :mod:`clients`.
+* ``local``: blobs as files and collections as JSON documents under
+  ``LOCAL_DATA_DIR`` (default ``.local_data`` in the repository root), held in
+  memory while the process runs. Used to benchmark the real code paths on a
+  machine without emulators.
+"""
+
+import atexit
+import base64
+import hashlib
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from clients import get_bucket, get_db, memoized
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class DataBackend(ABC):
+    """Operations the functions and pipeline need from storage.
+
+    Every operation is abstract, so a backend missing one fails when it is
+    instantiated rather than partway through a publish.
+    """
+
+    # Catalog blobs
+
+    @abstractmethod
+    def read_blob(self, path):
+        """Return the blob's bytes, raising BlobNotFound if it does not exist."""
+
+    @abstractmethod
+    def blob_exists(self, path):
+        ...
+
+    @abstractmethod
+    def blob_matches(self, path, payload, content_encoding=None):
+        """Whether the blob exists and already stores exactly ``payload``."""
+
+    @abstractmethod
+    def write_blob(self, path, payload, content_type="application/json",
+                   content_encoding=None, cache_control=None):
+        ...
+
+    @abstractmethod
+    def copy_blob(self, source_path, destination_path):
+        ...
+
+    @abstractmethod
+    def list_blobs(self, prefix):
+        """Return the paths of every blob under ``prefix``."""
+
+    @abstractmethod
+    def delete_blobs(self, paths):
+        """Delete the given blobs, ignoring ones that no longer exist."""
+
+    # Facet collections
+
+    @abstractmethod
+    def list_facets(self, collection, limit=500):
+        """Return ``(doc_id, data)`` pairs, most courses first where possible."""
+
+    @abstractmethod
+    def adjust_facet_counter(self, collection, facet_id, name, delta):
+        """Add ``delta`` to a facet's coursesCounter, never going below zero.
+
+        A missing facet document is created (with the given name) only when
+        incrementing. Returns False if the document was missing on a decrement.
+        """
+
+    # Single documents
+
+    @abstractmethod
+    def read_document(self, collection, doc_id):
+        """Return the document's data, or None if it does not exist."""
+
+    @abstractmethod
+    def write_document(self, collection, doc_id, data):
+        """Create or replace one document."""
+
+    # Course documents
+
+    @abstractmethod
+    def write_courses(self, courses):
+        """Write course documents keyed by their ``id`` field; returns how many were written."""
+
+
+def md5_base64(payload):
+    return base64.b64encode(hashlib.md5(payload).digest()).decode()
+
+
+class FirebaseBackend(DataBackend):
+    BATCH_SIZE = 500
+
+    def read_blob(self, path):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return get_bucket().blob(path).download_as_bytes()
+        except NotFound as e:
+            raise BlobNotFound(path) from e
+
+    def blob_exists(self, path):
+        return get_bucket().get_blob(path) is not None
+
+    def blob_matches(self, path, payload, content_encoding=None):
+        blob = get_bucket().get_blob(path)
+        if blob is None or blob.content_encoding != content_encoding:
+            return False
+        if blob.md5_hash:
+            return blob.md5_hash == md5_base64(payload)
+        if blob.crc32c:
+            import google_crc32c
+
+            local_crc = base64.b64encode(google_crc32c.Checksum(payload).digest()).decode()
+            return blob.crc32c == local_crc
+        return False
+
+    # Blobs above this size are sent as a resumable upload in chunks (GCS
+    # requires chunk sizes to be a multiple of 256 KiB).
+    RESUMABLE_UPLOAD_THRESHOLD = 8 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE = 32 * 256 * 1024
+
+    def write_blob(self, path, payload, content_type="application/json",
+                   content_encoding=None, cache_control=None):
+        import io
+
+        blob = get_bucket().blob(path)
+        blob.content_encoding = content_encoding
+        if cache_control:
+            blob.cache_control = cache_control
+        if len(payload) > self.RESUMABLE_UPLOAD_THRESHOLD:
+            # Setting a chunk size switches the client to a resumable, chunked upload.
+            blob.chunk_size = self.UPLOAD_CHUNK_SIZE
+        blob.upload_from_file(
+            io.BytesIO(payload),
+            size=len(payload),
+            content_type=content_type,
+            checksum="crc32c",
+        )
+
+    def copy_blob(self, source_path, destination_path):
+        bucket = get_bucket()
+        bucket.copy_blob(bucket.blob(source_path), bucket, destination_path)
+
+    def list_blobs(self, prefix):
+        return [blob.name for blob in get_bucket().list_blobs(prefix=prefix)]
+
+    def delete_blobs(self, paths):
+        bucket = get_bucket()
+        bucket.delete_blobs([bucket.blob(path) for path in paths], on_error=lambda blob: None)
+
+    def list_facets(self, collection, limit=500):
+        from firebase_admin import firestore
+
+        db = get_db()
+        # Prefer ordering by coursesCounter if index exists; fallback to full scan
+        try:
+            docs = list(
+                db.collection(collection)
+                .order_by("coursesCounter", direction=firestore.Query.DESCENDING)
+                .limit(limit)
+                .stream()
+            )
+        except Exception:
+            docs = list(db.collection(collection).stream())
+        return [(d.id, d.to_dict() or {}) for d in docs]
+
+    def adjust_facet_counter(self, collection, facet_id, name, delta):
+        field_ref = get_db().collection(collection).document(facet_id)
+        doc_snapshot = field_ref.get()
+        if doc_snapshot.exists:
+            current_count = doc_snapshot.get("coursesCounter") or 0
+            field_ref.update({"coursesCounter": max(0, current_count + delta)})
+            return True
+        if delta > 0:
+            # Document does not exist, create it
+            field_ref.set({"name": name, "coursesCounter": delta})
+            return True
+        return False
+
+    def read_document(self, collection, doc_id):
+        snapshot = get_db().collection(collection).document(doc_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def write_document(self, collection, doc_id, data):
+        get_db().collection(collection).document(doc_id).set(data)
+
+    def write_courses(self, courses):
+        db = get_db()
+        collection_ref = db.collection("courses")
+        written = 0
+        batch = db.batch()
+        for course in courses:
+            # Use the 'id' field from the course data as the document ID
+            if not course.get("id"):
+                print("Course data is missing 'id' field:", course)
+                continue
+            batch.set(collection_ref.document(str(course["id"])), course)
+            written += 1
+            if written % self.BATCH_SIZE == 0:
+                batch.commit()
+                batch = db.batch()
+        batch.commit()
+        return written
+
+
+class LocalBackend(DataBackend):
+    """Blobs as files, collections as dicts persisted to JSON on flush and at exit."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._collections = {}
+        self._dirty = set()
+        atexit.register(self.flush)
+
+    def _blob_file(self, path):
+        return self.root / "blobs" / path
+
+    def _collection(self, name):
+        docs = self._collections.get(name)
+        if docs is None:
+            file = self.root / "firestore" / f"{name}.json"
+            docs = json.loads(file.read_text()) if file.exists() else {}
+            self._collections[name] = docs
+        return docs
+
+    def flush(self):
+        with self._lock:
+            for name in list(self._dirty):
+                file = self.root / "firestore" / f"{name}.json"
+                file.parent.mkdir(parents=True, exist_ok=True)
+                file.write_text(json.dumps(self._collections[name]))
+            self._dirty.clear()
+
+    def read_blob(self, path):
+        try:
+            return self._blob_file(path).read_bytes()
+        except FileNotFoundError as e:
+            raise BlobNotFound(path) from e
+
+    def blob_exists(self, path):
+        return self._blob_file(path).exists()
+
+    def blob_matches(self, path, payload, content_encoding=None):
+        # Local files are stored exactly as given, so the bytes decide.
+        try:
+            return md5_base64(self.read_blob(path)) == md5_base64(payload)
+        except BlobNotFound:
+            return False
+
+    def write_blob(self, path, payload, content_type="application/json",
+                   content_encoding=None, cache_control=None):
+        file = self._blob_file(path)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = file.with_name(file.name + ".tmp")
+        tmp.write_bytes(payload)
+        tmp.replace(file)
+
+    def copy_blob(self, source_path, destination_path):
+        self.write_blob(destination_path, self.read_blob(source_path))
+
+    def list_blobs(self, prefix):
+        blobs = self.root / "blobs"
+        if not blobs.exists():
+            return []
+        paths = (file.relative_to(blobs).as_posix() for file in blobs.rglob("*") if file.is_file())
+        return sorted(path for path in paths if path.startswith(prefix) and not path.endswith(".tmp"))
+
+    def delete_blobs(self, paths):
+        for path in paths:
+            self._blob_file(path).unlink(missing_ok=True)
+
+    def list_facets(self, collection, limit=500):
+        with self._lock:
+            docs = list(self._collection(collection).items())
+        docs.sort(key=lambda item: item[1].get("coursesCounter") or 0, reverse=True)
+        return [(doc_id, dict(data)) for doc_id, data in docs[:limit]]
+
+    def adjust_facet_counter(self, collection, facet_id, name, delta):
+        with self._lock:
+            docs = self._collection(collection)
+            doc = docs.get(facet_id)
+            if doc is None:
+                if delta <= 0:
+                    return False
+                docs[facet_id] = {"name": name, "coursesCounter": delta}
+            else:
+                doc["coursesCounter"] = max(0, (doc.get("coursesCounter") or 0) + delta)
+            self._dirty.add(collection)
+        return True
+
+    def read_document(self, collection, doc_id):
+        with self._lock:
+            doc = self._collection(collection).get(doc_id)
+        return json.loads(json.dumps(doc)) if doc is not None else None
+
+    def write_document(self, collection, doc_id, data):
+        with self._lock:
+            self._collection(collection)[doc_id] = json.loads(json.dumps(data))
+            self._dirty.add(collection)
+
+    def write_courses(self, courses):
+        with self._lock:
+            docs = self._collection("courses")
+            written = 0
+            for course in courses:
+                if not course.get("id"):
+                    print("Course data is missing 'id' field:", course)
+                    continue
+                docs[str(course["id"])] = course
+                written += 1
+            self._dirty.add("courses")
+        return written
+
+
+@memoized
+def get_backend():
+    kind = os.environ.get("DATA_BACKEND", "firebase").lower()
+    if kind == "local":
+        return LocalBackend(os.environ.get("LOCAL_DATA_DIR", REPO_ROOT / ".local_data"))
+    if kind == "firebase":
+        return FirebaseBackend()
+    raise ValueError(f"Unknown DATA_BACKEND {kind!r}, expected 'firebase' or 'local'")
@@ -0,0 +1,134 @@
+"""Per-request timing spans for the Cloud Functions.
+
+Handlers and triggers are wrapped with :func:`instrument_http` or
+:func:`instrument_trigger`. Code running inside them records named spans with
+``with span("scoring"):`` and cache outcomes with ``flag("catalog_cache", "hit")``.
+At the end of the request the spans are emitted as a ``Server-Timing`` header
+(HTTP functions only) and as a single structured JSON log line, which Cloud
+Logging parses into ``jsonPayload`` for per-stage latency dashboards.
+
+``LOG_LEVEL`` controls verbosity; debug output such as search terms and raw
+matches is only written at ``DEBUG``.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("functions")
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+_current = contextvars.ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """Spans and flags collected while one request or trigger runs."""
+
+    def __init__(self, function):
+        self.function = function
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.flags = {}
+
+    def add(self, name, duration_ms):
+        entry = self.spans.setdefault(name, {"ms": 0.0, "count": 0})
+        entry["ms"] += duration_ms
+        entry["count"] += 1
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms):
+        parts = [f"{name};dur={entry['ms']:.1f}" for name, entry in self.spans.items()]
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+    def log_record(self, total_ms, **extra):
+        return {
+            "severity": "INFO",
+            "message": f"{self.function} finished in {total_ms:.1f} ms",
+            "function": self.function,
+            "total_ms": round(total_ms, 3),
+            "spans": {
+                name: {"ms": round(entry["ms"], 3), "count": entry["count"]}
+                for name, entry in self.spans.items()
+            },
+            "flags": self.flags,
+            **extra,
+        }
+
+
+@contextmanager
+def span(name):
+    """Time a block and add it to the current request's spans (no-op outside one)."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, (time.perf_counter() - start) * 1000)
+
+
+def flag(name, value):
+    """Attach a flag such as a cache hit/miss to the current request's log line."""
+    timing = _current.get()
+    if timing is not None:
+        timing.flags[name] = value
+
+
+def _emit(record):
+    logger.info(json.dumps(record))
+
+
+def instrument_http(fn):
+    """Time an HTTP handler and report its spans in a Server-Timing header and log line."""
+
+    @functools.wraps(fn)
+    def handler(request, *args, **kwargs):
+        timing = RequestTiming(fn.__name__)
+        token = _current.set(timing)
+        status = 500
+        try:
+            response = fn(request, *args, **kwargs)
+            status = response.status_code
+            total_ms = timing.total_ms()
+            response.headers["Server-Timing"] = timing.server_timing(total_ms)
+            response.headers["Timing-Allow-Origin"] = "*"
+            return response
+        finally:
+            _current.reset(token)
+            _emit(timing.log_record(timing.total_ms(), status=status, method=request.method))
+
+    return handler
+
+
+def instrument_trigger(fn):
+    """Time a Firestore trigger and report its spans in a structured log line."""
+
+    @functools.wraps(fn)
+    def handler(event, *args, **kwargs):
+        timing = RequestTiming(fn.__name__)
+        token = _current.set(timing)
+        outcome = "error"
+        try:
+            result = fn(event, *args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            _current.reset(token)
+            _emit(timing.log_record(timing.total_ms(), outcome=outcome))
+
+    return handler
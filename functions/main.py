@@ -1,7 +1,4 @@
-from fuzzywuzzy import process
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
-from firebase_functions import https_fn
+from firebase_functions import https_fn, scheduler_fn
 from firebase_functions.firestore_fn import (
     on_document_created,
     on_document_updated,
@@ -10,16 +7,36 @@ from firebase_functions.firestore_fn import (
     Change,
     DocumentSnapshot,
 )
-from google.cloud.firestore_v1.services.firestore import FirestoreClient
-from google.cloud.firestore_v1.services.firestore.transports import (
-    FirestoreGrpcTransport,
-)
-from google.api_core.exceptions import NotFound
-from flask_cors import cross_origin
 
-import grpc
+import functools
 import json
 import os
+import re
+
+import catalog
+from catalog_stats import write_stats
+from data_backend import get_backend
+from instrumentation import flag, instrument_http, instrument_trigger, logger, span
+from profiling import profiled
+from shared_cache import SharedCache
+
+# Heavy dependencies (firebase_admin, the Firestore gRPC channel, fuzzywuzzy,
+# flask_cors) are imported or constructed on first use, so each function only
+# pays for what it touches. The counter triggers never import fuzzywuzzy.
+# Storage and Firestore are reached through data_backend (DATA_BACKEND=local
+# runs everything against files for offline benchmarks).
+#
+# The search functions handle up to SEARCH_CONCURRENCY requests at once per
+# instance on SEARCH_CPU vCPUs (concurrency above 1 needs at least one full
+# vCPU). Fuzzy matching is CPU-bound and holds the GIL, so extra requests on
+# one core only queue: benchmarks/load_test.py shows no throughput gain from
+# 1 to 4 in flight, while tail latency grows with every queued request. A small
+# concurrency still overlaps the Storage waits of cold shards and saves
+# instances; raise both values together. Everything the requests share -- the
+# catalog snapshot, its indexes and the facet lists -- is read-only once
+# published and rebuilt under per-key locks, see catalog and shared_cache.
+SEARCH_CONCURRENCY = int(os.environ.get("SEARCH_CONCURRENCY", "4"))
+SEARCH_CPU = int(os.environ.get("SEARCH_CPU", "1"))
 
 PLURALS = {
     "discipline": "disciplines",
@@ -30,328 +47,314 @@ PLURALS = {
     "language": "languages",
 }
 
-env = "development"
-if env == "development":
-    cred = credentials.Certificate("../dev_firebase_config.json")
-    firebase_app = firebase_admin.initialize_app(
-        cred, {"storageBucket": "guidauniversitaria.appspot.com"}
-    )
-    os.environ["STORAGE_EMULATOR_HOST"] = "http://127.0.0.1:9199"
-    db = firestore.client(app=firebase_app)
+FACET_ID_PATTERN = re.compile(r"^[a-z0-9_]+$")
 
-    # Create a channel and transport for Firestore client
-    channel = grpc.insecure_channel("localhost:8080")
-    transport = FirestoreGrpcTransport(channel=channel)
-    db._firestore_api_internal = FirestoreClient(transport=transport)
+# Facet lists change only when the pipeline runs; each instance re-reads a
+# collection at most every FACET_CACHE_TTL seconds.
+FACET_CACHE_TTL = float(os.environ.get("FACET_CACHE_TTL", "60"))
+_facet_items = SharedCache(ttl=FACET_CACHE_TTL)
 
+# How often refresh_catalog_stats rewrites the stats/catalog document.
+STATS_SCHEDULE = "every 6 hours"
 
-# Function to load courses from Firebase Storage
-def load_courses_from_storage():
-    bucket = storage.bucket()
-    blob = bucket.blob("all_courses_data.json")
+# Start loading the catalog while the instance boots, so the first search
+# finds it ready instead of downloading it inline.
+if os.environ.get("CATALOG_PREWARM", "").lower() in ("1", "true", "yes"):
+    catalog.prewarm()
 
-    try:
-        json_data = blob.download_as_text()
-        all_courses = json.loads(json_data)["courses"]
-    except NotFound:
-        print("File not found. Creating a new file or returning default data.")
-        # You can create a default file or return default data here
-        all_courses = []
 
-    return all_courses
+def cross_origin(**options):
+    """flask_cors.cross_origin, imported on the first request instead of at import time."""
+
+    def decorator(fn):
+        wrapped = []
+
+        @functools.wraps(fn)
+        def handler(*args, **kwargs):
+            if not wrapped:
+                from flask_cors import cross_origin as flask_cross_origin
+
+                wrapped.append(flask_cross_origin(**options)(fn))
+            return wrapped[0](*args, **kwargs)
+
+        return handler
+
+    return decorator
+
+
+def load_courses_for_request(request):
+    """Return the catalog index covering the facet filters in the request.
+
+    Filtered requests are answered from the matching shard unless the full
+    catalog is already in memory on this instance.
+    """
+    filters = {}
+    for facet in catalog.SHARD_FACETS:
+        facet_id = (request.args.get(facet, "") or "").lower()
+        if facet_id and FACET_ID_PATTERN.match(facet_id):
+            filters[facet] = facet_id
+    snapshot = catalog.get_snapshot()
+    flag("catalog_cache", "hit" if snapshot.is_loaded(filters) else "miss")
+    flag("catalog_generation", snapshot.generation)
+    return snapshot.select(filters)
+
+
+def load_facet_items(collection_name):
+    items = []
+    for doc_id, data in get_backend().list_facets(collection_name, limit=500):
+        name = (data.get("name") or "").strip()
+        if not name:
+            continue
+        items.append({"docId": doc_id, "name": name, "coursesCounter": data.get("coursesCounter", 0)})
+    return tuple(items)
+
+
+def fetch_facet_items(collection_name):
+    """Named facet documents of a collection, most courses first when the index allows.
+
+    Shared by all requests on the instance; callers must not mutate the items.
+    """
+    flag("facet_cache", "hit" if collection_name in _facet_items else "miss")
+    return _facet_items.get(collection_name, lambda: load_facet_items(collection_name))
+
+
+def match_facet_items(term, items):
+    from fuzzywuzzy import process
+
+    with span("candidates"):
+        matches = process.extract(term, [it["name"] for it in items], limit=20)
+    logger.debug("matches for %r: %s", term, matches)
+
+    with span("scoring"):
+        seen = set()
+        results = []
+        for nm, score in matches:
+            if score < 50:
+                continue
+            # find first item with this name
+            for it in items:
+                if it["name"] == nm and it["docId"] not in seen:
+                    results.append(it)
+                    seen.add(it["docId"])
+                    break
+    return results
+
 
+def json_response(payload):
+    with span("serialize"):
+        body = json.dumps(payload)
+    return https_fn.Response(body, status=200, content_type="application/json")
 
-@https_fn.on_request()
+
+@https_fn.on_request(concurrency=SEARCH_CONCURRENCY, cpu=SEARCH_CPU)
 @cross_origin(
     origins=["http://localhost:3000", "http://127.0.0.1:3000"],
     methods=["GET", "OPTIONS"]
 )
+@instrument_http
+@profiled
 def search_courses(request: https_fn.Request) -> https_fn.Response:
-    all_courses = load_courses_from_storage()
+    from fuzzywuzzy import process
+
+    with span("catalog"):
+        index = load_courses_for_request(request)
     term = request.args.get("term", "").lower()
-    print(term)
+    logger.debug("search_courses term=%r", term)
 
     if not term:
         # If no search term, return all courses (or first 20 if you prefer)
-        return https_fn.Response(
-            json.dumps(all_courses[:20]), status=200, content_type="application/json"
-        )
+        return json_response(index.courses[:20])
 
     # Perform fuzzy search
-    course_names = [course["nomeCorso"] for course in all_courses]
-    fuzzy_matches = process.extract(
-        term, course_names, limit=20
-    )  # Increase limit to ensure we get enough unique results
+    with span("candidates"):
+        fuzzy_matches = process.extract(
+            term, index.names, limit=20
+        )  # Increase limit to ensure we get enough unique results
 
     # Get the matching courses
-    print(fuzzy_matches)
-    results = []
-    seen_ids = set()  # To keep track of unique course IDs
-    for match in fuzzy_matches:
-        course_name, score = match
-        if score > 50:  # You can adjust this threshold
-            matching_course = next(
-                course for course in all_courses if course["nomeCorso"] == course_name
-            )
-            if (
-                matching_course["id"] not in seen_ids
-            ):  # Check if we've already added this course
-                results.append(matching_course)
-                seen_ids.add(matching_course["id"])
-
-        if len(results) == 20:  # Stop once we have 20 unique results
-            break
-
-    # Sort results by score (highest first)
-    results.sort(
-        key=lambda x: process.extractOne(term, [x["nomeCorso"]])[1], reverse=True
-    )
-    print(results)
-
-    return https_fn.Response(
-        json.dumps(results), status=200, content_type="application/json"
-    )
-
-
-@https_fn.on_request()
+    logger.debug("search_courses matches=%s", fuzzy_matches)
+    with span("scoring"):
+        scored = []
+        seen_ids = set()  # To keep track of unique course IDs
+        for match in fuzzy_matches:
+            course_name, score = match
+            if score > 50:  # You can adjust this threshold
+                matching_course = index.course_named(course_name)
+                if (
+                    matching_course["id"] not in seen_ids
+                ):  # Check if we've already added this course
+                    scored.append((score, matching_course))
+                    seen_ids.add(matching_course["id"])
+
+            if len(scored) == 20:  # Stop once we have 20 unique results
+                break
+
+        # Sort results by score (highest first); the match score is the same
+        # WRatio score a fresh extractOne on the name would give.
+        scored.sort(key=lambda item: item[0], reverse=True)
+        results = [course for _, course in scored]
+    logger.debug("search_courses results=%s", [course["id"] for course in results])
+
+    return json_response(results)
+
+
+@https_fn.on_request(concurrency=SEARCH_CONCURRENCY, cpu=SEARCH_CPU)
 @cross_origin(
     origins=["http://localhost:3000", "http://127.0.0.1:3000"],
     methods=["GET", "OPTIONS"],
 )
+@instrument_http
+@profiled
 def search_universities(request: https_fn.Request) -> https_fn.Response:
     term = (request.args.get("term", "") or "").lower()
     if not term:
-        return https_fn.Response(json.dumps([]), status=200, content_type="application/json")
+        return json_response([])
 
     try:
-        # Prefer ordering by coursesCounter if index exists; fallback to full scan
-        try:
-            docs = list(
-                db.collection("universities")
-                .order_by("coursesCounter", direction=firestore.Query.DESCENDING)
-                .limit(500)
-                .stream()
-            )
-        except Exception:
-            docs = list(db.collection("universities").stream())
-
-        items = []
-        names = []
-        for d in docs:
-            data = d.to_dict() or {}
-            name = (data.get("name") or "").strip()
-            if not name:
-                continue
-            items.append({"docId": d.id, "name": name, "coursesCounter": data.get("coursesCounter", 0)})
-            names.append(name)
-
-        matches = process.extract(term, names, limit=20)
-        seen = set()
-        results = []
-        for nm, score in matches:
-            if score < 50:
-                continue
-            # find first item with this name
-            for it in items:
-                if it["name"] == nm and it["docId"] not in seen:
-                    results.append(it)
-                    seen.add(it["docId"])
-                    break
-
-        return https_fn.Response(json.dumps(results), status=200, content_type="application/json")
+        with span("firestore"):
+            items = fetch_facet_items("universities")
+        return json_response(match_facet_items(term, items))
     except Exception as e:
-        return https_fn.Response(json.dumps([]), status=200, content_type="application/json")
+        logger.warning("search_universities failed for %r: %s", term, e)
+        return json_response([])
 
 
-@https_fn.on_request()
+@https_fn.on_request(concurrency=SEARCH_CONCURRENCY, cpu=SEARCH_CPU)
 @cross_origin(
     origins=["http://localhost:3000", "http://127.0.0.1:3000"],
     methods=["GET", "OPTIONS"],
 )
+@instrument_http
+@profiled
 def search_locations(request: https_fn.Request) -> https_fn.Response:
     term = (request.args.get("term", "") or "").lower()
     if not term:
-        return https_fn.Response(json.dumps([]), status=200, content_type="application/json")
+        return json_response([])
 
     try:
-        try:
-            docs = list(
-                db.collection("locations")
-                .order_by("coursesCounter", direction=firestore.Query.DESCENDING)
-                .limit(500)
-                .stream()
-            )
-        except Exception:
-            docs = list(db.collection("locations").stream())
-
-        items = []
-        names = []
-        for d in docs:
-            data = d.to_dict() or {}
-            name = (data.get("name") or "").strip()
-            if not name:
-                continue
-            items.append({"docId": d.id, "name": name, "coursesCounter": data.get("coursesCounter", 0)})
-            names.append(name)
+        with span("firestore"):
+            items = fetch_facet_items("locations")
+        return json_response(match_facet_items(term, items))
+    except Exception as e:
+        logger.warning("search_locations failed for %r: %s", term, e)
+        return json_response([])
 
-        matches = process.extract(term, names, limit=20)
-        seen = set()
-        results = []
-        for nm, score in matches:
-            if score < 50:
-                continue
-            for it in items:
-                if it["name"] == nm and it["docId"] not in seen:
-                    results.append(it)
-                    seen.add(it["docId"])
-                    break
 
-        return https_fn.Response(json.dumps(results), status=200, content_type="application/json")
-    except Exception:
-        return https_fn.Response(json.dumps([]), status=200, content_type="application/json")
+FACET_FIELDS = [
+    "discipline",
+    "university",
+    "location",
+    "degree_type",
+    "program_type",
+    "language",
+]
+
+
+def valid_facet(field_data):
+    return bool(field_data and isinstance(field_data, dict) and field_data.get("id"))
+
+
+def adjust_counter(field, field_data, delta):
+    """Move a facet's coursesCounter by ``delta``; returns False if a decremented facet was missing."""
+    collection_name = PLURALS.get(field, f"{field}s")
+    with span("firestore"):
+        return get_backend().adjust_facet_counter(
+            collection_name, field_data["id"], field_data.get("name"), delta
+        )
+
 
 @on_document_created(document="courses/{courseId}")
+@instrument_trigger
+@profiled
 def increment_course_counters_on_create(event: Event[DocumentSnapshot]) -> None:
     course = event.data.to_dict()
     if not course:
-        print("Warning: Empty course document created")
+        logger.warning("Empty course document created")
         return
 
-    # List of fields to update counters for
-    fields = [
-        "discipline",
-        "university",
-        "location",
-        "degree_type",
-        "program_type",
-        "language",
-    ]
-
-    for field in fields:
+    for field in FACET_FIELDS:
         field_data = course.get(field)
-        if field_data and isinstance(field_data, dict) and field_data.get("id") and field_data.get("name"):
-            collection_name = PLURALS.get(field, f"{field}s")
-            field_ref = db.collection(collection_name).document(field_data["id"])
-            
+        if valid_facet(field_data) and field_data.get("name"):
             try:
-                doc_snapshot = field_ref.get()
-                if doc_snapshot.exists:
-                    current_count = doc_snapshot.get("coursesCounter") or 0
-                    field_ref.update({"coursesCounter": current_count + 1})
-                else:
-                    # Document does not exist, create it
-                    field_ref.set({"name": field_data["name"], "coursesCounter": 1})
+                adjust_counter(field, field_data, 1)
             except Exception as e:
-                print(f"Error updating {field} counter for {field_data['name']}: {e}")
+                logger.error("Error updating %s counter for %s: %s", field, field_data["name"], e)
         elif field_data:
-            print(f"Warning: Invalid {field} data structure in course document: {field_data}")
+            logger.warning("Invalid %s data structure in course document: %s", field, field_data)
 
 
 @on_document_updated(document="courses/{courseId}")
+@instrument_trigger
+@profiled
 def update_course_counters_on_update(event: Event[Change[DocumentSnapshot]]) -> None:
     before_course = event.data.before.to_dict() if event.data.before else {}
     after_course = event.data.after.to_dict() if event.data.after else {}
 
-    fields = [
-        "discipline",
-        "university",
-        "location",
-        "degree_type",
-        "program_type",
-        "language",
-    ]
-
-    for field in fields:
+    for field in FACET_FIELDS:
         before_field = before_course.get(field)
         after_field = after_course.get(field)
 
         # Only update the counters if the field has changed
-        if before_field != after_field:
-            collection_name = PLURALS.get(field, f"{field}s")
-
-            # Handle counter updates in a single transaction when possible
-            if (before_field and isinstance(before_field, dict) and before_field.get("id") and 
-                after_field and isinstance(after_field, dict) and after_field.get("id")):
-                
-                # Both fields exist - update both in transaction
-                before_ref = db.collection(collection_name).document(before_field["id"])
-                after_ref = db.collection(collection_name).document(after_field["id"])
-                
-                try:
-                    # Decrement old counter
-                    before_doc = before_ref.get()
-                    if before_doc.exists:
-                        before_count = before_doc.get("coursesCounter") or 0
-                        new_count = max(0, before_count - 1)  # Prevent negative counts
-                        before_ref.update({"coursesCounter": new_count})
-                    
-                    # Increment new counter
-                    after_doc = after_ref.get()
-                    if after_doc.exists:
-                        after_count = after_doc.get("coursesCounter") or 0
-                        after_ref.update({"coursesCounter": after_count + 1})
-                    else:
-                        after_ref.set({"name": after_field["name"], "coursesCounter": 1})
-                except Exception as e:
-                    print(f"Error updating {field} counters: {e}")
-            
-            else:
-                # Handle single field updates
-                if before_field and isinstance(before_field, dict) and before_field.get("id"):
-                    field_ref = db.collection(collection_name).document(before_field["id"])
-                    try:
-                        doc = field_ref.get()
-                        if doc.exists:
-                            current_count = doc.get("coursesCounter") or 0
-                            new_count = max(0, current_count - 1)
-                            field_ref.update({"coursesCounter": new_count})
-                    except Exception as e:
-                        print(f"Error decrementing {field} counter: {e}")
-
-                if after_field and isinstance(after_field, dict) and after_field.get("id") and after_field.get("name"):
-                    field_ref = db.collection(collection_name).document(after_field["id"])
-                    try:
-                        doc = field_ref.get()
-                        if doc.exists:
-                            current_count = doc.get("coursesCounter") or 0
-                            field_ref.update({"coursesCounter": current_count + 1})
-                        else:
-                            field_ref.set({"name": after_field["name"], "coursesCounter": 1})
-                    except Exception as e:
-                        print(f"Error incrementing {field} counter: {e}")
+        if before_field == after_field:
+            continue
+
+        if valid_facet(before_field) and valid_facet(after_field):
+            try:
+                adjust_counter(field, before_field, -1)
+                # As on create, a facet without a name is never counted.
+                if after_field.get("name"):
+                    adjust_counter(field, after_field, 1)
+            except Exception as e:
+                logger.error("Error updating %s counters: %s", field, e)
+            continue
+
+        # Handle single field updates
+        if valid_facet(before_field):
+            try:
+                adjust_counter(field, before_field, -1)
+            except Exception as e:
+                logger.error("Error decrementing %s counter: %s", field, e)
+
+        if valid_facet(after_field) and after_field.get("name"):
+            try:
+                adjust_counter(field, after_field, 1)
+            except Exception as e:
+                logger.error("Error incrementing %s counter: %s", field, e)
 
 
 @on_document_deleted(document="courses/{courseId}")
+@instrument_trigger
+@profiled
 def decrement_course_counters_on_delete(event: Event[DocumentSnapshot]) -> None:
     course = event.data.to_dict()
     if not course:
-        print("Warning: Empty course document deleted")
+        logger.warning("Empty course document deleted")
         return
 
-    fields = [
-        "discipline",
-        "university",
-        "location",
-        "degree_type",
-        "program_type",
-        "language",
-    ]
-
-    for field in fields:
+    for field in FACET_FIELDS:
         field_data = course.get(field)
-        if field_data and isinstance(field_data, dict) and field_data.get("id"):
-            collection_name = PLURALS.get(field, f"{field}s")
-            field_ref = db.collection(collection_name).document(field_data["id"])
-            
+        if valid_facet(field_data):
             try:
-                doc_snapshot = field_ref.get()
-                if doc_snapshot.exists:
-                    current_count = doc_snapshot.get("coursesCounter") or 0
-                    new_count = max(0, current_count - 1)  # Prevent negative counts
-                    field_ref.update({"coursesCounter": new_count})
-                else:
-                    print(f"Warning: {field} document {field_data['id']} not found during delete")
+                if not adjust_counter(field, field_data, -1):
+                    logger.warning("%s document %s not found during delete", field, field_data["id"])
             except Exception as e:
-                print(f"Error decrementing {field} counter for {field_data.get('name', 'unknown')}: {e}")
+                logger.error("Error decrementing %s counter for %s: %s", field, field_data.get("name", "unknown"), e)
         elif field_data:
-            print(f"Warning: Invalid {field} data structure in deleted course document: {field_data}")
+            logger.warning("Invalid %s data structure in deleted course document: %s", field, field_data)
+
+
+@scheduler_fn.on_schedule(schedule=STATS_SCHEDULE)
+@instrument_trigger
+@profiled
+def refresh_catalog_stats(event: scheduler_fn.ScheduledEvent) -> None:
+    """Recompute the stats/catalog document from the catalog generation being served.
+
+    The pipeline already writes it on every upload; this keeps it correct
+    after a rollback or a publish that skipped the stats step.
+    """
+    snapshot = catalog.get_snapshot()
+    stats = write_stats(snapshot.courses().courses, snapshot.generation)
+    logger.info(
+        "Catalog stats refreshed for generation %s: %d courses",
+        snapshot.generation, stats["total_courses"],
+    )
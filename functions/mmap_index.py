@@ -0,0 +1,216 @@
+"""Catalog index in a single file that several processes map into memory.
+
+Used by the self-hosted search server (``server.py``): the master process
+writes one index file per catalog generation and every worker maps it
+read-only, so the course documents live once in the page cache instead of
+once per worker. Workers only materialize the course names fuzzy matching
+needs and decode a course's JSON when it is returned.
+
+File layout (integers little-endian, sections 8-byte aligned)::
+
+    magic "GUCIDX01" | uint64 meta length | meta JSON | padding
+    name ids   uint32[count]      index into meta["names"] per course
+    offsets    uint64[count + 1]  start of each course in the courses section
+    postings   uint32[...]        course positions per facet id, ascending
+    courses    concatenated UTF-8 JSON documents
+
+``meta`` holds the generation, the course count, the distinct course names,
+the section offsets and, per facet id, the ``[start, count]`` of its postings.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from catalog import SHARD_FACETS, FILTER_CACHE_SIZE
+from shared_cache import SharedCache
+
+MAGIC = b"GUCIDX01"
+HEADER = struct.Struct("<8sQ")
+
+
+def _aligned(size):
+    return (size + 7) & ~7
+
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_index(courses, path, generation):
+    """Write the index file for ``courses`` atomically to ``path``."""
+    names = []
+    name_numbers = {}
+    name_ids = array("I")
+    offsets = array("Q", [0])
+    blobs = []
+    postings = {facet: {} for facet in SHARD_FACETS}
+    size = 0
+    for position, course in enumerate(courses):
+        name = course["nomeCorso"]
+        if name not in name_numbers:
+            name_numbers[name] = len(names)
+            names.append(name)
+        name_ids.append(name_numbers[name])
+        blob = json.dumps(course, ensure_ascii=False).encode()
+        blobs.append(blob)
+        size += len(blob)
+        offsets.append(size)
+        for facet in SHARD_FACETS:
+            facet_id = (course.get(facet) or {}).get("id")
+            if facet_id:
+                postings[facet].setdefault(facet_id, []).append(position)
+
+    posting_values = array("I")
+    facets = {}
+    for facet, by_id in postings.items():
+        facets[facet] = {}
+        for facet_id, positions in sorted(by_id.items()):
+            facets[facet][facet_id] = [len(posting_values), len(positions)]
+            posting_values.extend(positions)
+
+    sections = [
+        ("name_ids", _little_endian(name_ids)),
+        ("offsets", _little_endian(offsets)),
+        ("postings", _little_endian(posting_values)),
+        ("courses", b"".join(blobs)),
+    ]
+    meta = {"generation": generation, "count": len(name_ids), "names": names, "facets": facets}
+    # Section offsets depend on the meta length, which depends on the offsets;
+    # reserve room for them first, then fill them in.
+    meta["sections"] = {name: [0, len(payload)] for name, payload in sections}
+    meta_length = len(json.dumps(meta).encode()) + 32 * len(sections)
+    position = _aligned(HEADER.size + meta_length)
+    for name, payload in sections:
+        meta["sections"][name] = [position, len(payload)]
+        position = _aligned(position + len(payload))
+    meta_raw = json.dumps(meta).encode().ljust(meta_length)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, meta_length))
+        f.write(meta_raw)
+        for name, payload in sections:
+            f.seek(meta["sections"][name][0])
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class IndexFile:
+    """A mapped index file; sections are zero-copy views into the mapping."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, meta_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog index file")
+        meta = json.loads(self._map[HEADER.size:HEADER.size + meta_length])
+        self.generation = meta["generation"]
+        self.count = meta["count"]
+        self.names = meta["names"]
+        self.facets = meta["facets"]
+        view = memoryview(self._map)
+
+        def section(name, fmt):
+            start, length = meta["sections"][name]
+            part = view[start:start + length]
+            return part.cast(fmt) if sys.byteorder == "little" else _native(part, fmt)
+
+        self.name_ids = section("name_ids", "I")
+        self.offsets = section("offsets", "Q")
+        self.postings = section("postings", "I")
+        self.courses_start = meta["sections"]["courses"][0]
+
+    def course(self, position):
+        start = self.courses_start + self.offsets[position]
+        end = self.courses_start + self.offsets[position + 1]
+        return json.loads(self._map[start:end])
+
+    def positions(self, facet, facet_id):
+        start, count = self.facets.get(facet, {}).get(facet_id, (0, 0))
+        return self.postings[start:start + count]
+
+
+def _native(part, fmt):
+    values = array(fmt, part.tobytes())
+    values.byteswap()
+    return values
+
+
+class CourseView:
+    """Read-only sequence of the courses at some positions, decoded on access."""
+
+    def __init__(self, file, positions):
+        self._file = file
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._file.course(p) for p in self._positions[item]]
+        return self._file.course(self._positions[item])
+
+
+class MappedIndex:
+    """The :class:`catalog.CatalogIndex` interface over a mapped index file."""
+
+    def __init__(self, file, positions=None):
+        self._file = file
+        self._positions = range(file.count) if positions is None else positions
+        self.courses = CourseView(file, self._positions)
+        # Name strings are shared with the file's name table, so this costs a
+        # pointer per course rather than a string.
+        names = file.names
+        self.names = tuple(names[file.name_ids[p]] for p in self._positions)
+        self.first_by_name = {}
+        for position, name in enumerate(self.names):
+            self.first_by_name.setdefault(name, position)
+        self._filtered = SharedCache(max_entries=FILTER_CACHE_SIZE)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def course_named(self, name):
+        return self.courses[self.first_by_name[name]]
+
+    def filtered(self, filters):
+        return self._filtered.get(tuple(sorted(filters.items())), lambda: self._build_filtered(filters))
+
+    def _build_filtered(self, filters):
+        positions = None
+        for facet, facet_id in filters.items():
+            matching = set(self._file.positions(facet, facet_id))
+            positions = matching if positions is None else positions & matching
+        if positions and not isinstance(self._positions, range):
+            positions &= set(self._positions)
+        return MappedIndex(self._file, tuple(sorted(positions or ())))
+
+
+class MappedSnapshot:
+    """A catalog snapshot served entirely from an index file; nothing is loaded lazily."""
+
+    def __init__(self, path):
+        self.path = path
+        self._full = MappedIndex(IndexFile(path))
+        self.generation = self._full._file.generation
+
+    full_loaded = True
+
+    def courses(self):
+        return self._full
+
+    def is_loaded(self, filters):
+        return True
+
+    def select(self, filters):
+        return self._full.filtered(filters) if filters else self._full
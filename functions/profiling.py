@@ -0,0 +1,187 @@
+"""Opt-in, sampled profiling for function handlers and triggers.
+
+A wrapped call is profiled when either:
+
+* a random draw falls under ``PROFILE_SAMPLE_RATE`` (0 disables, 1 profiles
+  every call), or
+* an HTTP request carries a valid ``X-Profile`` header of the form
+  ``<unix timestamp>.<hex HMAC-SHA256 of "<function>:<timestamp>">`` signed
+  with ``PROFILE_SECRET`` and at most five minutes old.
+
+``PROFILE_MODE`` selects ``cprofile`` (deterministic, written as ``.pstats``)
+or ``sample`` (a stack sampler every ``PROFILE_INTERVAL_MS``, written in the
+collapsed-stack ``.folded`` format that flame graph tools read); any other
+value logs a warning and disables profiling.
+``PROFILE_OUTPUT`` is a local directory (default ``/tmp/profiles``) or a
+``gs://bucket/prefix`` location.
+"""
+
+import cProfile
+import functools
+import hashlib
+import hmac
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from instrumentation import flag, logger
+
+SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+SECRET = os.environ.get("PROFILE_SECRET", "")
+MODE = os.environ.get("PROFILE_MODE", "cprofile")
+INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+OUTPUT = os.environ.get("PROFILE_OUTPUT", "/tmp/profiles")
+HEADER = "X-Profile"
+MAX_SIGNATURE_AGE = 300
+MODES = ("cprofile", "sample")
+
+# A typo must not silently profile with another mode; profiling is off instead.
+if MODE not in MODES:
+    logger.warning(f"Unknown PROFILE_MODE {MODE!r}, expected one of {', '.join(MODES)}; profiling is disabled")
+
+# With concurrent requests on one instance only one cProfile run can be
+# active at a time (Python 3.12+ refuses a second one); calls sampled while
+# another is being profiled simply run unprofiled.
+_cprofile_lock = threading.Lock()
+
+
+def sign(function, timestamp, secret=SECRET):
+    """Signature expected in the X-Profile header; used by whoever requests a profile."""
+    message = f"{function}:{timestamp}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def header_requests_profile(function, header):
+    if not SECRET or not header or "." not in header:
+        return False
+    timestamp, signature = header.split(".", 1)
+    try:
+        age = abs(time.time() - int(timestamp))
+    except ValueError:
+        return False
+    return age <= MAX_SIGNATURE_AGE and hmac.compare_digest(signature, sign(function, timestamp))
+
+
+def should_profile(function, request=None):
+    if MODE not in MODES:
+        return False
+    headers = getattr(request, "headers", None)
+    if headers is not None and header_requests_profile(function, headers.get(HEADER)):
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, thread_id, interval_s):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def write_profile(name, write):
+    """Write a profile via ``write(path)`` to the local directory or storage prefix."""
+    if OUTPUT.startswith("gs://"):
+        from firebase_admin import storage
+        from clients import get_app
+
+        bucket_name, _, prefix = OUTPUT[len("gs://"):].partition("/")
+        with tempfile.TemporaryDirectory() as tmp:
+            local = Path(tmp) / name
+            write(local)
+            blob_name = f"{prefix.rstrip('/')}/{name}" if prefix else name
+            storage.bucket(bucket_name, app=get_app()).blob(blob_name).upload_from_filename(str(local))
+        return OUTPUT.rstrip("/") + "/" + name
+
+    directory = Path(OUTPUT)
+    directory.mkdir(parents=True, exist_ok=True)
+    write(directory / name)
+    return str(directory / name)
+
+
+def save_profile(name, write):
+    """:func:`write_profile`, logging instead of raising; returns None if it failed.
+
+    Profiling is opt-in diagnostics: a full disk or a storage error must not
+    replace the handler's response or hide its exception.
+    """
+    try:
+        return write_profile(name, write)
+    except Exception as e:
+        logger.warning(f"Could not write profile {name} to {OUTPUT}: {e}")
+        return None
+
+
+def profiled(fn):
+    """Run the wrapped handler or trigger under a profiler when sampled or requested."""
+
+    @functools.wraps(fn)
+    def handler(*args, **kwargs):
+        function = fn.__name__
+        if not should_profile(function, args[0] if args else None):
+            return fn(*args, **kwargs)
+        if MODE != "sample" and not _cprofile_lock.acquire(blocking=False):
+            logger.info(f"Skipping profile of {function}, another call is being profiled")
+            return fn(*args, **kwargs)
+
+        profile_id = f"{function}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        if MODE == "sample":
+            sampler = StackSampler(threading.get_ident(), INTERVAL_MS / 1000)
+            sampler.start()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                sampler.stop()
+                location = save_profile(
+                    f"{profile_id}.folded", lambda path: path.write_text(sampler.collapsed())
+                )
+        else:
+            profiler = cProfile.Profile()
+            try:
+                result = profiler.runcall(fn, *args, **kwargs)
+            finally:
+                _cprofile_lock.release()
+                location = save_profile(
+                    f"{profile_id}.pstats", lambda path: profiler.dump_stats(str(path))
+                )
+
+        if location is None:
+            return result
+        logger.info(f"Wrote {MODE} profile of {function} to {location}")
+        flag("profile", location)
+        headers = getattr(result, "headers", None)
+        if headers is not None:
+            headers["X-Profile-Id"] = profile_id
+        return result
+
+    return handler
@@ -0,0 +1,206 @@
+"""Run the search functions as a self-hosted, pre-forked HTTP server.
+
+Outside Cloud Functions (for example next to the Next.js app, to avoid cold
+starts) the handlers in main.py can be served by this module:
+
+    python functions/server.py --workers 4 --port 8081
+
+The master process loads the current catalog generation once, writes it as a
+memory-mapped index file (see mmap_index) and forks the workers. Every worker
+accepts connections on the same listening socket and maps the same index
+file, so the catalog is held once in the page cache however many workers
+run, and throughput grows with the number of cores instead of being bound to
+one interpreter's GIL.
+
+The master polls the catalog pointer every ``CATALOG_POLL_INTERVAL`` seconds
+(or on SIGHUP), writes the new generation's index file and sends SIGHUP to
+the workers, which swap to it between requests. Workers that exit are
+replaced. SIGTERM or SIGINT stops the master and its workers.
+
+Functions are served at ``/<function name>``, as the emulator does.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import catalog
+from instrumentation import logger
+from mmap_index import MappedSnapshot, write_index
+
+SEARCH_FUNCTIONS = ("search_courses", "search_universities", "search_locations")
+CURRENT_INDEX = "current.idx"
+# Index files kept besides the current one, for workers still swapping.
+KEEP_INDEXES = 2
+
+
+def build_index(index_dir, generation):
+    """Write ``generation``'s index file and point current.idx at it."""
+    courses = catalog.load_courses(catalog.catalog_path(generation))
+    path = index_dir / f"index-{generation or 'legacy'}.idx"
+    write_index(courses, path, generation)
+
+    link = index_dir / f"{CURRENT_INDEX}.tmp"
+    if link.is_symlink() or link.exists():
+        link.unlink()
+    link.symlink_to(path.name)
+    os.replace(link, index_dir / CURRENT_INDEX)
+
+    older = sorted(
+        (p for p in index_dir.glob("index-*.idx") if p != path),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in older[KEEP_INDEXES:]:
+        # Workers still mapping an unlinked file keep reading it until they swap.
+        stale.unlink(missing_ok=True)
+    logger.info(f"Wrote search index for generation {generation} ({len(courses)} courses) to {path}")
+    return path
+
+
+def make_app(main):
+    import flask
+
+    app = flask.Flask("search_server")
+
+    def route(name):
+        def view():
+            return getattr(main, name)(flask.request)
+
+        view.__name__ = name
+        return view
+
+    for name in SEARCH_FUNCTIONS:
+        app.add_url_rule(f"/{name}", view_func=route(name), methods=["GET", "OPTIONS"])
+    app.add_url_rule("/healthz", "healthz", lambda: {"generation": catalog.get_snapshot().generation})
+    return app
+
+
+def run_worker(sock, index_dir):
+    """Serve requests on the inherited socket until terminated; runs in a forked child."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def load(*_):
+        snapshot = MappedSnapshot(str((index_dir / CURRENT_INDEX).resolve()))
+        catalog.serve_snapshot(snapshot)
+        logger.info(f"Worker {os.getpid()} serving generation {snapshot.generation}")
+
+    # Install the mapped snapshot before main is imported, so CATALOG_PREWARM
+    # never starts a download of its own.
+    load()
+    signal.signal(signal.SIGHUP, load)
+
+    import main
+    from werkzeug.serving import make_server
+
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, make_app(main), threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Self-hosted, multi-process search server")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8081, help="Port to listen on, 0 for any (default: 8081)")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--index-dir", type=Path, default=Path(tempfile.gettempdir()) / "search_index",
+        help="Directory for the memory-mapped index files",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    args.index_dir.mkdir(parents=True, exist_ok=True)
+
+    generation = catalog.target_generation()
+    build_index(args.index_dir, generation)
+
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    sock.set_inheritable(True)
+
+    workers = set()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(sock, args.index_dir)
+            except BaseException as e:
+                logger.error(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        workers.add(pid)
+
+    state = {"stop": False, "reload": False}
+
+    def stop(*_):
+        state["stop"] = True
+
+    def reload(*_):
+        state["reload"] = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, reload)
+
+    for _ in range(args.workers):
+        spawn()
+    host, port = sock.getsockname()[:2]
+    print(f"Listening on http://{host}:{port} with {args.workers} workers", flush=True)
+
+    next_poll = time.monotonic() + catalog.POLL_INTERVAL
+    while not state["stop"]:
+        while workers:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            workers.discard(pid)
+            if not state["stop"]:
+                logger.warning(f"Worker {pid} exited, starting a replacement")
+                spawn()
+
+        due = catalog.PIN_GENERATION is None and time.monotonic() >= next_poll
+        if state["reload"] or due:
+            forced, state["reload"] = state["reload"], False
+            next_poll = time.monotonic() + catalog.POLL_INTERVAL
+            try:
+                latest = catalog.target_generation()
+                if forced or latest != generation:
+                    build_index(args.index_dir, latest)
+                    generation = latest
+                    for pid in workers:
+                        os.kill(pid, signal.SIGHUP)
+            except Exception as e:
+                logger.warning(f"Index refresh failed, keeping generation {generation}: {e}")
+        time.sleep(0.5)
+
+    for pid in workers:
+        os.kill(pid, signal.SIGTERM)
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""A thread-safe, build-once cache shared by concurrent requests on an instance."""
+
+import threading
+import time
+
+
+class SharedCache:
+    """Map keys to values that are built at most once per key at a time.
+
+    Hits read the underlying dict without taking a lock. A miss takes a lock
+    for that key only, so a slow build (a shard download, a Firestore query)
+    never holds up requests for other keys, and concurrent requests for the
+    same key wait for one build instead of each running their own.
+
+    With ``ttl`` entries are rebuilt once older than that many seconds; with
+    ``max_entries`` the oldest entries are evicted first. Values are handed to
+    every caller as-is and must not be mutated.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        # Guards writes to _entries and _key_locks, never held during a build.
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _fresh(self, entry):
+        return self.ttl is None or time.monotonic() - entry[1] < self.ttl
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and self._fresh(entry)
+
+    def get(self, key, build):
+        """Return the cached value for ``key``, calling ``build()`` on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None and self._fresh(entry):
+            return entry[0]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry):
+                return entry[0]
+            value = build()
+            self.put(key, value)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.monotonic())
+            while self.max_entries and len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                del self._entries[oldest]
+                self._key_locks.pop(oldest, None)
+
+    def items(self):
+        """A point-in-time list of ``(key, value)`` pairs."""
+        with self._lock:
+            return [(key, entry[0]) for key, entry in self._entries.items()]
+
+    def keys(self):
+        return [key for key, _ in self.items()]
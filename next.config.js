@@ -15,6 +15,29 @@ module.exports = (phase, { defaultConfig }) => {
       domains: ["localhost", "picsum.photos", "via.placeholder.com"],
       remotePatterns: [{ protocol: "https", hostname: "cdn.sanity.io", port: "" }],
     },
+    async headers() {
+      return [
+        // Search shards are named after their content hash (pipelines/build_search_shards.py).
+        {
+          source: "/search/shards/:file*",
+          headers: [{ key: "Cache-Control", value: "public, max-age=31536000, immutable" }],
+        },
+        {
+          source: "/search/manifest.json",
+          headers: [{ key: "Cache-Control", value: "public, max-age=300, stale-while-revalidate=3600" }],
+        },
+        // Catalog bundles likewise (pipelines/build_static_bundles.py); the
+        // manifest rule comes last so it overrides the immutable one.
+        {
+          source: "/catalog/:file*",
+          headers: [{ key: "Cache-Control", value: "public, max-age=31536000, immutable" }],
+        },
+        {
+          source: "/catalog/manifest.json",
+          headers: [{ key: "Cache-Control", value: "public, max-age=300, stale-while-revalidate=3600" }],
+        },
+      ];
+    },
   };
 
   return nextConfig; // Return the combined configuration
@@ -0,0 +1,276 @@
+"""
+Build static autocomplete shards from processed course data.
+
+Every course, university and location becomes a suggestion entry. Entries are
+split into shards by the normalized two-letter prefix of each word in their
+title, so the frontend answers a query by fetching the one small shard for
+its first word. Output goes under public/search/:
+
+    manifest.json              prefix -> shard file, entry count and size
+    shards/<prefix>.<hash>.json
+
+Shard files are named after their content hash, so they can be cached
+forever by the CDN; only the manifest changes between builds.
+
+Shard format (kept compact, one shard per prefix):
+
+    labels    facet labels (university and location names) referenced by index
+    entries   [type, id, title] for "location"/"university",
+              [type, id, title, university label, location label] for "course";
+              ordered by rank: locations and universities by course count, then courses
+    terms     sorted normalized words starting with the prefix (stopwords excluded)
+    postings  per term, ascending entry indices, delta-encoded
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import re
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from unidecode import unidecode
+
+from catalog_format import load_catalog
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+PREFIX_LENGTH = 2
+FORMAT_VERSION = 1
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Articles and prepositions are not indexed (they would put most names in the
+# "de" and "di" shards); the frontend skips them in queries too, reading the
+# list from the manifest.
+STOPWORDS = sorted({
+    "a", "al", "alla", "con", "da", "dal", "degli", "dei", "del", "dell", "della", "delle",
+    "di", "e", "ed", "fra", "gli", "il", "in", "l", "la", "le", "lo", "per", "su", "tra",
+})
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse everything else to single spaces.
+
+    Mirrored by normalize() in src/lib/staticSearch.ts; keep them in sync.
+    """
+    return NON_ALNUM.sub(" ", unidecode(text or "").lower()).strip()
+
+
+def load_course_data(input_file: Path) -> list:
+    """Load processed course data from JSON file (full or normalized)."""
+    return load_catalog(input_file)
+
+
+def build_entries(courses: list) -> list:
+    """Suggestion entries in rank order, each as (type, id, title, university, location)."""
+    facet_counts = {"location": {}, "university": {}}
+    facet_names = {"location": {}, "university": {}}
+    for course in courses:
+        for facet in facet_counts:
+            data = course.get(facet) or {}
+            if data.get("id") and data.get("name"):
+                facet_counts[facet][data["id"]] = facet_counts[facet].get(data["id"], 0) + 1
+                facet_names[facet].setdefault(data["id"], data["name"])
+
+    entries = []
+    for facet in ("location", "university"):
+        ranked = sorted(facet_counts[facet].items(), key=lambda item: (-item[1], facet_names[facet][item[0]]))
+        for facet_id, _ in ranked:
+            entries.append((facet, facet_id, facet_names[facet][facet_id], None, None))
+
+    course_entries = []
+    for course in courses:
+        if not course.get("id") or not course.get("nomeCorso"):
+            continue
+        course_entries.append((
+            "course",
+            str(course["id"]),
+            course["nomeCorso"],
+            (course.get("university") or {}).get("name"),
+            (course.get("location") or {}).get("name"),
+        ))
+    course_entries.sort(key=lambda entry: (entry[2], entry[3] or "", entry[1]))
+    return entries + course_entries
+
+
+def partition(entries: list) -> dict:
+    """Map each two-letter prefix to ``{term: [entry positions]}``."""
+    shards = {}
+    stopwords = set(STOPWORDS)
+    for position, entry in enumerate(entries):
+        for term in set(normalize(entry[2]).split()):
+            if len(term) < PREFIX_LENGTH or term in stopwords:
+                continue
+            postings = shards.setdefault(term[:PREFIX_LENGTH], {}).setdefault(term, [])
+            postings.append(position)
+    return shards
+
+
+def encode_shard(prefix: str, terms: dict, entries: list) -> dict:
+    """The shard document for one prefix, with entries renumbered locally."""
+    positions = sorted({p for postings in terms.values() for p in postings})
+    local = {position: i for i, position in enumerate(positions)}
+
+    labels = []
+    label_numbers = {}
+
+    def label(name):
+        if name is None:
+            return -1
+        if name not in label_numbers:
+            label_numbers[name] = len(labels)
+            labels.append(name)
+        return label_numbers[name]
+
+    shard_entries = []
+    for position in positions:
+        kind, entry_id, title, university, location = entries[position]
+        if kind == "course":
+            shard_entries.append([kind, entry_id, title, label(university), label(location)])
+        else:
+            shard_entries.append([kind, entry_id, title])
+
+    sorted_terms = sorted(terms)
+    postings = []
+    for term in sorted_terms:
+        numbers = sorted(local[p] for p in terms[term])
+        postings.append([n - prev for n, prev in zip(numbers, [0] + numbers[:-1])])
+
+    return {
+        "v": FORMAT_VERSION,
+        "prefix": prefix,
+        "labels": labels,
+        "entries": shard_entries,
+        "terms": sorted_terms,
+        "postings": postings,
+    }
+
+
+def write_shards(shards: dict, entries: list, output_dir: Path, courses_count: int) -> dict:
+    """Write content-hashed shard files and the manifest; returns the manifest."""
+    shard_dir = output_dir / "shards"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / "manifest.json"
+    # Shards of the previous build stay until the next one, for clients that
+    # still hold the previous manifest.
+    previous = set()
+    if manifest_path.exists():
+        previous = {Path(s["file"]).name for s in json.loads(manifest_path.read_text())["shards"].values()}
+
+    manifest = {
+        "version": FORMAT_VERSION,
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "prefix_length": PREFIX_LENGTH,
+        "stopwords": STOPWORDS,
+        "courses": courses_count,
+        "entries": len(entries),
+        "shards": {},
+    }
+    written = set()
+    for prefix in sorted(shards):
+        document = encode_shard(prefix, shards[prefix], entries)
+        raw = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode()
+        name = f"{prefix}.{hashlib.sha256(raw).hexdigest()[:12]}.json"
+        path = shard_dir / name
+        if not path.exists():
+            path.write_bytes(raw)
+        written.add(name)
+        manifest["shards"][prefix] = {
+            "file": f"shards/{name}",
+            "entries": len(document["entries"]),
+            "bytes": len(raw),
+            "gzip_bytes": len(gzip.compress(raw, mtime=0)),
+        }
+
+    for stale in shard_dir.glob("*.json"):
+        if stale.name not in written | previous:
+            stale.unlink()
+
+    tmp = manifest_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, separators=(",", ":")))
+    tmp.replace(manifest_path)
+    return manifest
+
+
+def size_report(manifest: dict, build_seconds: float) -> dict:
+    shards = manifest["shards"].values()
+    raw = sorted(s["bytes"] for s in shards)
+    gz = sorted(s["gzip_bytes"] for s in shards)
+    return {
+        "build_seconds": round(build_seconds, 3),
+        "shards": len(raw),
+        "entries": manifest["entries"],
+        "bytes": {"total": sum(raw), "median": statistics.median(raw), "max": raw[-1]},
+        "gzip_bytes": {"total": sum(gz), "median": statistics.median(gz), "max": gz[-1]},
+        "largest": sorted(
+            ((prefix, s["gzip_bytes"]) for prefix, s in manifest["shards"].items()),
+            key=lambda item: -item[1],
+        )[:5],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build static autocomplete shards for the frontend'
+    )
+    parser.add_argument(
+        '--input',
+        type=Path,
+        default='pipelines/data/all_courses_data.json',
+        help='Input processed course data JSON file'
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=Path,
+        default='public/search',
+        help='Directory served as /search by Next.js'
+    )
+    parser.add_argument(
+        '--report',
+        type=Path,
+        help='Also write the size and build-time report as JSON to this file'
+    )
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        logging.error(f"Input file not found: {args.input}")
+        return 1
+
+    start = time.perf_counter()
+    courses = load_course_data(args.input)
+    if not courses:
+        logging.error("No courses found in input file")
+        return 1
+
+    entries = build_entries(courses)
+    shards = partition(entries)
+    manifest = write_shards(shards, entries, args.output_dir, len(courses))
+    report = size_report(manifest, time.perf_counter() - start)
+
+    logging.info("=" * 50)
+    logging.info("SEARCH SHARDS BUILT")
+    logging.info(f"Entries: {report['entries']} from {len(courses)} courses")
+    logging.info(f"Shards: {report['shards']} in {args.output_dir}")
+    logging.info(
+        f"Shard size (gzip): median {report['gzip_bytes']['median'] / 1024:.1f} KB, "
+        f"max {report['gzip_bytes']['max'] / 1024:.1f} KB, total {report['gzip_bytes']['total'] / 1024:.1f} KB"
+    )
+    logging.info(f"Largest shards: {', '.join(f'{p} ({b / 1024:.1f} KB)' for p, b in report['largest'])}")
+    logging.info(f"Build time: {report['build_seconds']:.2f}s")
+    logging.info("=" * 50)
+
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
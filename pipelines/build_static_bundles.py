@@ -0,0 +1,218 @@
+"""
+Build static JSON bundles for page rendering from processed course data.
+
+Course pages, the /corsi listing and the "top" facet menus can then be served
+from the CDN instead of reading Firestore on every visit. Output goes under
+public/catalog/:
+
+    manifest.json                          entry point, short-cached
+    courses/<id>.<hash>.json               one course document
+    courses/index/<bucket>.<hash>.json     course id -> course file, bucketed
+                                           by the last two characters of the id
+    listings/all/<page>.<hash>.json        all courses, paged
+    listings/<facet>.<hash>.json           facet id -> name, total and page files
+    listings/<facet>/<id>/<page>.<hash>.json
+    top_facets.<hash>.json                 most common universities, locations
+                                           and disciplines
+
+Every file except the manifest is named after its content hash, so it can be
+cached forever and is only re-uploaded by the CDN when it really changes.
+Listings are sorted by course name (then id), the order /corsi uses by default.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from catalog_format import load_catalog
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+FORMAT_VERSION = 1
+PAGE_SIZE = 24
+TOP_FACETS_LIMIT = 50
+LISTING_FACETS = ("discipline", "location", "university")
+# Fields CourseCard renders; listing pages carry only these.
+CARD_FIELDS = ("id", "nomeCorso", "university", "location", "discipline", "degree_type", "language")
+FILES_LIST = "files.json"
+
+
+def load_course_data(input_file: Path) -> list:
+    """Load processed course data from JSON file (full or normalized)."""
+    return load_catalog(input_file)
+
+
+class BundleWriter:
+    """Writes content-hashed JSON files and remembers them for cleanup."""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.files = set()
+        self.bytes = 0
+        self.written = 0
+
+    def write(self, stem: str, document) -> str:
+        raw = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode()
+        name = f"{stem}.{hashlib.sha256(raw).hexdigest()[:12]}.json"
+        path = self.output_dir / name
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(raw)
+            self.written += 1
+        self.files.add(name)
+        self.bytes += len(raw)
+        return name
+
+    def finish(self, manifest: dict) -> int:
+        """Write the manifest, then delete files neither this nor the previous build uses."""
+        files_path = self.output_dir / FILES_LIST
+        previous = set(json.loads(files_path.read_text())) if files_path.exists() else set()
+
+        manifest_path = self.output_dir / "manifest.json"
+        tmp = manifest_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(manifest, separators=(",", ":")))
+        tmp.replace(manifest_path)
+        files_path.write_text(json.dumps(sorted(self.files)))
+
+        keep = self.files | previous | {"manifest.json", FILES_LIST}
+        removed = 0
+        for path in self.output_dir.rglob("*.json"):
+            if path.relative_to(self.output_dir).as_posix() not in keep:
+                path.unlink()
+                removed += 1
+        return removed
+
+
+def sort_key(course: dict):
+    return (course.get("nomeCorso") or "", str(course["id"]))
+
+
+def card(course: dict) -> dict:
+    return {field: course[field] for field in CARD_FIELDS if field in course}
+
+
+def write_listing(writer: BundleWriter, stem: str, courses: list, extra: dict) -> dict:
+    """Write the pages of one listing; returns its index entry."""
+    pages = []
+    total_pages = max(1, -(-len(courses) // PAGE_SIZE))
+    for number in range(total_pages):
+        chunk = courses[number * PAGE_SIZE:(number + 1) * PAGE_SIZE]
+        pages.append(writer.write(f"{stem}/{number + 1}", {
+            **extra,
+            "page": number + 1,
+            "pages": total_pages,
+            "total": len(courses),
+            "courses": [card(course) for course in chunk],
+        }))
+    return {**extra, "total": len(courses), "pages": pages}
+
+
+def build_bundles(courses: list, output_dir: Path) -> dict:
+    writer = BundleWriter(output_dir)
+    courses = sorted((c for c in courses if c.get("id")), key=sort_key)
+
+    buckets = {}
+    for course in courses:
+        course_id = str(course["id"])
+        buckets.setdefault(course_id[-2:], {})[course_id] = writer.write(f"courses/{course_id}", course)
+    course_index = {
+        bucket: writer.write(f"courses/index/{bucket}", ids) for bucket, ids in sorted(buckets.items())
+    }
+
+    listings = {"all": write_listing(writer, "listings/all", courses, {})}
+    counts = {}
+    for facet in LISTING_FACETS:
+        by_id = {}
+        for course in courses:
+            data = course.get(facet) or {}
+            if data.get("id"):
+                by_id.setdefault(data["id"], (data.get("name"), []))[1].append(course)
+        index = {
+            facet_id: write_listing(
+                writer, f"listings/{facet}/{facet_id}", members, {"facet": facet, "id": facet_id, "name": name}
+            )
+            for facet_id, (name, members) in sorted(by_id.items())
+        }
+        listings[facet] = writer.write(f"listings/{facet}", index)
+        counts[facet] = sorted(
+            ({"id": facet_id, "name": name, "coursesCounter": len(members)}
+             for facet_id, (name, members) in by_id.items()),
+            key=lambda item: (-item["coursesCounter"], item["name"] or ""),
+        )
+
+    top_facets = writer.write("top_facets", {
+        "limit": TOP_FACETS_LIMIT,
+        "universities": counts["university"][:TOP_FACETS_LIMIT],
+        "locations": counts["location"][:TOP_FACETS_LIMIT],
+        "disciplines": counts["discipline"][:TOP_FACETS_LIMIT],
+    })
+
+    manifest = {
+        "version": FORMAT_VERSION,
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "courses": len(courses),
+        "page_size": PAGE_SIZE,
+        "course_index": course_index,
+        "listings": listings,
+        "top_facets": top_facets,
+    }
+    removed = writer.finish(manifest)
+    return {
+        "files": len(writer.files),
+        "new_files": writer.written,
+        "removed_files": removed,
+        "bytes": writer.bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build static course, listing and top-facet bundles for the frontend'
+    )
+    parser.add_argument(
+        '--input',
+        type=Path,
+        default='pipelines/data/all_courses_data.json',
+        help='Input processed course data JSON file'
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=Path,
+        default='public/catalog',
+        help='Directory served as /catalog by Next.js'
+    )
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        logging.error(f"Input file not found: {args.input}")
+        return 1
+
+    start = time.perf_counter()
+    courses = load_course_data(args.input)
+    if not courses:
+        logging.error("No courses found in input file")
+        return 1
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    stats = build_bundles(courses, args.output_dir)
+
+    logging.info("=" * 50)
+    logging.info("STATIC BUNDLES BUILT")
+    logging.info(f"Courses: {len(courses)}")
+    logging.info(f"Files: {stats['files']} ({stats['new_files']} new, {stats['removed_files']} removed)")
+    logging.info(f"Total size: {stats['bytes'] / 1024 / 1024:.1f} MB in {args.output_dir}")
+    logging.info(f"Build time: {time.perf_counter() - start:.2f}s")
+    logging.info("=" * 50)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
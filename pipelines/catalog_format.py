@@ -0,0 +1,160 @@
+"""Normalized (interned) form of the processed course catalog.
+
+The processed catalog repeats a full ``{"id", "name"}`` dict for six facets on
+every course and carries every raw Universitaly field. The normalized form
+writes each facet value once, in a table with its course count, and stores
+courses with facet ids only:
+
+    {"format": "normalized", "version": 1,
+     "courses": [{"id": 1, "nomeCorso": "...", "university": "<id>", ...}, ...],
+     "facets": {"university": {"<id>": {"name": "...", "courses": 12}, ...}, ...}}
+
+A facet without an id (the "N/A" values) is interned under ``""``. A value
+that does not fit its table (another name under the same id, extra keys) is
+kept inline as the usual dict.
+
+Raw fields the app never reads are split out to ``<name>.extras.jsonl``, one
+``{"id": ..., <field>: ...}`` line per course, so nothing is lost.
+:func:`load_catalog` re-hydrates either form into the usual course dicts.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+FORMAT = "normalized"
+FORMAT_VERSION = 1
+FACETS = ("university", "location", "degree_type", "program_type", "language", "discipline")
+# Raw fields read by the app (src/components/CourseDetail/format.ts and the
+# course cards); everything else goes to the extras file.
+COURSE_FIELDS = frozenset({
+    "id", "nomeCorso", "nomeStruttura", "lingua", "classe", "sede", "tipoLaurea", "programmazione",
+    "modalitaAccesso", "modalitaDidattica", "modalitaErogazione", "anno", "durataAnni", "url",
+})
+
+
+def normalized_path(json_path: Path) -> Path:
+    json_path = Path(json_path)
+    return json_path.with_name(f"{json_path.stem}.normalized.json")
+
+
+def extras_path(path: Path) -> Path:
+    path = Path(path)
+    stem = path.name.split(".")[0]
+    return path.with_name(f"{stem}.extras.jsonl")
+
+
+def is_normalized(document: Dict[str, Any]) -> bool:
+    return document.get("format") == FORMAT
+
+
+class NormalizedCatalogWriter:
+    """Streams courses to a normalized catalog, one call per course.
+
+    Courses are written as they come and the facet tables at the end, so
+    memory holds only the tables. Like the other writers, output goes to
+    temporary files that replace the catalog on :meth:`commit`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._extras_tmp = extras_path(self.path).with_name(extras_path(self.path).name + ".tmp")
+        self._file = open(self._tmp, "w")
+        self._extras = open(self._extras_tmp, "w")
+        self._file.write(f'{{"format": "{FORMAT}", "version": {FORMAT_VERSION}, "courses": [')
+        self.facets: Dict[str, Dict[str, Dict[str, Any]]] = {facet: {} for facet in FACETS}
+        self.courses = 0
+        self.inline = 0
+
+    def _intern(self, facet: str, value: Any) -> Any:
+        if not isinstance(value, dict) or set(value) != {"id", "name"} or value["id"] == "":
+            self.inline += 1
+            return value
+        ref = value["id"] or ""
+        entry = self.facets[facet].get(ref)
+        if entry is None:
+            entry = self.facets[facet][ref] = {"name": value["name"], "courses": 0}
+        elif entry["name"] != value["name"]:
+            self.inline += 1
+            return value
+        entry["courses"] += 1
+        return ref
+
+    def write(self, course: Dict[Any, Any]) -> None:
+        slim, extra = {}, {}
+        for key, value in course.items():
+            if key in FACETS:
+                slim[key] = self._intern(key, value)
+            elif key in COURSE_FIELDS:
+                slim[key] = value
+            else:
+                extra[key] = value
+        line = json.dumps(slim)
+        self._file.write(", " + line if self.courses else line)
+        if extra:
+            self._extras.write(json.dumps({"id": course.get("id"), **extra}) + "\n")
+        self.courses += 1
+
+    def commit(self) -> Dict[str, int]:
+        """Finish both files and move them into place; returns their sizes in bytes."""
+        self._file.write('], "facets": ' + json.dumps(self.facets) + "}")
+        self._file.close()
+        self._extras.close()
+        self._tmp.replace(self.path)
+        self._extras_tmp.replace(extras_path(self.path))
+        return {"catalog": self.path.stat().st_size, "extras": extras_path(self.path).stat().st_size}
+
+    def discard(self) -> None:
+        for f, tmp in ((self._file, self._tmp), (self._extras, self._extras_tmp)):
+            f.close()
+            tmp.unlink(missing_ok=True)
+
+
+def write_normalized(courses: Iterable[Dict[Any, Any]], path: Path) -> Dict[str, int]:
+    writer = NormalizedCatalogWriter(path)
+    try:
+        for course in courses:
+            writer.write(course)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.commit()
+
+
+def load_extras(path: Path) -> Dict[Any, Dict[str, Any]]:
+    extras = {}
+    if extras_path(path).exists():
+        with open(extras_path(path), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    fields = json.loads(line)
+                    extras[fields.pop("id")] = fields
+    return extras
+
+
+def hydrate(document: Dict[str, Any], extras: Optional[Dict[Any, Dict[str, Any]]] = None) -> List[Dict[Any, Any]]:
+    """The courses of a catalog document in the usual shape, whichever form it is in."""
+    if not is_normalized(document):
+        return document.get("courses", [])
+    if document.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported normalized catalog version {document.get('version')}")
+    facets = document["facets"]
+    courses = []
+    for course in document["courses"]:
+        for facet in FACETS:
+            ref = course.get(facet)
+            if isinstance(ref, str):
+                course[facet] = {"id": ref or None, "name": facets[facet][ref]["name"]}
+        if extras and course.get("id") in extras:
+            course.update(extras[course["id"]])
+        courses.append(course)
+    return courses
+
+
+def load_catalog(path: Path, with_extras: bool = True) -> List[Dict[Any, Any]]:
+    """Courses of a processed catalog file, re-hydrated if it is normalized."""
+    with open(path, "r", encoding="utf-8") as f:
+        document = json.load(f)
+    extras = load_extras(path) if with_extras and is_normalized(document) else None
+    return hydrate(document, extras)
@@ -9,7 +9,8 @@ import argparse
 from pathlib import Path
 import logging
 from urllib.parse import urlparse
-import re
+
+from normalization import university_domain_stem
 
 # Configure logging
 logging.basicConfig(
@@ -68,15 +69,8 @@ def extract_domain_from_university(university_name: str) -> str:
     
     # Try to construct domain from name
     # Remove common words and extract key parts
-    clean_name = re.sub(r'università\s+(degli\s+studi\s+di\s+|telematica\s+|commerciale\s+|cattolica\s+|libera\s+)', '', name)
-    clean_name = re.sub(r'\s+(di\s+|del\s+|della\s+|degli\s+|delle\s+)', '', clean_name)
-    clean_name = re.sub(r'[^\w\s]', '', clean_name)
-    
-    # Take first significant word
-    words = clean_name.split()
-    if words:
-        first_word = words[0]
-        
+    first_word = university_domain_stem(name)
+    if first_word:
         # Common patterns
         if len(first_word) > 3:
             if first_word in ['bologna', 'milano', 'roma', 'napoli', 'torino', 'firenze', 'genova']:
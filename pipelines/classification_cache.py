@@ -0,0 +1,231 @@
+"""
+Persistent cache of AI course classifications, shared by every --classify run.
+
+Entries live in a SQLite file keyed by the normalized course name and class
+plus the model and the hash of the prompt that produced them (single or
+batched, see gpt_classify_courses.py), so changing the model, a prompt or the
+discipline list never reuses an old answer. Lookups accept an answer from any
+current prompt. Re-runs only call the API for courses that have not been
+classified before.
+
+    python pipelines/classification_cache.py --stats
+    python pipelines/classification_cache.py --export pipelines/data/classifications.jsonl
+    python pipelines/classification_cache.py --prune --older-than 90
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+DEFAULT_PATH = Path("pipelines/data/classification_cache.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    model TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    materia_key TEXT NOT NULL,
+    course_name TEXT NOT NULL,
+    course_materia TEXT NOT NULL,
+    discipline TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_used_at TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (model, prompt_hash, name_key, materia_key)
+)
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def normalize_key(text: str) -> str:
+    """Case and whitespace insensitive form of a course name or class."""
+    return " ".join((text or "").lower().split())
+
+
+class ClassificationCache:
+    """Classifications for one model and its current prompt versions; thread-safe.
+
+    ``prompt_hashes`` lists the current prompts in order of preference: a
+    lookup returns the answer of the first one that has the course, and a
+    store goes under the first unless told which prompt produced the answer.
+    Lookups and stores count towards :attr:`stats`, so a run can report how
+    many API calls the cache saved.
+    """
+
+    def __init__(self, path: Path, model: str, prompt_hashes: Sequence[str]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.prompt_hashes = tuple(prompt_hashes)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0}
+
+    def _current(self):
+        """SQL condition and parameters matching the current model and prompts."""
+        marks = ", ".join("?" * len(self.prompt_hashes))
+        return f"model = ? AND prompt_hash IN ({marks})", (self.model, *self.prompt_hashes)
+
+    def get(self, course_name: str, course_materia: str) -> Optional[str]:
+        current, params = self._current()
+        keys = (normalize_key(course_name), normalize_key(course_materia))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT prompt_hash, discipline FROM classifications "
+                f"WHERE {current} AND name_key = ? AND materia_key = ?",
+                (*params, *keys),
+            ).fetchall()
+            if not rows:
+                self.stats["misses"] += 1
+                return None
+            prompt_hash, discipline = min(rows, key=lambda row: self.prompt_hashes.index(row[0]))
+            self._db.execute(
+                "UPDATE classifications SET hits = hits + 1, last_used_at = ? "
+                "WHERE model = ? AND prompt_hash = ? AND name_key = ? AND materia_key = ?",
+                (_now(), self.model, prompt_hash, *keys),
+            )
+            self._db.commit()
+            self.stats["hits"] += 1
+            return discipline
+
+    def put(self, course_name: str, course_materia: str, discipline: str, prompt_hash: Optional[str] = None) -> None:
+        """Store an answer under the prompt that produced it (default: the first current one)."""
+        key = (self.model, prompt_hash or self.prompt_hashes[0], normalize_key(course_name), normalize_key(course_materia))
+        now = _now()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (*key, course_name, course_materia, discipline, now, now),
+            )
+            self._db.commit()
+            self.stats["stored"] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Entry counts per model and prompt version, current one first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT model, prompt_hash, COUNT(*), SUM(hits), MIN(created_at), MAX(last_used_at) "
+                "FROM classifications GROUP BY model, prompt_hash"
+            ).fetchall()
+        versions = [
+            {
+                "model": model,
+                "prompt_hash": prompt_hash,
+                "current": model == self.model and prompt_hash in self.prompt_hashes,
+                "entries": entries,
+                "hits": hits or 0,
+                "oldest": oldest,
+                "last_used": last_used,
+            }
+            for model, prompt_hash, entries, hits, oldest, last_used in rows
+        ]
+        versions.sort(key=lambda version: (not version["current"], version["model"], version["prompt_hash"]))
+        return {
+            "path": str(self.path),
+            "size_bytes": self.path.stat().st_size,
+            "entries": sum(version["entries"] for version in versions),
+            "versions": versions,
+        }
+
+    def export(self, output: Path, current_only: bool = False) -> int:
+        """Write entries as JSON Lines; returns how many were written."""
+        query = "SELECT * FROM classifications"
+        params = ()
+        if current_only:
+            current, params = self._current()
+            query += f" WHERE {current}"
+        with self._lock:
+            cursor = self._db.execute(query + " ORDER BY model, prompt_hash, name_key, materia_key", params)
+            columns = [column[0] for column in cursor.description]
+            count = 0
+            with open(output, "w", encoding="utf-8") as f:
+                for row in cursor:
+                    f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+                    count += 1
+        return count
+
+    def prune(self, stale: bool = True, older_than_days: Optional[float] = None) -> int:
+        """Delete entries of other model/prompt versions and/or unused for a while; returns how many."""
+        conditions, params = [], []
+        if stale:
+            current, current_params = self._current()
+            conditions.append(f"NOT ({current})")
+            params += current_params
+        if older_than_days is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+            conditions.append("last_used_at < ?")
+            params.append(cutoff.isoformat(timespec="seconds"))
+        if not conditions:
+            return 0
+        with self._lock:
+            deleted = self._db.execute(f"DELETE FROM classifications WHERE {' OR '.join(conditions)}", params).rowcount
+            self._db.commit()
+            self._db.execute("VACUUM")
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def open_cache(path: Path = DEFAULT_PATH) -> ClassificationCache:
+    """The cache for the model and prompts currently in gpt_classify_courses.py."""
+    from gpt_classify_courses import BATCH_PROMPT_HASH, MODEL, PROMPT_HASH
+
+    return ClassificationCache(path, MODEL, (PROMPT_HASH, BATCH_PROMPT_HASH))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, export and prune the AI classification cache")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_PATH, help=f"Cache file (default: {DEFAULT_PATH})")
+    parser.add_argument("--stats", action="store_true", help="Print entry counts per model and prompt version")
+    parser.add_argument("--export", type=Path, metavar="FILE", help="Write every entry to FILE as JSON Lines")
+    parser.add_argument("--current-only", action="store_true", help="Export only the current model and prompt version")
+    parser.add_argument(
+        "--prune", action="store_true",
+        help="Delete entries made with another model, prompt or discipline list",
+    )
+    parser.add_argument(
+        "--older-than", type=float, metavar="DAYS",
+        help="With --prune, also delete entries not used for DAYS days",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not args.cache.exists():
+        logging.error(f"Classification cache {args.cache} not found")
+        return 1
+    cache = open_cache(args.cache)
+
+    if args.prune:
+        deleted = cache.prune(stale=True, older_than_days=args.older_than)
+        logging.info(f"Pruned {deleted} entries from {args.cache}")
+    if args.export:
+        count = cache.export(args.export, current_only=args.current_only)
+        logging.info(f"Exported {count} entries to {args.export}")
+    if args.stats or not (args.prune or args.export):
+        summary = cache.summary()
+        print(f"{summary['path']}: {summary['entries']} entries, {summary['size_bytes'] / 1024:.0f} KB")
+        for version in summary["versions"]:
+            marker = "*" if version["current"] else " "
+            print(
+                f"{marker} {version['model']:20} {version['prompt_hash']:16} {version['entries']:7d} entries "
+                f"{version['hits']:7d} hits  last used {version['last_used']}"
+            )
+    cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,66 @@
+"""Record-by-record reading and writing of processed course files.
+
+Processing writes two files in one pass: ``<name>.jsonl`` (one course per
+line) for stages that stream, and the usual ``<name>.json`` with a single
+``{"courses": [...]}`` object for everything that still loads it whole. The
+JSON is produced incrementally too and is byte-identical to what
+``json.dump({"courses": courses}, f)`` writes.
+"""
+
+import json
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator
+
+from catalog_format import load_catalog
+from raw_archive import is_archive, iter_courses
+
+
+def jsonl_path(json_path: Path) -> Path:
+    return Path(json_path).with_suffix(".jsonl")
+
+
+def write_course_files(courses: Iterable[Dict[Any, Any]], json_path: Path, jsonl: bool = True) -> int:
+    """Stream courses to ``json_path`` (and its ``.jsonl`` sibling); returns how many were written.
+
+    Both files are written under temporary names and moved into place only
+    once the input is exhausted.
+    """
+    json_path = Path(json_path)
+    tmp_json = json_path.with_name(json_path.name + ".tmp")
+    tmp_jsonl = jsonl_path(json_path).with_name(jsonl_path(json_path).name + ".tmp") if jsonl else None
+    count = 0
+    with ExitStack() as stack:
+        out_json = stack.enter_context(open(tmp_json, "w"))
+        out_jsonl = stack.enter_context(open(tmp_jsonl, "w")) if jsonl else None
+        out_json.write('{"courses": [')
+        for course in courses:
+            line = json.dumps(course)
+            out_json.write(", " + line if count else line)
+            if out_jsonl:
+                out_jsonl.write(line + "\n")
+            count += 1
+        out_json.write("]}")
+    tmp_json.replace(json_path)
+    if jsonl:
+        tmp_jsonl.replace(jsonl_path(json_path))
+    return count
+
+
+def iter_course_file(path: Path) -> Iterator[Dict[Any, Any]]:
+    """Courses of a course file, streamed when possible.
+
+    JSONL archives are streamed directly. For ``<name>.json`` the
+    ``<name>.jsonl`` written alongside it is streamed when it is at least as
+    recent; otherwise the JSON is loaded whole (and re-hydrated if it is a
+    normalized catalog).
+    """
+    path = Path(path)
+    if is_archive(path):
+        yield from iter_courses(path)
+        return
+    lines = jsonl_path(path)
+    if lines.exists() and lines.stat().st_mtime >= path.stat().st_mtime:
+        yield from iter_courses(lines)
+        return
+    yield from load_catalog(path)
@@ -2,15 +2,31 @@
 
 import requests
 import time
+import hashlib
 import json
 import argparse
+import itertools
+import os
+import shutil
 import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
-from gpt_classify_courses import classify_course_discipline
-from unidecode import unidecode
-import re
+from gpt_classify_courses import (
+    BATCH_PROMPT_HASH, MODEL, PROMPT_HASH, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, ClassificationError, DisciplineAPI,
+    default_api,
+)
+from catalog_format import NormalizedCatalogWriter, extras_path, normalized_path
+from classification_cache import DEFAULT_PATH as CLASSIFICATION_CACHE_PATH, ClassificationCache, open_cache
+from course_stream import iter_course_file, jsonl_path, write_course_files
+from http_cache import HttpCache
+from rate_limit import TokenBucket, parse_retry_after
+from raw_archive import RawArchiveWriter, is_archive, iter_courses
+from normalization import capitalize_name, create_id_from_name, log_cache_stats
 import logging
 
 # Configure logging
@@ -35,62 +51,232 @@ def load_courses_from_json(input_path):
         return json.load(f)["courses"]
 
 
-def fetch_all_courses(base_url: str, env: str = "production", initial_page: int = 1, sleep_time: float = 1, max_retries: int = 3) -> List[Dict[Any, Any]]:
-    """Fetch all courses from Universitaly API with retry logic."""
-    courses = []
+def load_raw_courses(raw_file: Path) -> Iterable[Dict[Any, Any]]:
+    """Raw courses from a JSONL archive (streamed) or a legacy JSON file."""
+    if is_archive(raw_file):
+        return iter_courses(raw_file)
+    return load_courses_from_json(raw_file)
+
+
+def changes_path(raw_file: Path) -> Path:
+    """Sidecar recording the courses and content hash of every page of a raw file,
+    and which pages changed since the previous fetch."""
+    return raw_file.with_name(f"{raw_file.name.split('.')[0]}_changes.json")
+
+
+def reuse_path(processed_file: Path) -> Path:
+    """Sidecar recording the raw page hashes and options a processed file was built from."""
+    return processed_file.with_name(f"{processed_file.name.split('.')[0]}.reuse.json")
+
+
+def page_hash(page_courses: List[Dict[Any, Any]]) -> str:
+    return hashlib.sha256(json.dumps(page_courses).encode()).hexdigest()[:16]
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """A session whose connection pool is shared by all fetch threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_page(base_url: str, page: int, max_retries: int, session: requests.Session, limiter: TokenBucket,
+               backoff_factor: float = 1.0, cache: Optional[HttpCache] = None) -> Tuple[Dict[Any, Any], bool]:
+    """The page's "universita" object and whether it changed since the cached copy."""
+    url = f"{base_url}?page={page}"
+    headers = cache.conditional_headers(url) if cache else None
+    response = make_request_with_retry(url, max_retries, backoff_factor, session=session, limiter=limiter, headers=headers)
+    if cache and response.status_code == 304:
+        return json.loads(cache.not_modified(url)).get("universita", {}), False
+    data = response.json()
+    changed = cache.store(url, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified")) if cache else True
+    return data.get("universita", {}), changed
+
+
+def page_checkpoint(checkpoint_dir: Path, page: int) -> Path:
+    return checkpoint_dir / f"page-{page:05d}.json"
+
+
+def save_page_checkpoint(checkpoint_dir: Path, page: int, total_pages: int, page_courses: List[Dict[Any, Any]],
+                         changed: bool = True) -> None:
+    """Persist one fetched page; written atomically so a crash never leaves half a file."""
+    path = page_checkpoint(checkpoint_dir, page)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"page": page, "total_pages": total_pages, "changed": changed, "corsi": page_courses}, f)
+    tmp.replace(path)
+
+
+def load_page_checkpoint(checkpoint_dir: Path, page: int) -> Optional[Dict[Any, Any]]:
+    """The checkpointed page, or None if there is none; invalid checkpoints are removed."""
+    path = page_checkpoint(checkpoint_dir, page)
+    if not path.exists():
+        return None
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("page") == page and isinstance(data.get("total_pages"), int) and isinstance(data.get("corsi"), list):
+            return data
+    except (OSError, ValueError):
+        pass
+    logging.warning(f"Discarding invalid checkpoint {path}")
+    path.unlink(missing_ok=True)
+    return None
+
+
+def fetch_all_courses(base_url: str, env: str = "production", initial_page: int = 1, sleep_time: float = 1, max_retries: int = 3,
+                      concurrency: int = 4, max_rate: float = 8.0, checkpoint_dir: Optional[Path] = None,
+                      retry_backoff: float = 5.0, cache: Optional[HttpCache] = None,
+                      writer: Optional[RawArchiveWriter] = None) -> Tuple[List[Dict[Any, Any]], List[int], Dict[int, Dict[str, Any]]]:
+    """Fetch all courses from Universitaly API with retry logic.
+
+    Up to ``concurrency`` pages are in flight at once. Requests share one
+    connection pool and one rate limiter, which starts at one request every
+    ``sleep_time`` seconds, backs off when the API throttles and speeds up
+    towards ``max_rate`` requests per second while it does not.
+
+    With a ``checkpoint_dir`` every page is saved there as soon as it arrives,
+    and pages already saved by an interrupted run are not fetched again.
+    Pages that still fail are retried one at a time with ``retry_backoff``
+    as the back-off factor.
+
+    With a ``cache`` pages are requested conditionally (see http_cache), and
+    each page is reported as changed or not since the previous fetch.
+
+    With a ``writer`` each page goes straight to the raw archive and is not
+    kept in memory; the returned course list is then empty.
+
+    Returns the courses in page order, the pages that are still missing and,
+    per fetched page, ``{"changed": bool, "ids": [course ids], "hash": str}``.
+    """
     page = initial_page
+    session = make_session(concurrency)
+    limiter = TokenBucket(rate=1 / sleep_time if sleep_time > 0 else max_rate, max_rate=max_rate)
     
-    # Get total pages
-    try:
-        logging.info(f"Fetching initial data from page {page}")
-        initial_response = make_request_with_retry(f"{base_url}?page={page}", max_retries)
-        
-        if env == "development":
-            total_pages = 2
-            logging.info(f"Development mode: limiting to {total_pages} pages")
-        else:
-            total_pages = initial_response.json()["universita"]["totalPages"]
-            logging.info(f"Production mode: fetching {total_pages} total pages")
-            
-    except Exception as e:
-        logging.error(f"Failed to get initial data: {e}")
-        return courses
-
-    # Fetch all pages
-    failed_pages = []
-    for page in tqdm(range(initial_page, total_pages + 1), desc="Fetching pages"):
+    # Get total pages, from the checkpointed first page when resuming
+    initial = load_page_checkpoint(checkpoint_dir, page) if checkpoint_dir else None
+    if initial is None:
         try:
-            url = f"{base_url}?page={page}"
-            response = make_request_with_retry(url, max_retries)
-            
-            data = response.json()
-            page_courses = data.get("universita", {}).get("corsi", [])
-            courses.extend(page_courses)
-            
-            logging.debug(f"Page {page}: fetched {len(page_courses)} courses")
-            time.sleep(sleep_time)
-            
+            logging.info(f"Fetching initial data from page {page}")
+            data, changed = fetch_page(base_url, page, max_retries, session, limiter, cache=cache)
+            initial = {"page": page, "total_pages": data["totalPages"], "changed": changed, "corsi": data.get("corsi", [])}
+            if checkpoint_dir:
+                save_page_checkpoint(checkpoint_dir, page, initial["total_pages"], initial["corsi"], changed)
         except Exception as e:
-            logging.warning(f"Failed to fetch page {page}: {e}")
-            failed_pages.append(page)
-            continue
+            logging.error(f"Failed to get initial data: {e}")
+            return [], [page], {}
+
+    if env == "development":
+        total_pages = 2
+        logging.info(f"Development mode: limiting to {total_pages} pages")
+    else:
+        total_pages = initial["total_pages"]
+        logging.info(f"Production mode: fetching {total_pages} total pages")
+
+    pages = {}
+    page_ids = {}
+    page_hashes = {}
+    changed_pages = {}
+
+    def accept(page, page_courses, changed):
+        page_ids[page] = [course.get("id") for course in page_courses]
+        page_hashes[page] = page_hash(page_courses)
+        changed_pages[page] = changed
+        if writer:
+            writer.write_page(page, page_courses)
+        else:
+            pages[page] = page_courses
+
+    accept(initial_page, initial["corsi"], initial.get("changed", True))
+    if checkpoint_dir:
+        for page in range(initial_page + 1, total_pages + 1):
+            data = load_page_checkpoint(checkpoint_dir, page)
+            if data is not None:
+                accept(page, data["corsi"], data.get("changed", True))
+        if len(page_ids) > 1:
+            logging.info(f"Resuming: {len(page_ids)} of {total_pages - initial_page + 1} pages already checkpointed in {checkpoint_dir}")
+
+    def fetch_and_save(page, retries, backoff_factor):
+        data, changed = fetch_page(base_url, page, retries, session, limiter, backoff_factor, cache)
+        page_courses = data.get("corsi", [])
+        if checkpoint_dir:
+            save_page_checkpoint(checkpoint_dir, page, data.get("totalPages", total_pages), page_courses, changed)
+        return page_courses, changed
+
+    def fetch_pages(todo, workers, retries, backoff_factor, desc):
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch_and_save, page, retries, backoff_factor): page for page in todo}
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+                page = futures[future]
+                try:
+                    accept(page, *future.result())
+                    logging.debug(f"Page {page}: fetched {len(page_ids[page])} courses")
+                except Exception as e:
+                    logging.warning(f"Failed to fetch page {page}: {e}")
+                    failed.append(page)
+        return sorted(failed)
+
+    start = time.perf_counter()
+    todo = [page for page in range(initial_page + 1, total_pages + 1) if page not in page_ids]
+    failed_pages = fetch_pages(todo, concurrency, max_retries, 1.0, "Fetching pages")
+
+    if failed_pages:
+        # Transient outages usually outlast the first pass's back-off; try
+        # the stragglers again one by one, waiting longer between attempts.
+        logging.info(f"Retrying {len(failed_pages)} failed pages with longer back-off")
+        failed_pages = fetch_pages(failed_pages, 1, max_retries * 2, retry_backoff, "Retrying failed pages")
+
+    courses = []
+    for page in sorted(pages):
+        courses.extend(pages[page])
 
     if failed_pages:
         logging.warning(f"Failed to fetch {len(failed_pages)} pages: {failed_pages}")
     
-    logging.info(f"Successfully fetched {len(courses)} courses from {total_pages - len(failed_pages)} pages")
-    return courses
+    elapsed = time.perf_counter() - start
+    fetched = sum(len(ids) for ids in page_ids.values())
+    logging.info(f"Successfully fetched {fetched} courses from {len(page_ids)} pages in {elapsed:.1f}s "
+                 f"(final rate {limiter.rate:.2f} requests/s)")
+    if cache:
+        logging.info(f"HTTP cache: {cache.stats['not_modified']} not modified, {cache.stats['unchanged']} unchanged, "
+                     f"{cache.stats['changed']} new or changed; {sum(changed_pages.values())}/{len(page_ids)} pages changed")
+    changes = {
+        page: {"changed": changed_pages[page], "ids": page_ids[page], "hash": page_hashes[page]}
+        for page in sorted(page_ids)
+    }
+    return courses, failed_pages, changes
+
 
+def make_request_with_retry(url: str, max_retries: int = 3, backoff_factor: float = 1.0,
+                            session: Optional[requests.Session] = None,
+                            limiter: Optional[TokenBucket] = None,
+                            headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """Make HTTP request with exponential backoff retry logic.
 
-def make_request_with_retry(url: str, max_retries: int = 3, backoff_factor: float = 1.0) -> requests.Response:
-    """Make HTTP request with exponential backoff retry logic."""
+    With a ``limiter`` every attempt waits for a token, and throttled
+    responses slow the limiter down (honouring Retry-After) for all callers.
+    When conditional ``headers`` are sent, a 304 is returned like a 200.
+    """
+    http = session or requests
     for attempt in range(max_retries + 1):
         try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
+            if limiter:
+                limiter.acquire()
+            response = http.get(url, headers=headers, timeout=30)
+            if response.status_code == 200 or (headers and response.status_code == 304):
+                if limiter:
+                    limiter.succeeded()
                 return response
-            elif response.status_code == 429:  # Rate limited
-                wait_time = backoff_factor * (2 ** attempt)
+            elif response.status_code in (429, 503):  # Rate limited
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if limiter:
+                    limiter.throttled(retry_after)
+                if attempt == max_retries:
+                    break
+                wait_time = retry_after if retry_after is not None else backoff_factor * (2 ** attempt)
                 logging.warning(f"Rate limited on attempt {attempt + 1}, waiting {wait_time}s")
                 time.sleep(wait_time)
             else:
@@ -105,163 +291,459 @@ def make_request_with_retry(url: str, max_retries: int = 3, backoff_factor: floa
     raise Exception(f"Max retries ({max_retries}) exceeded for URL: {url}")
 
 
-def capitalize_name(name):
-    # Lowercase words that should not be capitalized
-    lowercase_words = {
-        "della",
-        "di",
-        "e",
-        "con",
-        "per",
-        "dell",
-        "degli",
-        "del",
-        "a",
-        "da",
-        "in",
-        "su",
-        "per",
-        "tra",
-        "fra",
-    }
-    words = name.split()
-    capitalized_words = [words[0].capitalize()] + [
-        word.capitalize() if word.lower() not in lowercase_words else word.lower()
-        for word in words[1:]
-    ]
-    return " ".join(capitalized_words)
+LANGUAGES = {"IT": "Italiano", "EN": "Inglese", "mu": "Multilingua"}
 
 
-def create_id_from_name(name: str) -> str:
-    name = name.lower()
-    name = unidecode(name)
-    name = re.sub(r"\s+", "_", name)
-    name = re.sub(r"[^a-z0-9_]", "", name)
-    return name
+def normalize_course(course: Dict[Any, Any]) -> Dict[Any, Any]:
+    """Capitalize names and map language codes to full names."""
+    course["nomeCorso"] = capitalize_name(course.get("nomeCorso", ""))
+    course["nomeStruttura"] = capitalize_name(course.get("nomeStruttura", ""))
+    course["lingua"] = LANGUAGES.get(course.get("lingua", "IT"), course.get("lingua", "IT"))
+    return course
 
 
-def process_courses(courses: List[Dict[Any, Any]], enable_classification: bool = True) -> List[Dict[Any, Any]]:
-    """Process raw course data with optional AI classification."""
-    logging.info(f"Processing {len(courses)} courses...")
-    
-    processed_courses = []
-    classification_cache = {}
-    
-    for course in tqdm(courses):
+class DisciplineClassifier:
+    """Sets each course's discipline, from the AI classifier or the course class.
+
+    Classifications are cached by course name and class, so repeated courses
+    cost one API call; with a persistent ``store`` (classification_cache.py)
+    courses classified in earlier runs cost none. :meth:`classify_stream`
+    classifies up to ``concurrency`` requests at once, each for up to
+    ``batch_size`` courses. A course the API gives no valid discipline for
+    keeps the one from its class.
+    """
+
+    def __init__(self, enabled: bool = True, store: Optional[ClassificationCache] = None,
+                 api: Optional[DisciplineAPI] = None, concurrency: int = 1, batch_size: int = 1):
+        self.enabled = enabled
+        self.store = store
+        self.api = api
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.cache = {}
+        self.api_calls = 0
+        self.failures = 0
+        self.batch_fallbacks = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _query(course: Dict[Any, Any]) -> Tuple[str, str]:
+        return course["nomeCorso"], course.get("classe", {}).get("descrizione", "")
+
+    def _cache_key(self, course: Dict[Any, Any]) -> str:
+        return "_".join(self._query(course))
+
+    def lookup(self, course_name: str, course_materia: str) -> Optional[str]:
+        """The discipline from the store or the API; None if the API gave no valid one. Thread-safe."""
+        discipline_name = self.store.get(course_name, course_materia) if self.store else None
+        if discipline_name is not None:
+            return discipline_name
+        return self._classify(course_name, course_materia)
+
+    def _classify(self, course_name: str, course_materia: str) -> Optional[str]:
+        """Ask the API for one course, already known to miss the store."""
+        with self._lock:
+            self.api_calls += 1
         try:
-            # Capitalize names
-            course["nomeCorso"] = capitalize_name(course.get("nomeCorso", ""))
-            course["nomeStruttura"] = capitalize_name(course.get("nomeStruttura", ""))
+            discipline_name = (self.api or default_api()).classify(course_name, course_materia)
+        except ClassificationError as e:
+            logging.warning(f"{e}; using the course class")
+            with self._lock:
+                self.failures += 1
+            return None
+        if self.store:
+            self.store.put(course_name, course_materia, discipline_name, PROMPT_HASH)
+        return discipline_name
+
+    def lookup_many(self, queries: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """:meth:`lookup` for many courses, sending the ones not in the store as one batch.
+
+        Courses the batch gives no valid discipline for, or all of them if the
+        batch fails, are looked up one by one. Thread-safe.
+        """
+        found = [self.store.get(*query) if self.store else None for query in queries]
+        missing = [index for index, discipline_name in enumerate(found) if discipline_name is None]
+        if len(missing) > 1:
+            try:
+                answers = (self.api or default_api()).classify_batch([queries[index] for index in missing])
+            except ClassificationError as e:
+                logging.warning(f"{e}; classifying its courses one by one")
+                answers = [None] * len(missing)
+            for index, discipline_name in zip(missing, answers):
+                if discipline_name is not None:
+                    found[index] = discipline_name
+                    if self.store:
+                        self.store.put(*queries[index], discipline_name, BATCH_PROMPT_HASH)
+            answered = sum(found[index] is not None for index in missing)
+            missing = [index for index in missing if found[index] is None]
+            with self._lock:
+                # Courses retried below are counted by _classify().
+                self.api_calls += answered
+                self.batch_fallbacks += len(missing)
+        # These already missed the store above; don't count them twice.
+        for index in missing:
+            found[index] = self._classify(*queries[index])
+        return found
+
+    def _assign(self, course: Dict[Any, Any], discipline_name: Optional[str]) -> Dict[Any, Any]:
+        if discipline_name is None:
+            # Use the existing class description as discipline
+            discipline_name = course.get("classe", {}).get("descrizione", "Generale")
+        discipline_id = create_id_from_name(discipline_name)
+        course["discipline"] = {
+            "id": discipline_id,
+            "name": discipline_name,
+        }
+        return course
+
+    def __call__(self, course: Dict[Any, Any]) -> Dict[Any, Any]:
+        if not self.enabled:
+            return self._assign(course, None)
+        # Use cache for classification to avoid redundant API calls
+        cache_key = self._cache_key(course)
+        if cache_key not in self.cache:
+            self.cache[cache_key] = self.lookup(*self._query(course))
+        return self._assign(course, self.cache[cache_key])
+
+    def classify_stream(self, items: Iterable[Tuple[Optional[Dict[Any, Any]], bool]]) -> Iterator[Tuple[Optional[Dict[Any, Any]], bool]]:
+        """Classify ``(course, reused)`` pairs concurrently, yielding them in input order.
 
-            # Map language codes to full names
-            course["lingua"] = {"IT": "Italiano", "EN": "Inglese", "mu": "Multilingua"}.get(
-                course.get("lingua", "IT"), course.get("lingua", "IT")
+        Skipped (None) and reused courses pass through untouched. Distinct
+        courses are grouped into batches of ``batch_size`` and looked up in a
+        pool of ``concurrency`` threads; at most four batches per thread are
+        buffered ahead of the oldest course.
+        """
+        window = deque()
+        pending = {}
+        batch = {}
+
+        def submit():
+            future = executor.submit(self.lookup_many, list(batch.values()))
+            for index, cache_key in enumerate(batch):
+                pending[cache_key] = (future, index)
+            batch.clear()
+
+        def ready(cache_key):
+            if cache_key is None or cache_key in self.cache:
+                return True
+            if cache_key not in pending:
+                # Still in the batch being filled; the oldest course waits on it.
+                submit()
+            return pending[cache_key][0].done()
+
+        def finish(course, reused, cache_key):
+            if cache_key is None:
+                return course, reused
+            if cache_key not in self.cache:
+                future, index = pending.pop(cache_key)
+                self.cache[cache_key] = future.result()[index]
+            return self._assign(course, self.cache[cache_key]), reused
+
+        limit = self.concurrency * self.batch_size * 4
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for course, reused in items:
+                cache_key = None
+                if course is not None and not reused:
+                    cache_key = self._cache_key(course)
+                    if cache_key not in self.cache and cache_key not in pending and cache_key not in batch:
+                        batch[cache_key] = self._query(course)
+                        if len(batch) == self.batch_size:
+                            submit()
+                window.append((course, reused, cache_key))
+                while window and (ready(window[0][2]) or len(window) > limit):
+                    yield finish(*window.popleft())
+            if batch:
+                submit()
+            while window:
+                yield finish(*window.popleft())
+
+    def log_summary(self) -> None:
+        logging.info(
+            f"Used {len(self.cache)} unique classifications, {self.api_calls} from the API"
+            + (f", {self.batch_fallbacks} retried outside their batch" if self.batch_fallbacks else "")
+            + (f", {self.failures} fell back to the course class" if self.failures else "")
+        )
+        if self.store:
+            stats = self.store.stats
+            logging.info(
+                f"Classification cache {self.store.path}: {stats['hits']} hits, "
+                f"{stats['misses']} misses, {stats['stored']} stored"
+            )
+        if self.api_calls:
+            stats = (self.api or default_api()).stats
+            logging.info(
+                f"Classification API: {stats['requests']} requests ({stats['batches']} batches), {stats['retries']} retries, "
+                f"{stats['throttled']} throttled, {stats['invalid']} invalid answers"
             )
 
-            # Process Discipline
-            if enable_classification:
-                # Use cache for classification to avoid redundant API calls
-                cache_key = f"{course['nomeCorso']}_{course.get('classe', {}).get('descrizione', '')}"
-                if cache_key in classification_cache:
-                    discipline_name = classification_cache[cache_key]
-                else:
-                    discipline_name = classify_course_discipline(
-                        course_name=course["nomeCorso"],
-                        course_materia=course.get("classe", {}).get("descrizione", ""),
-                    )
-                    classification_cache[cache_key] = discipline_name
-            else:
-                # Use the existing class description as discipline
-                discipline_name = course.get("classe", {}).get("descrizione", "Generale")
-            
-            discipline_id = create_id_from_name(discipline_name)
-            course["discipline"] = {
-                "id": discipline_id,
-                "name": discipline_name,
-            }
-
-            # Process University
-            university_name = course.get("nomeStruttura", "Unknown University")
-            university_id = create_id_from_name(university_name)
-            course["university"] = {
-                "id": university_id,
-                "name": university_name,
-            }
-
-            # Process Location
-            sede = course.get("sede")
-            if sede and sede.get("comuneDescrizione"):
-                location_name = sede.get("comuneDescrizione").lower().capitalize()
-                location_id = create_id_from_name(location_name)
-                course["location"] = {
-                    "id": location_id,
-                    "name": location_name,
-                }
-            else:
-                # Fallback to extracting from university name or set to N/A
-                university_name = course.get("nomeStruttura", "")
-                if "TORINO" in university_name.upper():
-                    location_name = "Torino"
-                elif "UDINE" in university_name.upper():
-                    location_name = "Udine"
-                elif "TRIESTE" in university_name.upper():
-                    location_name = "Trieste"
-                else:
-                    location_name = "N/A"
-                
-                location_id = create_id_from_name(location_name) if location_name != "N/A" else None
-                course["location"] = {
-                    "id": location_id,
-                    "name": location_name,
-                }
-
-            # Process Degree Type
-            degree_type_name = course.get("tipoLaurea", {}).get("descrizione")
-            if degree_type_name:
-                degree_type_id = create_id_from_name(degree_type_name)
-                course["degree_type"] = {
-                    "id": degree_type_id,
-                    "name": degree_type_name,
-                }
-            else:
-                course["degree_type"] = {
-                    "id": None,
-                    "name": "N/A",
-                }
-
-            # Process Program Type (Entrance)
-            program_type_name = course.get("programmazione", {}).get("descrizione")
-            if program_type_name:
-                program_type_id = create_id_from_name(program_type_name)
-                course["program_type"] = {
-                    "id": program_type_id,
-                    "name": program_type_name,
-                }
-            else:
-                course["program_type"] = {
-                    "id": None,
-                    "name": "N/A",
-                }
-
-            # Process Language
-            language_name = course.get("lingua", "Italiano")
-            language_id = create_id_from_name(language_name)
-            course["language"] = {
-                "id": language_id,
-                "name": language_name,
-            }
-
-            processed_courses.append(course)
-            
+
+def assign_facets(course: Dict[Any, Any]) -> Dict[Any, Any]:
+    """Build the university, location, degree type, program type and language facets."""
+    # Process University
+    university_name = course.get("nomeStruttura", "Unknown University")
+    university_id = create_id_from_name(university_name)
+    course["university"] = {
+        "id": university_id,
+        "name": university_name,
+    }
+
+    # Process Location
+    sede = course.get("sede")
+    if sede and sede.get("comuneDescrizione"):
+        location_name = sede.get("comuneDescrizione").lower().capitalize()
+        location_id = create_id_from_name(location_name)
+        course["location"] = {
+            "id": location_id,
+            "name": location_name,
+        }
+    else:
+        # Fallback to extracting from university name or set to N/A
+        university_name = course.get("nomeStruttura", "")
+        if "TORINO" in university_name.upper():
+            location_name = "Torino"
+        elif "UDINE" in university_name.upper():
+            location_name = "Udine"
+        elif "TRIESTE" in university_name.upper():
+            location_name = "Trieste"
+        else:
+            location_name = "N/A"
+
+        location_id = create_id_from_name(location_name) if location_name != "N/A" else None
+        course["location"] = {
+            "id": location_id,
+            "name": location_name,
+        }
+
+    # Process Degree Type
+    degree_type_name = course.get("tipoLaurea", {}).get("descrizione")
+    if degree_type_name:
+        degree_type_id = create_id_from_name(degree_type_name)
+        course["degree_type"] = {
+            "id": degree_type_id,
+            "name": degree_type_name,
+        }
+    else:
+        course["degree_type"] = {
+            "id": None,
+            "name": "N/A",
+        }
+
+    # Process Program Type (Entrance)
+    program_type_name = course.get("programmazione", {}).get("descrizione")
+    if program_type_name:
+        program_type_id = create_id_from_name(program_type_name)
+        course["program_type"] = {
+            "id": program_type_id,
+            "name": program_type_name,
+        }
+    else:
+        course["program_type"] = {
+            "id": None,
+            "name": "N/A",
+        }
+
+    # Process Language
+    language_name = course.get("lingua", "Italiano")
+    language_id = create_id_from_name(language_name)
+    course["language"] = {
+        "id": language_id,
+        "name": language_name,
+    }
+    return course
+
+
+def process_chunk(chunk: List[Dict[Any, Any]]) -> Tuple[List[Optional[Dict[Any, Any]]], List[str]]:
+    """Run the CPU-bound steps over a chunk of courses in a worker process.
+
+    Disciplines come from the course class here; with classification on, the
+    parent process replaces them afterwards, so API calls and their cache
+    stay in one place. Returns the processed courses aligned with the input
+    (None where a course failed) and the errors.
+    """
+    steps = (normalize_course, DisciplineClassifier(False), assign_facets)
+    processed, errors = [], []
+    for course in chunk:
+        try:
+            for step in steps:
+                course = step(course)
         except Exception as e:
-            logging.warning(f"Error processing course {course.get('nomeCorso', 'Unknown')}: {e}")
+            errors.append(f"Error processing course {course.get('nomeCorso', 'Unknown')}: {e}")
+            course = None
+        processed.append(course)
+    return processed, errors
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def process_stream(courses: Iterable[Dict[Any, Any]], enable_classification: bool = True,
+                   reuse: Optional[Dict[Any, Dict[Any, Any]]] = None, workers: int = 1,
+                   chunk_size: int = 500, classifier: Optional[DisciplineClassifier] = None) -> Iterator[Dict[Any, Any]]:
+    """Yield processed courses one at a time: normalize -> discipline -> facets.
+
+    Nothing is collected, so memory stays flat however large the input;
+    pair it with a streaming reader and write_course_files. Courses whose id
+    is in ``reuse`` are passed through as already processed. A course that
+    fails a step is logged and skipped.
+
+    With ``workers`` > 1 chunks of ``chunk_size`` courses are processed in a
+    pool of that many processes (see process_chunk), at most two chunks per
+    worker in flight, and results are yielded in input order.
+
+    Disciplines come from the course class; with classification on,
+    ``classifier`` (by default one without a persistent store) then replaces
+    them in a concurrent stage of its own (DisciplineClassifier.classify_stream).
+    """
+    logging.info(f"Processing courses with {workers} worker{'s' if workers != 1 else ''}...")
+    if enable_classification:
+        classifier = classifier or DisciplineClassifier(True)
+    total = processed = reused = 0
+
+    def results():
+        if workers <= 1:
+            steps = (normalize_course, DisciplineClassifier(False), assign_facets)
+            for course in courses:
+                if reuse and course.get("id") in reuse:
+                    yield reuse[course["id"]], True
+                    continue
+                try:
+                    for step in steps:
+                        course = step(course)
+                except Exception as e:
+                    logging.warning(f"Error processing course {course.get('nomeCorso', 'Unknown')}: {e}")
+                    course = None
+                yield course, False
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+
+            def collect():
+                chunk, future = pending.popleft()
+                done, errors = future.result()
+                for error in errors:
+                    logging.warning(error)
+                done = iter(done)
+                for course in chunk:
+                    if reuse and course.get("id") in reuse:
+                        yield reuse[course["id"]], True
+                        continue
+                    yield next(done), False
+
+            for chunk in chunked(courses, chunk_size):
+                todo = [course for course in chunk if not (reuse and course.get("id") in reuse)]
+                pending.append((chunk, executor.submit(process_chunk, todo)))
+                if len(pending) >= workers * 2:
+                    yield from collect()
+            while pending:
+                yield from collect()
+
+    stream = results()
+    if enable_classification:
+        stream = classifier.classify_stream(stream)
+    for course, was_reused in tqdm(stream):
+        total += 1
+        reused += was_reused
+        if course is None:
             continue
+        processed += 1
+        yield course
 
-    logging.info(f"Successfully processed {len(processed_courses)}/{len(courses)} courses")
+    logging.info(f"Successfully processed {processed}/{total} courses")
+    if reused:
+        logging.info(f"Reused {reused} courses from unchanged pages")
     if enable_classification:
-        logging.info(f"Used {len(classification_cache)} unique classifications")
-    
-    return processed_courses
+        classifier.log_summary()
+    if workers <= 1:
+        log_cache_stats()
+
+
+def tee_courses(courses: Iterable[Dict[Any, Any]], writer: NormalizedCatalogWriter) -> Iterator[Dict[Any, Any]]:
+    """Pass courses through, writing each to ``writer`` on the way."""
+    for course in courses:
+        writer.write(course)
+        yield course
+
+
+def process_courses(courses: Iterable[Dict[Any, Any]], enable_classification: bool = True,
+                    reuse: Optional[Dict[Any, Dict[Any, Any]]] = None, workers: int = 1) -> List[Dict[Any, Any]]:
+    """Process raw course data with optional AI classification."""
+    return list(process_stream(courses, enable_classification, reuse, workers))
+
+
+def load_raw_pages(raw_file: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """The per-page ids and hashes recorded with a raw file, or None if it has none."""
+    changes_file = changes_path(raw_file)
+    if not changes_file.exists():
+        return None
+    with open(changes_file) as f:
+        pages = json.load(f)["pages"]
+    # Raw files fetched before page hashes were recorded cannot be matched.
+    return pages if all("hash" in page for page in pages.values()) else None
+
+
+def processing_options(classify: bool) -> Dict[str, Any]:
+    """The options that decide what a processed course looks like."""
+    if not classify:
+        return {"classify": False}
+    return {"classify": True, "model": MODEL, "prompt_hashes": [PROMPT_HASH, BATCH_PROMPT_HASH]}
+
+
+def load_reusable_courses(raw_file: Path, processed_file: Path, options: Dict[str, Any]) -> Dict[Any, Dict[Any, Any]]:
+    """Previously processed courses from raw pages identical to the ones they were built from.
+
+    Pages are matched by content hash against the processed file's reuse
+    sidecar, which is only written once processing has succeeded, so an
+    interrupted run or fetch never makes stale courses look reusable.
+    Nothing is reused when the output was built with other ``options``.
+    """
+    pages = load_raw_pages(raw_file)
+    sidecar = reuse_path(processed_file)
+    if pages is None or not sidecar.exists() or not processed_file.exists():
+        logging.info("Incremental mode: no page hashes or previous output recorded, processing everything")
+        return {}
+    with open(sidecar) as f:
+        recorded = json.load(f)
+    if recorded.get("options") != options:
+        logging.info(
+            f"Incremental mode: previous output was built with {recorded.get('options')}, "
+            f"now {options}; processing everything"
+        )
+        return {}
+    built_from = recorded["pages"]
+    unchanged = [page for number, page in pages.items() if built_from.get(number) == page["hash"]]
+    unchanged_ids = {course_id for page in unchanged for course_id in page["ids"]}
+    reusable = {course.get("id"): course for course in iter_course_file(processed_file) if course.get("id") in unchanged_ids}
+    logging.info(
+        f"Incremental mode: {len(pages) - len(unchanged)}/{len(pages)} pages changed since the last processing, "
+        f"{len(reusable)} processed courses reusable"
+    )
+    return reusable
+
+
+def save_reuse_sidecar(raw_file: Path, processed_file: Path, options: Dict[str, Any]) -> None:
+    """Record which raw pages and options ``processed_file`` was built from; call once it is fully written."""
+    pages = load_raw_pages(raw_file)
+    sidecar = reuse_path(processed_file)
+    if pages is None:
+        sidecar.unlink(missing_ok=True)
+        return
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({
+            "raw_file": raw_file.name,
+            "options": options,
+            "pages": {number: page["hash"] for number, page in pages.items()},
+        }, f)
+    tmp.replace(sidecar)
 
 
 def parse_args():
@@ -294,7 +776,21 @@ def parse_args():
         "--sleep",
         type=float,
         default=1.0,
-        help="Sleep time between API requests in seconds (default: 1.0)"
+        help="Initial delay between API requests in seconds; the rate adapts from there (default: 1.0)"
+    )
+    
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of pages fetched at once (default: 4)"
+    )
+    
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=8.0,
+        help="Upper bound on API requests per second (default: 8.0)"
     )
     
     parser.add_argument(
@@ -304,6 +800,99 @@ def parse_args():
         help="Starting page number for API fetch (default: 1)"
     )
     
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=Path,
+        help="Directory for per-page fetch checkpoints (default: pipelines/data/checkpoints/<env>)"
+    )
+    
+    parser.add_argument(
+        "--http-cache",
+        type=Path,
+        default=Path("pipelines/data/http_cache"),
+        help="Directory of the conditional-request HTTP cache (default: pipelines/data/http_cache)"
+    )
+    
+    parser.add_argument(
+        "--no-http-cache",
+        action="store_true",
+        help="Download every page in full without consulting the HTTP cache"
+    )
+    
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse processed courses from raw pages unchanged since the last successful processing"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to process courses; 0 uses every core (default: 1)"
+    )
+    
+    parser.add_argument(
+        "--classify-concurrency",
+        type=int,
+        default=8,
+        help="Classification requests in flight at once (default: 8)"
+    )
+    
+    parser.add_argument(
+        "--classify-batch-size",
+        type=int,
+        default=1,
+        help="Courses classified per API request; more share one copy of the prompt (default: 1)"
+    )
+    
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        default=REQUESTS_PER_MINUTE,
+        help=f"Classification API requests per minute (default: {REQUESTS_PER_MINUTE:g})"
+    )
+    
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=float,
+        default=TOKENS_PER_MINUTE,
+        help=f"Classification API tokens per minute (default: {TOKENS_PER_MINUTE:g})"
+    )
+    
+    parser.add_argument(
+        "--classification-cache",
+        type=Path,
+        default=CLASSIFICATION_CACHE_PATH,
+        help=f"SQLite file keeping AI classifications across runs (default: {CLASSIFICATION_CACHE_PATH})"
+    )
+    
+    parser.add_argument(
+        "--no-classification-cache",
+        action="store_true",
+        help="Classify every course through the API, ignoring and not updating the cache"
+    )
+    
+    parser.add_argument(
+        "--normalized",
+        action="store_true",
+        help="Also write the normalized catalog (<name>.normalized.json, facet tables and facet ids) "
+             "and split unused raw fields out to <name>.extras.jsonl"
+    )
+    
+    parser.add_argument(
+        "--raw-format",
+        choices=["jsonl.gz", "jsonl.zst", "jsonl", "json"],
+        default="jsonl.gz",
+        help="Format of the raw data file; JSONL formats are streamed page by page (default: jsonl.gz)"
+    )
+    
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Discard existing checkpoints and fetch every page again"
+    )
+    
     parser.add_argument(
         "--max-retries",
         type=int,
@@ -325,54 +914,120 @@ def main():
     base_url = "https://universitaly-backend.cineca.it/api/offerta-formativa/cerca-corsi"
     
     if args.env == "development":
-        raw_file = data_dir / "raw_test_courses_data.json"
+        raw_file = data_dir / f"raw_test_courses_data.{args.raw_format}"
         processed_file = data_dir / "test_courses_data.json"
     else:
-        raw_file = data_dir / "raw_all_courses_data.json"  
+        raw_file = data_dir / f"raw_all_courses_data.{args.raw_format}"
         processed_file = data_dir / "all_courses_data.json"
     
     # Fetch or load course data
     if args.fetch:
+        checkpoint_dir = args.checkpoint_dir or data_dir / "checkpoints" / args.env
+        if args.restart and checkpoint_dir.exists():
+            shutil.rmtree(checkpoint_dir)
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
         logging.info(f"Fetching fresh data in {args.env} mode...")
-        courses = fetch_all_courses(
+        writer = RawArchiveWriter(raw_file) if is_archive(raw_file) else None
+        courses, missing_pages, page_changes = fetch_all_courses(
             base_url=base_url,
             env=args.env,
             initial_page=args.start_page,
             sleep_time=args.sleep,
-            max_retries=args.max_retries
+            max_retries=args.max_retries,
+            concurrency=args.concurrency,
+            max_rate=args.max_rate,
+            checkpoint_dir=checkpoint_dir,
+            cache=None if args.no_http_cache else HttpCache(args.http_cache),
+            writer=writer,
         )
+        fetched = sum(len(page["ids"]) for page in page_changes.values())
         
-        if not courses:
-            logging.error("No courses fetched, aborting")
-            sys.exit(1)
-            
-        save_courses_to_json(courses, raw_file)
-        logging.info(f"Saved {len(courses)} raw courses to {raw_file}")
-    else:
-        if not raw_file.exists():
-            logging.error(f"Raw data file {raw_file} not found. Use --fetch to download data first.")
+        if missing_pages or not fetched:
+            if writer:
+                writer.discard()
+            if missing_pages:
+                logging.error(f"{len(missing_pages)} pages still missing after retrying: {missing_pages}")
+                logging.error(f"Fetched pages are kept in {checkpoint_dir}; run again to fetch only the missing ones")
+            else:
+                logging.error("No courses fetched, aborting")
             sys.exit(1)
-            
+
+        if writer:
+            size = writer.commit()
+            logging.info(f"Saved {fetched} raw courses to {raw_file} ({size / 1024 / 1024:.1f} MB)")
+        else:
+            save_courses_to_json(courses, raw_file)
+            logging.info(f"Saved {fetched} raw courses to {raw_file}")
+        with open(changes_path(raw_file), "w") as f:
+            json.dump({"pages": page_changes}, f)
+        # The next --fetch should download fresh data, not resume this one.
+        shutil.rmtree(checkpoint_dir)
+
+    if not raw_file.exists() and not args.fetch:
+        # Checkouts fetched before the streamed formats only have the JSON file.
+        legacy_file = raw_file.with_name(f"{raw_file.name.split('.')[0]}.json")
+        if legacy_file.exists():
+            logging.info(f"{raw_file} not found, using {legacy_file}")
+            raw_file = legacy_file
+    if not raw_file.exists():
+        logging.error(f"Raw data file {raw_file} not found. Use --fetch to download data first.")
+        sys.exit(1)
+    if not args.fetch:
         logging.info(f"Loading existing data from {raw_file}")
-        courses = load_courses_from_json(raw_file)
+    courses = load_raw_courses(raw_file)
 
     # Process courses
     logging.info("Starting course processing...")
-    processed_courses = process_courses(courses, enable_classification=args.classify)
+    options = processing_options(args.classify)
+    reuse = load_reusable_courses(raw_file, processed_file, options) if args.incremental else None
+    workers = args.workers or os.cpu_count() or 1
+    classifier = None
+    if args.classify:
+        classifier = DisciplineClassifier(
+            store=None if args.no_classification_cache else open_cache(args.classification_cache),
+            api=DisciplineAPI(args.requests_per_minute, args.tokens_per_minute, max_retries=args.max_retries),
+            concurrency=args.classify_concurrency,
+            batch_size=args.classify_batch_size,
+        )
+    processed_courses = process_stream(courses, enable_classification=args.classify, reuse=reuse, workers=workers,
+                                       classifier=classifier)
     
-    if not processed_courses:
+    first = next(processed_courses, None)
+    if first is None:
         logging.error("No courses processed successfully, aborting")
         sys.exit(1)
     
-    # Save processed data
-    save_courses_to_json(processed_courses, processed_file)
-    logging.info(f"Saved {len(processed_courses)} processed courses to {processed_file}")
+    processed_courses = itertools.chain([first], processed_courses)
+    normalized = NormalizedCatalogWriter(normalized_path(processed_file)) if args.normalized else None
+    if normalized:
+        processed_courses = tee_courses(processed_courses, normalized)
+    
+    # Save processed data, streaming every course straight to disk
+    try:
+        total = write_course_files(processed_courses, processed_file)
+    except BaseException:
+        if normalized:
+            normalized.discard()
+        raise
+    logging.info(f"Saved {total} processed courses to {processed_file} and {jsonl_path(processed_file)}")
+    save_reuse_sidecar(raw_file, processed_file, options)
+    if classifier and classifier.store:
+        classifier.store.close()
+    if normalized:
+        sizes = normalized.commit()
+        full_size = processed_file.stat().st_size
+        logging.info(
+            f"Saved normalized catalog to {normalized.path} ({sizes['catalog'] / 1024 / 1024:.1f} MB, "
+            f"{sizes['catalog'] / full_size:.0%} of {full_size / 1024 / 1024:.1f} MB) and unused raw fields "
+            f"to {extras_path(normalized.path)} ({sizes['extras'] / 1024 / 1024:.1f} MB)"
+        )
     
     # Summary
     logging.info("=" * 50)
     logging.info("PROCESSING COMPLETE")
     logging.info(f"Environment: {args.env}")
-    logging.info(f"Total courses: {len(processed_courses)}")
+    logging.info(f"Total courses: {total}")
     logging.info(f"AI Classification: {'Enabled' if args.classify else 'Disabled'}")
     logging.info(f"Output file: {processed_file}")
     logging.info("=" * 50)
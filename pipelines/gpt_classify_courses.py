@@ -1,71 +1,253 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import List
+
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import os
+from unidecode import unidecode
+
+from rate_limit import TokenBucket, parse_retry_after
+
+MODEL = "gpt-4o-mini"
+
+DISCIPLINES = [
+    "Agricoltura",
+    "Antropologia",
+    "Architettura, Edilizia e Pianificazione",
+    "Scienze Biologiche",
+    "Economia Aziendale e Management",
+    "Chimica",
+    "Comunicazione e Studi sui Media",
+    "Informatica",
+    "Arti Creative e Design",
+    "Economia",
+    "Scienze dell'Educazione",
+    "Ingegneria",
+    "Scienze Ambientali",
+    "Finanza",
+    "Scienze Alimentari",
+    "Scienze Forensi e Archeologiche",
+    "Geografia",
+    "Geologia",
+    "Storia e Archeologia",
+    "Servizi Informativi",
+    "Lingue",
+    "Giurisprudenza",
+    "Lettere",
+    "Scienza dei Materiali",
+    "Matematica",
+    "Medicina",
+    "Professioni sanitarie tecniche",
+    "Filosofia",
+    "Fisica",
+    "Scienze Politiche e Governo",
+    "Psicologia",
+    "Servizio Sociale",
+    "Sociologia",
+    "Teologia e Studi Religiosi",
+    "Scienze Veterinarie",
+    "Farmacia",
+    "Altro",
+]
+
+PROMPT = """You are an expert at data classification. You will be given a course_name and course_materia and are tasked wiht classifying the course name into one of these disciplines:
+      {disciplines}"""
+
+BATCH_PROMPT = """You are an expert at data classification. You will be given a numbered list of courses, one per line with its index, course_name and course_materia, and are tasked with classifying each course name into one of these disciplines:
+      {disciplines}
+Answer with one item per course, giving its index and its discipline."""
+
+SYSTEM_PROMPT = PROMPT.format(disciplines=", ".join(DISCIPLINES))
+BATCH_SYSTEM_PROMPT = BATCH_PROMPT.format(disciplines=", ".join(DISCIPLINES))
+
+
+def prompt_hash(system_prompt):
+    """Short hash of a system prompt, which includes the discipline list."""
+    return hashlib.sha256(system_prompt.encode()).hexdigest()[:16]
+
+
+# Cached classifications are keyed by the hash of the prompt that produced
+# them, so answers made with another version are not reused. Lookups accept
+# an answer from either prompt; changing one only invalidates its own entries.
+PROMPT_HASH = prompt_hash(SYSTEM_PROMPT)
+BATCH_PROMPT_HASH = prompt_hash(BATCH_SYSTEM_PROMPT)
+
+
+class CourseDiscipline(BaseModel):
+    name: str
+
+
+class IndexedDiscipline(BaseModel):
+    index: int
+    name: str
+
+
+class CourseDisciplines(BaseModel):
+    items: List[IndexedDiscipline]
+
+
+# Default limits; keep them under the account's OpenAI rate limits.
+REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+TOKENS_PER_MINUTE = float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+# Completion tokens budgeted per request; the answer is one discipline name.
+COMPLETION_TOKENS = 20
+
+
+class ClassificationError(Exception):
+    """The API gave no valid discipline for a course, even after retrying."""
+
+
+@lru_cache(maxsize=None)
+def get_client():
+    """The OpenAI client, created on first use so importing needs no API key.
+
+    Retries are left to DisciplineAPI. OPENAI_BASE_URL points it at another
+    endpoint, such as the stub server in benchmarks/classify_bench.py.
+    """
+    from openai import OpenAI
+
+    # httpx logs every request at INFO, thousands per classified catalog.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    load_dotenv(".env.production")
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, timeout=30.0)
+
+
+def user_message(course_name, course_materia):
+    return f"Course Name: {course_name}, Course Materia: {course_materia}"
+
+
+def batch_message(courses):
+    return "\n".join(f"{index}: {user_message(name, materia)}" for index, (name, materia) in enumerate(courses))
+
+
+def estimate_tokens(system_prompt, message, answers=1):
+    """Rough token count of one request (about four characters per token)."""
+    return (len(system_prompt) + len(message)) // 4 + COMPLETION_TOKENS * answers
+
+
+_CANONICAL = {" ".join(unidecode(name).lower().split()): name for name in DISCIPLINES}
+
+
+def validate_discipline(name):
+    """The allowed discipline ``name`` stands for, ignoring case, accents and spacing; None if there is none."""
+    if name in DISCIPLINES:
+        return name
+    return _CANONICAL.get(" ".join(unidecode(name or "").lower().split()))
+
+
+class DisciplineAPI:
+    """Thread-safe classification calls under request and token rate limits.
+
+    Every call waits for both limiters, so any number of threads can share one
+    instance. Throttling (429, honouring Retry-After), server errors, timeouts
+    and answers outside DISCIPLINES are retried with exponential back-off.
+    :meth:`classify_batch` classifies many courses with one request and one
+    copy of the prompt.
+    """
+
+    def __init__(self, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = TOKENS_PER_MINUTE, max_retries: int = 4,
+                 backoff_factor: float = 1.0):
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute / 60,
+                                    min_rate=requests_per_minute / 600, burst=max(1.0, requests_per_minute / 60))
+        # Ten seconds of token budget may be spent at once.
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 60, burst=tokens_per_minute / 6)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "retries": 0, "throttled": 0, "invalid": 0, "failed": 0}
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def _send(self, description, system_prompt, message, response_format, answers, accept):
+        """Send one request until ``accept`` takes its parsed reply, retrying with back-off.
+
+        ``accept`` returns the result, or None to discard the reply as invalid.
+        Raises ClassificationError when every attempt failed.
+        """
+        import openai
+
+        cost = estimate_tokens(system_prompt, message, answers)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+            self.requests.acquire()
+            self.tokens.acquire(cost)
+            self._count("requests")
+            wait = self.backoff_factor * (2 ** attempt)
+            try:
+                completion = get_client().beta.chat.completions.parse(
+                    model=MODEL,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": message},
+                    ],
+                    response_format=response_format,
+                )
+            except openai.APIStatusError as e:
+                if e.status_code == 429:
+                    self._count("throttled")
+                    retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                    self.requests.throttled(retry_after)
+                    wait = retry_after if retry_after is not None else wait
+                elif e.status_code < 500:
+                    raise ClassificationError(f"API error {e.status_code} for {description}: {e}") from e
+                logging.debug(f"API error {e.status_code} classifying {description}, attempt {attempt + 1}")
+            except (openai.APIConnectionError, ValueError) as e:
+                # ValueError: a reply that does not parse as response_format.
+                logging.debug(f"{type(e).__name__} classifying {description}, attempt {attempt + 1}: {e}")
+            else:
+                self.requests.succeeded()
+                parsed = completion.choices[0].message.parsed
+                result = accept(parsed) if parsed else None
+                if result is not None:
+                    return result
+                self._count("invalid")
+                logging.debug(f"Discarding the answer for {description}: {parsed!r}")
+                wait = 0
+            if attempt < self.max_retries and wait:
+                time.sleep(wait)
+        self._count("failed")
+        raise ClassificationError(f"No valid discipline for {description} after {self.max_retries + 1} attempts")
+
+    def classify(self, course_name, course_materia):
+        return self._send(
+            course_name, SYSTEM_PROMPT, user_message(course_name, course_materia), CourseDiscipline, 1,
+            lambda parsed: validate_discipline(parsed.name),
+        )
+
+    def classify_batch(self, courses):
+        """Disciplines for many ``(course_name, course_materia)`` pairs in one request.
+
+        Returns one entry per pair, in order; None where the answer was
+        missing or not an allowed discipline, so the caller can classify that
+        course on its own. Raises ClassificationError if the request failed.
+        """
+        def accept(parsed):
+            answers = [None] * len(courses)
+            for item in parsed.items:
+                if 0 <= item.index < len(courses) and answers[item.index] is None:
+                    answers[item.index] = validate_discipline(item.name)
+            return answers
+
+        with self._lock:
+            self.stats["batches"] += 1
+        return self._send(
+            f"a batch of {len(courses)} courses", BATCH_SYSTEM_PROMPT, batch_message(courses),
+            CourseDisciplines, len(courses), accept,
+        )
 
-load_dotenv(".env.production")
-openai_api_key = os.getenv("OPENAI_API_KEY")
-from openai import OpenAI
 
-client = OpenAI(api_key=openai_api_key)
+@lru_cache(maxsize=None)
+def default_api():
+    return DisciplineAPI()
 
 
 def classify_course_discipline(course_name, course_materia):
-    class CourseDiscipline(BaseModel):
-        name: str
-
-    disciplines = [
-        "Agricoltura",
-        "Antropologia",
-        "Architettura, Edilizia e Pianificazione",
-        "Scienze Biologiche",
-        "Economia Aziendale e Management",
-        "Chimica",
-        "Comunicazione e Studi sui Media",
-        "Informatica",
-        "Arti Creative e Design",
-        "Economia",
-        "Scienze dell'Educazione",
-        "Ingegneria",
-        "Scienze Ambientali",
-        "Finanza",
-        "Scienze Alimentari",
-        "Scienze Forensi e Archeologiche",
-        "Geografia",
-        "Geologia",
-        "Storia e Archeologia",
-        "Servizi Informativi",
-        "Lingue",
-        "Giurisprudenza",
-        "Lettere",
-        "Scienza dei Materiali",
-        "Matematica",
-        "Medicina",
-        "Professioni sanitarie tecniche",
-        "Filosofia",
-        "Fisica",
-        "Scienze Politiche e Governo",
-        "Psicologia",
-        "Servizio Sociale",
-        "Sociologia",
-        "Teologia e Studi Religiosi",
-        "Scienze Veterinarie",
-        "Farmacia",
-        "Altro",
-    ]
-
-    prompt = f"""You are an expert at data classification. You will be given a course_name and course_materia and are tasked wiht classifying the course name into one of these disciplines:
-      {', '.join(disciplines)}"""
-    completion = client.beta.chat.completions.parse(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": prompt},
-            {
-                "role": "user",
-                "content": f"Course Name: {course_name}, Course Materia: {course_materia}",
-            },
-        ],
-        response_format=CourseDiscipline,
-    )
-
-    course_discipline = completion.choices[0].message.parsed.name
-    return course_discipline
+    return default_api().classify(course_name, course_materia)
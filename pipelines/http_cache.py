@@ -0,0 +1,99 @@
+"""Persistent on-disk cache of HTTP responses for conditional re-fetching.
+
+For every URL the cache keeps the last body (gzipped) and its validators:
+the ETag and Last-Modified headers the server sent, and a SHA-256 of the
+body. The next request for the URL carries If-None-Match/If-Modified-Since,
+so an unchanged page costs a 304 instead of a full download. Servers that
+ignore validators still answer 200; comparing the content hash then tells
+whether the page really changed.
+
+Layout under the cache directory, keyed by the SHA-256 of the URL:
+
+    <key>.json     url, etag, last_modified, content_hash, fetched_at, changed_at
+    <key>.body.gz  the last body
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _write_atomic(path: Path, payload: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(payload)
+    tmp.replace(path)
+
+
+class HttpCache:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"not_modified": 0, "unchanged": 0, "changed": 0}
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.body.gz"
+
+    def entry(self, url: str) -> Optional[Dict[str, str]]:
+        meta_path, body_path = self._paths(url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        try:
+            return json.loads(meta_path.read_text())
+        except ValueError:
+            return None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Validator headers for the next request; empty when nothing is cached."""
+        entry = self.entry(url)
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def body(self, url: str) -> bytes:
+        return gzip.decompress(self._paths(url)[1].read_bytes())
+
+    def not_modified(self, url: str) -> bytes:
+        """Record a 304 and return the cached body."""
+        meta_path, _ = self._paths(url)
+        entry = self.entry(url)
+        entry["fetched_at"] = _now()
+        _write_atomic(meta_path, json.dumps(entry).encode())
+        self._count("not_modified")
+        return self.body(url)
+
+    def store(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+        """Record a full response; returns whether the body differs from the cached one."""
+        meta_path, body_path = self._paths(url)
+        previous = self.entry(url)
+        content_hash = hashlib.sha256(body).hexdigest()
+        changed = not previous or previous.get("content_hash") != content_hash
+        if changed:
+            _write_atomic(body_path, gzip.compress(body, mtime=0))
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": content_hash,
+            "fetched_at": _now(),
+            "changed_at": _now() if changed else previous.get("changed_at"),
+        }
+        _write_atomic(meta_path, json.dumps(entry).encode())
+        self._count("changed" if changed else "unchanged")
+        return changed
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
@@ -8,19 +8,20 @@ import csv
 import argparse
 from pathlib import Path
 from collections import defaultdict
+from typing import Iterator
 import logging
 
+from course_stream import iter_course_file
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def load_course_data(input_file: Path) -> list:
-    """Load processed course data from JSON file."""
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        return data.get('courses', [])
+def load_course_data(input_file: Path) -> Iterator[dict]:
+    """Stream processed course data (from the JSONL output when present)."""
+    return iter_course_file(input_file)
 
 def extract_universities(courses: list) -> dict:
     """Extract unique universities with metadata."""
@@ -165,15 +166,15 @@ def main():
     logging.info(f"Loading course data from {args.input}")
     courses = load_course_data(args.input)
     
-    if not courses:
+    # Extract universities, reading the courses one at a time
+    universities = extract_universities(courses)
+    
+    if not universities:
         logging.error("No courses found in input file")
         return 1
     
-    # Extract universities
-    logging.info(f"Extracting universities from {len(courses)} courses")
-    universities = extract_universities(courses)
-    
-    logging.info(f"Found {len(universities)} unique universities")
+    total = sum(uni['courses_count'] for uni in universities.values())
+    logging.info(f"Found {len(universities)} unique universities across {total} courses")
     
     # Load aliases
     aliases = load_aliases(args.aliases)
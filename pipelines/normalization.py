@@ -0,0 +1,87 @@
+"""Normalization of facet ids and display names shared by the pipeline scripts.
+
+The same few hundred university, location, degree, language and discipline
+names come up on every course, so each function compiles its patterns once
+and memoizes results per raw string in a bounded LRU table. ``cache_stats``
+reports how well the tables are doing.
+"""
+
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+
+from unidecode import unidecode
+
+# Distinct names per table; the catalog has well under this many of each kind.
+CACHE_SIZE = 4096
+
+# Lowercase words that should not be capitalized
+LOWERCASE_WORDS = frozenset({
+    "della", "di", "e", "con", "per", "dell", "degli", "del",
+    "a", "da", "in", "su", "tra", "fra",
+})
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_ID = re.compile(r"[^a-z0-9_]")
+_UNIVERSITY_PREFIX = re.compile(r"università\s+(degli\s+studi\s+di\s+|telematica\s+|commerciale\s+|cattolica\s+|libera\s+)")
+_ARTICLES = re.compile(r"\s+(di\s+|del\s+|della\s+|degli\s+|delle\s+)")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def create_id_from_name(name: str) -> str:
+    """Facet id for a display name: ASCII-folded, lowercase, underscores for spaces."""
+    name = unidecode(name.lower())
+    name = _WHITESPACE.sub("_", name)
+    return _NON_ID.sub("", name)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def capitalize_name(name: str) -> str:
+    """Title-case a name, keeping Italian articles and prepositions lowercase."""
+    words = name.split()
+    capitalized_words = [words[0].capitalize()] + [
+        word.capitalize() if word.lower() not in LOWERCASE_WORDS else word.lower()
+        for word in words[1:]
+    ]
+    return " ".join(capitalized_words)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def university_domain_stem(name: str) -> Optional[str]:
+    """First significant word of a university name, used to guess its domain."""
+    clean_name = _UNIVERSITY_PREFIX.sub("", name.lower())
+    clean_name = _ARTICLES.sub("", clean_name)
+    clean_name = _PUNCTUATION.sub("", clean_name)
+    words = clean_name.split()
+    return words[0] if words else None
+
+
+NORMALIZERS = (create_id_from_name, capitalize_name, university_domain_stem)
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Hits, misses, size and hit rate of every memoization table."""
+    stats = {}
+    for normalizer in NORMALIZERS:
+        info = normalizer.cache_info()
+        calls = info.hits + info.misses
+        stats[normalizer.__name__] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hit_rate": info.hits / calls if calls else 0.0,
+        }
+    return stats
+
+
+def log_cache_stats() -> None:
+    for name, stats in cache_stats().items():
+        if stats["hits"] or stats["misses"]:
+            logging.info(
+                f"Normalization cache {name}: {stats['hit_rate']:.1%} hits "
+                f"({stats['hits']} hits, {stats['size']} distinct names)"
+            )
+
@@ -0,0 +1,83 @@
+"""Adaptive request rate limiting shared by the pipeline's HTTP fetchers."""
+
+import email.utils
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """A thread-safe token bucket whose rate adapts to the server's responses.
+
+    Every request takes one token (or its cost, to limit e.g. API tokens per
+    minute); tokens refill at ``rate`` per second up to
+    ``burst``. A throttled response (429) halves the rate and, with a
+    Retry-After, stops all callers until it has passed. Each healthy response
+    adds ``increase`` requests per second back, up to ``max_rate`` (additive
+    increase, multiplicative decrease).
+    """
+
+    def __init__(self, rate: float, max_rate: float, min_rate: float = 0.1,
+                 burst: float = 1.0, increase: float = 0.25):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(rate, min_rate), self.max_rate)
+        self.burst = burst
+        self.increase = increase
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """Block until a request costing ``amount`` tokens (capped at ``burst``) may be sent."""
+        amount = min(amount, self.burst)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= amount:
+                        self._tokens -= amount
+                        return
+                    wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            rate = self.rate
+        logging.warning(f"Throttled by server, request rate lowered to {rate:.2f}/s")
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
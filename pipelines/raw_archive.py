@@ -0,0 +1,172 @@
+"""Streaming JSON Lines archive of raw Universitaly pages.
+
+Courses are written one JSON object per line, a page at a time, so the fetch
+never holds the whole catalog in memory. With ``.jsonl.gz`` or ``.jsonl.zst``
+every page is its own gzip member or zstd frame; concatenated members are
+still one valid stream, so ``zcat`` and other tools read the file as usual.
+
+A sidecar ``<archive>.index.json`` maps each page to the byte offset and
+length of its member, so a single page can be read without decompressing the
+rest, and pages can be written in whatever order they arrive:
+
+    {"format": 1, "compression": "gzip", "courses": 1234,
+     "pages": {"1": {"offset": 0, "length": 2048, "count": 10}, ...}}
+
+zstd needs the ``zstandard`` package; gzip and plain JSONL need nothing extra.
+"""
+
+import gzip
+import io
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+FORMAT_VERSION = 1
+SUFFIXES = {".jsonl": None, ".jsonl.gz": "gzip", ".jsonl.zst": "zstd"}
+
+
+def compression_for(path: Path) -> Optional[str]:
+    for suffix, compression in SUFFIXES.items():
+        if path.name.endswith(suffix):
+            return compression
+    raise ValueError(f"Unsupported raw archive name {path.name}, expected one of {', '.join(SUFFIXES)}")
+
+
+def is_archive(path: Path) -> bool:
+    return any(path.name.endswith(suffix) for suffix in SUFFIXES)
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".index.json")
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("zstd raw archives need the zstandard package (pip install zstandard)") from e
+    return zstandard
+
+
+def _compress(raw: bytes, compression: Optional[str]) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor(level=10).compress(raw)
+    return raw
+
+
+def _decompress(payload: bytes, compression: Optional[str]) -> bytes:
+    if compression == "gzip":
+        return gzip.decompress(payload)
+    if compression == "zstd":
+        return _zstandard().ZstdDecompressor().decompressobj().decompress(payload)
+    return payload
+
+
+class RawArchiveWriter:
+    """Appends pages to an archive; thread-safe, one page per call.
+
+    Everything is written to temporary files that replace the archive and its
+    index only on :meth:`commit`, so an interrupted fetch never leaves a
+    truncated archive in place of the previous one.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.compression = compression_for(self.path)
+        if self.compression == "zstd":
+            _zstandard()
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._file = open(self._tmp, "wb")
+        self._lock = threading.Lock()
+        self.pages: Dict[int, Dict[str, int]] = {}
+        self.courses = 0
+
+    def write_page(self, page: int, courses: List[Dict[Any, Any]]) -> None:
+        raw = "".join(json.dumps(course, ensure_ascii=False) + "\n" for course in courses).encode()
+        payload = _compress(raw, self.compression)
+        with self._lock:
+            if page in self.pages:
+                raise ValueError(f"Page {page} already written")
+            offset = self._file.tell()
+            self._file.write(payload)
+            self.pages[page] = {"offset": offset, "length": len(payload), "count": len(courses)}
+            self.courses += len(courses)
+
+    def commit(self) -> int:
+        """Close the archive, move it into place and write its index; returns its size in bytes."""
+        self._file.close()
+        self._tmp.replace(self.path)
+        index = {
+            "format": FORMAT_VERSION,
+            "compression": self.compression,
+            "courses": self.courses,
+            "pages": {str(page): self.pages[page] for page in sorted(self.pages)},
+        }
+        tmp_index = index_path(self.path).with_suffix(".tmp")
+        tmp_index.write_text(json.dumps(index))
+        tmp_index.replace(index_path(self.path))
+        return self.path.stat().st_size
+
+    def discard(self) -> None:
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+def read_index(path: Path) -> Dict[str, Any]:
+    with open(index_path(path)) as f:
+        index = json.load(f)
+    if index.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported raw archive index format in {index_path(path)}")
+    return index
+
+
+def _parse(raw: bytes) -> List[Dict[Any, Any]]:
+    return [json.loads(line) for line in raw.splitlines() if line.strip()]
+
+
+def read_page(path: Path, page: int, index: Optional[Dict[str, Any]] = None) -> List[Dict[Any, Any]]:
+    """The courses of one page, read from its member alone."""
+    index = index or read_index(path)
+    entry = index["pages"][str(page)]
+    with open(path, "rb") as f:
+        f.seek(entry["offset"])
+        return _parse(_decompress(f.read(entry["length"]), index["compression"]))
+
+
+def iter_pages(path: Path) -> Iterator[Tuple[int, List[Dict[Any, Any]]]]:
+    """``(page, courses)`` in page order, one page in memory at a time."""
+    index = read_index(path)
+    with open(path, "rb") as f:
+        for page, entry in sorted(index["pages"].items(), key=lambda item: int(item[0])):
+            f.seek(entry["offset"])
+            yield int(page), _parse(_decompress(f.read(entry["length"]), index["compression"]))
+
+
+def iter_courses(path: Path) -> Iterator[Dict[Any, Any]]:
+    """Every course in page order.
+
+    Without an index (processed JSONL, or a file produced by other tools)
+    the file is streamed front to back instead, in file order.
+    """
+    if index_path(path).exists():
+        for _, courses in iter_pages(path):
+            yield from courses
+        return
+
+    logging.debug(f"No index for {path}, reading it sequentially")
+    compression = compression_for(path)
+    if compression == "gzip":
+        f = gzip.open(path, "rb")
+    elif compression == "zstd":
+        reader = _zstandard().ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+        f = io.BufferedReader(reader)
+    else:
+        f = open(path, "rb")
+    with f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -1,60 +1,339 @@
-"""Script to take a JSON file of (already processed) course data and upload it to Firestore and Cloud Storage."""
+"""Script to take a JSON file of (already processed) course data and upload it to Firestore and Cloud Storage.
 
-import os
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
-import grpc
+Storage and Firestore are reached through functions/data_backend.py, so
+DATA_BACKEND=local publishes to files under LOCAL_DATA_DIR instead.
+"""
+
+import argparse
+import gzip
 import json
-from google.cloud.firestore_v1.services.firestore import FirestoreClient
-from google.cloud.firestore_v1.services.firestore.transports import (
-    FirestoreGrpcTransport,
+import secrets
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# The data backend is shared with the Cloud Functions source.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "functions"))
+from catalog import (  # noqa: E402
+    CATALOG_NAME, CATALOG_PREFIX, LEGACY_CATALOG_PATH, MAX_DELTAS, POINTER_PATH, SHARD_FACETS, delta_path,
+    download_json, generation_path, manifest_path, shard_name,
 )
+from catalog_stats import write_stats  # noqa: E402
+from data_backend import BlobNotFound, get_backend  # noqa: E402
 
 # Determine the environment and load the appropriate .env file
 env = "development"
 if env == "development":
-    cred = credentials.Certificate("dev_firebase_config.json")
-    firebase_app = firebase_admin.initialize_app(
-        cred, {"storageBucket": "guidauniversitaria.appspot.com"}
-    )
-    os.environ["STORAGE_EMULATOR_HOST"] = "http://127.0.0.1:9199"
-    db = firestore.client(app=firebase_app)
-
-    # Create a channel and transport for Firestore client
-    channel = grpc.insecure_channel("localhost:8080")
-    transport = FirestoreGrpcTransport(channel=channel)
-    db._firestore_api_internal = FirestoreClient(transport=transport)
     json_courses_path = "pipelines/data/test_courses_data.json"
-
 else:
-    firebase_app = firebase_admin.initialize_app(
-        {"storageBucket": "prod_project_id.appspot.com"}
-    )
-    db = firestore.client(app=firebase_app)
     json_courses_path = "pipelines/data/all_courses_data.json"
 
+# The storage layout comes from functions/catalog.py. Every publish goes to
+# catalog/generations/<generation>/ and only then is the pointer flipped.
+GENERATION_HISTORY = 20
+
+# Facets whose course counts are tracked in generation deltas.
+FACETS = ("discipline", "university", "location", "degree_type", "program_type", "language")
+
 
 def save_to_firestore(courses):
-    collection_ref = db.collection("courses")
-    for course in courses:
-        # Use the 'id' field from the course data as the document ID
-        doc_id = str(course.get("id"))
-        if doc_id:
-            doc_ref = collection_ref.document(doc_id)
-            doc_ref.set(course)
-        else:
-            print("Course data is missing 'id' field:", course)
-    print("Data has been written to Firestore.")
+    written = get_backend().write_courses(courses)
+    print(f"{written} courses have been written to Firestore.")
+
+
+def gzip_payload(raw):
+    """Gzip bytes deterministically so identical content yields identical bytes."""
+    # mtime=0 keeps the gzip header stable across runs, which makes the
+    # checksum comparison against the existing blob meaningful.
+    return gzip.compress(raw, compresslevel=9, mtime=0)
+
+
+def upload_bytes_to_storage(raw, storage_path, cache_control=None):
+    """Upload JSON bytes gzipped, skipping the upload when the blob is unchanged.
+
+    The blob is stored with ``Content-Encoding: gzip`` so Storage clients
+    decompress it transparently on download. Returns True if an upload happened.
+    """
+    backend = get_backend()
+    payload = gzip_payload(raw)
+
+    if backend.blob_matches(storage_path, payload, content_encoding="gzip"):
+        print(f"File {storage_path} is unchanged, skipping upload.")
+        return False
+
+    backend.write_blob(storage_path, payload, content_encoding="gzip", cache_control=cache_control)
+    print(f"Uploaded {storage_path} ({len(raw)} bytes -> {len(payload)} bytes gzipped).")
+    return True
 
 
 def upload_json_to_storage(local_file_path, storage_path):
-    bucket = storage.bucket()
-    blob = bucket.blob(storage_path)
-    blob.upload_from_filename(local_file_path)
-    print(f"File {local_file_path} uploaded to {storage_path}.")
+    with open(local_file_path, "rb") as f:
+        return upload_bytes_to_storage(f.read(), storage_path)
 
 
-if __name__ == "__main__":
-    all_courses = json.load(open(json_courses_path))["courses"]
+def publish_bytes(raw, storage_path, previous_path=None):
+    """Write a generation blob, copying it server-side when the previous generation has the same bytes."""
+    backend = get_backend()
+    if previous_path and backend.blob_matches(previous_path, gzip_payload(raw), content_encoding="gzip"):
+        backend.copy_blob(previous_path, storage_path)
+        return False
+    return upload_bytes_to_storage(raw, storage_path)
+
+
+def download_json_blob(storage_path):
+    """The decoded JSON blob, or None if it does not exist."""
+    try:
+        return download_json(storage_path)
+    except BlobNotFound:
+        return None
+
+
+def new_generation():
+    # Microseconds plus a random suffix, so two publishes in the same second
+    # never share a prefix; ids still sort by publish time.
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + "-" + secrets.token_hex(2)
+
+
+def build_shards(courses):
+    """Group courses by the id of each sharded facet."""
+    shards = {facet: {} for facet in SHARD_FACETS}
+    for course in courses:
+        for facet in SHARD_FACETS:
+            facet_data = course.get(facet) or {}
+            facet_id = facet_data.get("id")
+            if not facet_id:
+                continue
+            shard = shards[facet].setdefault(
+                facet_id, {"name": facet_data.get("name"), "courses": []}
+            )
+            shard["courses"].append(course)
+    return shards
+
+
+def facet_counts(courses):
+    counts = {facet: {} for facet in FACETS}
+    for course in courses:
+        for facet in FACETS:
+            facet_data = course.get(facet) or {}
+            if facet_data.get("id"):
+                entry = counts[facet].setdefault(
+                    facet_data["id"], {"name": facet_data.get("name"), "count": 0}
+                )
+                entry["count"] += 1
+    return counts
+
+
+def build_delta(previous_courses, courses, previous, generation):
+    """Describe how to turn one generation's catalog into the next.
+
+    Returns None when course ids are not unique, since records could not be
+    matched up reliably; functions then fall back to a full load.
+    """
+    before = {course.get("id"): course for course in previous_courses}
+    after = {course.get("id"): course for course in courses}
+    if len(before) != len(previous_courses) or len(after) != len(courses):
+        return None
+
+    before_counts = facet_counts(previous_courses)
+    after_counts = facet_counts(courses)
+    facet_changes = {}
+    for facet in FACETS:
+        changed = {}
+        for facet_id in before_counts[facet].keys() | after_counts[facet].keys():
+            old = before_counts[facet].get(facet_id)
+            new = after_counts[facet].get(facet_id)
+            if old != new:
+                changed[facet_id] = new or {"name": old["name"], "count": 0}
+        if changed:
+            facet_changes[facet] = changed
+
+    return {
+        "from": previous,
+        "to": generation,
+        "added": [course for course_id, course in after.items() if course_id not in before],
+        "updated": [
+            course for course_id, course in after.items()
+            if course_id in before and before[course_id] != course
+        ],
+        "deleted": [course_id for course_id in before if course_id not in after],
+        "facets": facet_changes,
+        # Course ids in catalog order, so patched catalogs keep the same order
+        # (and therefore the same search tie-breaks) as a full load.
+        "order": list(after),
+    }
+
+
+def read_pointer():
+    return download_json_blob(POINTER_PATH) or {}
+
+
+def write_pointer(generation, history):
+    pointer = {
+        "generation": generation,
+        "published_at": datetime.now(timezone.utc).isoformat(),
+        "history": ([generation] + [g for g in history if g != generation])[:GENERATION_HISTORY],
+    }
+    # Functions poll this object, so it must never be served from a cache.
+    upload_bytes_to_storage(json.dumps(pointer).encode(), POINTER_PATH, cache_control="no-cache, max-age=0")
+    return pointer
+
+
+def publish_generation(courses, catalog_raw, previous):
+    """Upload the catalog, its shards, a manifest and a delta under a fresh generation prefix.
+
+    Returns the new generation, or the previous one when the catalog is
+    byte-identical to it and nothing needs publishing.
+    """
+    if previous:
+        previous_catalog_path = generation_path(previous, CATALOG_NAME)
+        if get_backend().blob_matches(previous_catalog_path, gzip_payload(catalog_raw), content_encoding="gzip"):
+            print(f"Catalog unchanged since generation {previous}, nothing to publish.")
+            return previous
+
+    generation = new_generation()
+
+    def previous_path(name):
+        return generation_path(previous, name) if previous else None
+
+    publish_bytes(catalog_raw, generation_path(generation, CATALOG_NAME))
+
+    manifest = {"generation": generation, "full": CATALOG_NAME, "total": len(courses), "facets": {}}
+    for facet, by_id in build_shards(courses).items():
+        entries = manifest["facets"][facet] = {}
+        for facet_id, shard in sorted(by_id.items()):
+            name = shard_name(facet, facet_id)
+            raw = json.dumps({"courses": shard["courses"]}).encode()
+            publish_bytes(raw, generation_path(generation, name), previous_path(name))
+            entries[facet_id] = {"name": shard["name"], "count": len(shard["courses"]), "path": name}
+    upload_bytes_to_storage(json.dumps(manifest).encode(), manifest_path(generation))
+
+    if previous:
+        previous_catalog = download_json_blob(generation_path(previous, CATALOG_NAME))
+        delta = build_delta(previous_catalog["courses"], courses, previous, generation) if previous_catalog else None
+        if delta is not None:
+            upload_bytes_to_storage(json.dumps(delta).encode(), delta_path(generation))
+            print(
+                f"Delta from {previous}: {len(delta['added'])} added, "
+                f"{len(delta['updated'])} updated, {len(delta['deleted'])} deleted."
+            )
+
+    print(f"Published catalog generation {generation}.")
+    return generation
+
+
+def list_generations():
+    """Every generation with blobs in Storage, oldest first."""
+    prefix = f"{CATALOG_PREFIX}/generations/"
+    return sorted({path[len(prefix):].split("/", 1)[0] for path in get_backend().list_blobs(prefix)})
+
+
+def delta_ancestors(generation, steps=MAX_DELTAS):
+    """The generations functions may still serve and patch forward to ``generation``."""
+    ancestors = []
+    while generation and len(ancestors) < steps:
+        delta = download_json_blob(delta_path(generation))
+        if not delta:
+            break
+        generation = delta["from"]
+        ancestors.append(generation)
+    return ancestors
+
+
+def prune_generations(pointer, keep):
+    """Delete all but the ``keep`` newest generations; returns the ones deleted.
+
+    The current generation, the ones in the pointer history (rollback
+    targets) and those within MAX_DELTAS deltas of the current one are always
+    kept, since function instances may still be loading shards from them.
+    """
+    generations = list_generations()
+    current = pointer.get("generation")
+    kept = set(generations[-keep:]) | set(pointer.get("history", [])[:keep]) | {current}
+    kept.update(delta_ancestors(current))
+    deleted = [generation for generation in generations if generation not in kept]
+    backend = get_backend()
+    for generation in deleted:
+        backend.delete_blobs(backend.list_blobs(f"{CATALOG_PREFIX}/generations/{generation}/"))
+    return deleted
+
+
+def rollback(generation):
+    """Point functions back at an already published generation."""
+    if not get_backend().blob_exists(generation_path(generation, CATALOG_NAME)):
+        print(f"Generation {generation} does not exist.")
+        return 1
+    pointer = read_pointer()
+    write_pointer(generation, pointer.get("history", []))
+    print(f"Pointer now names generation {generation}.")
+    return 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Upload processed course data to Firestore and publish a catalog generation"
+    )
+    parser.add_argument(
+        "--rollback",
+        metavar="GENERATION",
+        help="Point the catalog back at an already published generation and exit",
+    )
+    parser.add_argument(
+        "--list-generations",
+        action="store_true",
+        help="Print the current generation and recent history and exit",
+    )
+    parser.add_argument(
+        "--keep-generations",
+        type=int,
+        default=GENERATION_HISTORY,
+        metavar="N",
+        help=f"After publishing, delete all but the N newest generations (default: {GENERATION_HISTORY}; 0 keeps all)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.list_generations:
+        pointer = read_pointer()
+        for generation in pointer.get("history", []):
+            marker = "*" if generation == pointer.get("generation") else " "
+            print(f"{marker} {generation}")
+        return 0
+
+    if args.rollback:
+        return rollback(args.rollback)
+
+    with open(json_courses_path, "rb") as f:
+        catalog_raw = f.read()
+    all_courses = json.loads(catalog_raw)["courses"]
+
+    pointer = read_pointer()
+    previous = pointer.get("generation")
+    generation = publish_generation(all_courses, catalog_raw, previous)
+
+    # Firestore documents are still written in place; the pointer flips only
+    # once every generation blob and document write has landed.
     save_to_firestore(all_courses)
-    upload_json_to_storage(json_courses_path, "all_courses_data.json")
+    if generation != previous:
+        pointer = write_pointer(generation, pointer.get("history", []))
+    if args.keep_generations > 0:
+        deleted = prune_generations(pointer, args.keep_generations)
+        if deleted:
+            print(f"Pruned {len(deleted)} old generations: {', '.join(deleted)}.")
+
+    stats = write_stats(all_courses, generation)
+    print(
+        f"Catalog stats written: {stats['total_courses']} courses, "
+        + ", ".join(f"{entry['count']} {key}" for key, entry in stats["facets"].items())
+        + "."
+    )
+
+    # Keep the unversioned blob for consumers that predate generations.
+    upload_bytes_to_storage(catalog_raw, LEGACY_CATALOG_PATH)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,13 @@ Checks that logos exist for universities and verifies file integrity.
 
 import json
 import argparse
+import itertools
 from pathlib import Path
 from PIL import Image
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from course_stream import iter_course_file
 
 # Configure logging
 logging.basicConfig(
@@ -16,11 +19,9 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def load_course_data(input_file: Path) -> List[Dict]:
-    """Load processed course data."""
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        return data.get('courses', [])
+def load_course_data(input_file: Path) -> Iterator[Dict]:
+    """Stream processed course data (from the JSONL output when present)."""
+    return iter_course_file(input_file)
 
 def load_aliases(aliases_file: Path) -> Dict[str, str]:
     """Load university aliases."""
@@ -89,7 +90,7 @@ def validate_logo_file(logo_path: Path) -> Tuple[bool, str]:
     except Exception as e:
         return False, f"Invalid image: {e}"
 
-def validate_universities(courses: List[Dict], aliases: Dict[str, str], logos_dir: Path) -> Dict:
+def validate_universities(courses: Iterable[Dict], aliases: Dict[str, str], logos_dir: Path) -> Dict:
     """Validate logo coverage for all universities."""
     # Extract unique universities
     universities = {}
@@ -230,8 +231,8 @@ def main():
     courses = load_course_data(args.courses)
     
     if args.sample:
-        courses = courses[:args.sample * 10]  # Rough sampling
-        logging.info(f"Using sample of {len(courses)} courses")
+        courses = itertools.islice(courses, args.sample * 10)  # Rough sampling
+        logging.info(f"Using sample of the first {args.sample * 10} courses")
     
     aliases = load_aliases(args.aliases)
     logging.info(f"Loaded {len(aliases)} aliases")
@@ -16,6 +16,7 @@ import {
   getOfficialUrl,
 } from "../../../components/CourseDetail/format";
 import { FaExternalLinkAlt, FaInfoCircle } from "react-icons/fa";
+import { getStaticCourse } from "@/lib/staticCatalog";
 
 type Course = Record<string, any>;
 
@@ -33,6 +34,13 @@ export default function CourseDetailPage() {
     let mounted = true;
     (async () => {
       try {
+        // Static bundle from the CDN first; Firestore for courses it lacks.
+        const bundled = await getStaticCourse(id);
+        if (!mounted) return;
+        if (bundled) {
+          setCourse(bundled as Course);
+          return;
+        }
         const snap = await getDoc(doc(db, "courses", id));
         if (!mounted) return;
         setCourse(snap.exists() ? ({ id: snap.id, ...snap.data() } as Course) : null);
@@ -19,6 +19,7 @@ import { db } from "@/../firebaseConfig";
 import CourseCard from "@/components/CourseCard/CourseCard";
 import LoadMore from "@/components/Common/LoadMore";
 import { trackViewItemList, buildListName } from "@/lib/analytics";
+import { getStaticListingPage, getStaticPageSize, type FacetKey } from "@/lib/staticCatalog";
 import type { SortKey } from "@/components/Courses/SearchFiltersBar";
 
 type Course = { id: string; nomeCorso: string; discipline: { id: string; name: string }; location: { id: string; name: string }; university: { id: string; name: string }; [k: string]: any };
@@ -46,6 +47,8 @@ export default function ResultsGrid({
   const [seenIds] = useState(() => new Set<string>());
 
   const lastDocRef = useRef<QueryDocumentSnapshot<DocumentData> | null>(null);
+  // Last static page shown, or null while paging through Firestore.
+  const staticPageRef = useRef<number | null>(null);
   const sentinelRef = useRef<HTMLDivElement | null>(null);
   const autoLoadsRef = useRef(0);
   const abortControllerRef = useRef<AbortController | null>(null);
@@ -64,6 +67,18 @@ export default function ResultsGrid({
     [filters],
   );
 
+  // Unfiltered and single-filter listings in name order are prebuilt by
+  // pipelines/build_static_bundles.py and served from the CDN. Keyed on the
+  // filter values, not the filters object, which callers rebuild on every
+  // render; a new identity would rerun the initial load.
+  const { discipline, location, university } = filters;
+  const staticListing = useMemo(() => {
+    const values: Record<FacetKey, string> = { discipline, location, university };
+    if (sort !== "name_asc" || Number(!!discipline) + Number(!!location) + Number(!!university) > 1) return null;
+    const facet = (["discipline", "location", "university"] as FacetKey[]).find((f) => values[f]);
+    return facet ? { facet, id: values[facet] } : { facet: null, id: "" };
+  }, [sort, discipline, location, university]);
+
   const resetState = useCallback(() => {
     setItems([]);
     setLoading(true);
@@ -73,6 +88,7 @@ export default function ResultsGrid({
     setCurrentPage(1);
     seenIds.clear();
     lastDocRef.current = null;
+    staticPageRef.current = null;
     autoLoadsRef.current = 0;
     // Abort any ongoing request
     if (abortControllerRef.current) {
@@ -88,7 +104,21 @@ export default function ResultsGrid({
 
     (async () => {
       try {
-        
+        if (staticListing && (await getStaticPageSize()) === pageSize) {
+          const page = await getStaticListingPage(staticListing.facet, staticListing.id, 1);
+          if (signal.aborted) return;
+          if (page) {
+            const next = page.courses as Course[];
+            next.forEach(course => seenIds.add(course.id));
+            staticPageRef.current = 1;
+            setItems(next);
+            setTotal(page.total);
+            setDone(page.page >= page.pages);
+            setLoading(false);
+            emitAnalyticsEvent(next, 1);
+            return;
+          }
+        }
 
         const constraints: QueryConstraint[] = [];
         if (filters.discipline) constraints.push(where("discipline.id", "==", filters.discipline));
@@ -156,12 +186,26 @@ export default function ResultsGrid({
         abortControllerRef.current.abort();
       }
     };
-  }, [filters.discipline, filters.location, filters.university, sort, pageSize, buildOrder, isSearchMode, resetState]);
+  }, [filters.discipline, filters.location, filters.university, sort, pageSize, buildOrder, isSearchMode, resetState, staticListing]);
 
   const loadMore = useCallback(async () => {
     if (loadingMore || done || isSearchMode) return;
     setLoadingMore(true);
     try {
+      if (staticListing && staticPageRef.current !== null) {
+        const page = await getStaticListingPage(staticListing.facet, staticListing.id, staticPageRef.current + 1);
+        // Keep the button available so a failed fetch can be retried.
+        if (!page) return;
+        const next = (page.courses as Course[]).filter(course => !seenIds.has(course.id));
+        next.forEach(course => seenIds.add(course.id));
+        setItems(prev => [...prev, ...next]);
+        staticPageRef.current = page.page;
+        setCurrentPage(page.page);
+        if (next.length > 0) emitAnalyticsEvent(next, page.page);
+        setDone(page.page >= page.pages);
+        return;
+      }
+
       const constraints: QueryConstraint[] = [];
       if (filters.discipline) constraints.push(where("discipline.id", "==", filters.discipline));
       if (filters.location) constraints.push(where("location.id", "==", filters.location));
@@ -198,7 +242,7 @@ export default function ResultsGrid({
     } finally {
       setLoadingMore(false);
     }
-  }, [filters, pageSize, loadingMore, done, buildOrder, isSearchMode, currentPage, seenIds]);
+  }, [filters, pageSize, loadingMore, done, buildOrder, isSearchMode, currentPage, seenIds, staticListing]);
 
   // Auto-load via IntersectionObserver (thresholded)
   useEffect(() => {
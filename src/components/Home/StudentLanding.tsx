@@ -9,6 +9,7 @@ import { db } from "@/../firebaseConfig";
 import { getTopDisciplines } from "@/components/getTopDisciplines";
 import { getTopLocations } from "@/components/getTopLocations";
 import { getTopUniversities } from "@/components/getTopUniversities";
+import { searchStatic } from "@/lib/staticSearch";
 
 type Opt = { value: string; label: string };
 
@@ -345,12 +346,18 @@ function SearchBar({ large = false }: { large?: boolean }) {
       }
       setLoading(true);
       try {
-        const res = await fetch(`/api/search?term=${encodeURIComponent(q)}`, {
-          signal: controller.signal,
-          cache: "no-store",
-        });
-        if (!res.ok) throw new Error("network");
-        const data = await res.json();
+        // Answer from the static shards on the CDN; the API is the fallback
+        // when they are not deployed or cannot be fetched.
+        let data: any = await searchStatic(q);
+        if (controller.signal.aborted) return;
+        if (data === null) {
+          const res = await fetch(`/api/search?term=${encodeURIComponent(q)}`, {
+            signal: controller.signal,
+            cache: "no-store",
+          });
+          if (!res.ok) throw new Error("network");
+          data = await res.json();
+        }
         setSuggestions(Array.isArray(data) ? data.slice(0, 8) : []);
         setOpen(true);
       } catch {
@@ -1,5 +1,6 @@
 import { db } from "../../firebaseConfig";
 import { collection, query, orderBy, limit, getDocs } from "firebase/firestore";
+import { getPrecomputedTopFacets } from "@/lib/catalogStats";
 
 interface DisciplineData {
   id: number;
@@ -11,6 +12,19 @@ interface DisciplineData {
 
 const getTopDisciplines = async (limitCount: number = 10): Promise<DisciplineData[]> => {
   try {
+    // Precomputed by the pipeline (static bundle or the stats document);
+    // the counter-ordered query is only the fallback.
+    const precomputed = await getPrecomputedTopFacets('disciplines', limitCount);
+    if (precomputed) {
+      return precomputed.map((item, index) => ({
+        id: index + 1,
+        docId: item.id,
+        title: item.name || 'Unknown Discipline',
+        path: `/corsi?discipline=${item.id}`,
+        newTab: false,
+      }));
+    }
+
     const disciplinesRef = collection(db, 'disciplines');
     const q = query(disciplinesRef, orderBy('coursesCounter', 'desc'), limit(limitCount));
     const snapshot = await getDocs(q);
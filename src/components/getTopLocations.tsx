@@ -1,5 +1,6 @@
 import { db } from "../../firebaseConfig";
 import { collection, query, orderBy, limit, getDocs } from "firebase/firestore";
+import { getPrecomputedTopFacets } from "@/lib/catalogStats";
 
 interface LocationData {
   id: number;
@@ -11,6 +12,19 @@ interface LocationData {
 
 const getTopLocations = async (limitCount: number = 10): Promise<LocationData[]> => {
   try {
+    // Precomputed by the pipeline (static bundle or the stats document);
+    // the counter-ordered query is only the fallback.
+    const precomputed = await getPrecomputedTopFacets('locations', limitCount);
+    if (precomputed) {
+      return precomputed.map((item, index) => ({
+        id: index + 1,
+        docId: item.id,
+        title: item.name || 'Unknown Location',
+        path: `/corsi?location=${item.id}`,
+        newTab: false,
+      }));
+    }
+
     const locationsRef = collection(db, 'locations');
     const q = query(locationsRef, orderBy('coursesCounter', 'desc'), limit(limitCount));
     const snapshot = await getDocs(q);
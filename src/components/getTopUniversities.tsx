@@ -2,6 +2,7 @@
 
 import { db } from "../../firebaseConfig";
 import { collection, query, orderBy, limit, getDocs } from "firebase/firestore";
+import { getPrecomputedTopFacets } from "@/lib/catalogStats";
 
 interface UniversityData {
   id: number;
@@ -13,6 +14,19 @@ interface UniversityData {
 
 const getTopUniversities = async (limitCount: number = 10): Promise<UniversityData[]> => {
   try {
+    // Precomputed by the pipeline (static bundle or the stats document);
+    // the counter-ordered query is only the fallback.
+    const precomputed = await getPrecomputedTopFacets('universities', limitCount);
+    if (precomputed) {
+      return precomputed.map((item, index) => ({
+        id: index + 1,
+        docId: item.id,
+        title: item.name || 'Unknown University',
+        path: `/corsi?university=${item.id}`,
+        newTab: false,
+      }));
+    }
+
     const universitiesRef = collection(db, 'universities');
     const q = query(universitiesRef, orderBy('coursesCounter', 'desc'), limit(limitCount));
     const snapshot = await getDocs(q);
@@ -0,0 +1,61 @@
+/**
+ * The precomputed catalog statistics: the stats/catalog Firestore document
+ * written by functions/catalog_stats.py (pipeline upload and the scheduled
+ * refresh_catalog_stats function). One read per page load replaces the
+ * counter-ordered query each "top" menu used to run.
+ */
+
+import { doc, getDoc } from "firebase/firestore";
+import { db } from "@/../firebaseConfig";
+import { getStaticTopFacets, type TopFacet } from "@/lib/staticCatalog";
+
+export type TopFacetKey = "universities" | "locations" | "disciplines";
+
+export type CatalogStats = {
+  version: number;
+  generation: string | null;
+  computed_at: string;
+  top_n: number;
+  total_courses: number;
+  facets: Record<string, { count: number; top: TopFacet[] }>;
+};
+
+const SUPPORTED_VERSION = 1;
+
+let statsPromise: Promise<CatalogStats | null> | null = null;
+
+/** The stats document, or null when it is missing or unreadable. */
+export function getCatalogStats(): Promise<CatalogStats | null> {
+  if (!statsPromise) {
+    statsPromise = getDoc(doc(db, "stats", "catalog"))
+      .then((snap) => {
+        const stats = snap.exists() ? (snap.data() as CatalogStats) : null;
+        return stats && stats.version === SUPPORTED_VERSION ? stats : null;
+      })
+      .catch(() => null)
+      .then((stats) => {
+        // Try again on the next call rather than caching the failure.
+        if (!stats) statsPromise = null;
+        return stats;
+      });
+  }
+  return statsPromise;
+}
+
+/**
+ * The limitCount facets with the most courses, from the static bundles or
+ * else the stats document. Null when neither has them, so callers can fall
+ * back to querying the facet collection.
+ */
+export async function getPrecomputedTopFacets(key: TopFacetKey, limitCount: number): Promise<TopFacet[] | null> {
+  const bundled = await getStaticTopFacets();
+  if (bundled && limitCount <= bundled.limit) return bundled[key].slice(0, limitCount);
+
+  const stats = await getCatalogStats();
+  const facet = stats?.facets[key];
+  // A facet with fewer values than top_n is complete whatever the limit.
+  if (stats && facet && (limitCount <= stats.top_n || facet.count <= stats.top_n)) {
+    return facet.top.slice(0, limitCount);
+  }
+  return null;
+}
@@ -0,0 +1,110 @@
+/**
+ * Read the static bundles built by pipelines/build_static_bundles.py and
+ * served from /catalog. Every function resolves to null when the bundles are
+ * not deployed or cannot be fetched, so callers fall back to Firestore.
+ */
+
+export type FacetKey = "discipline" | "location" | "university";
+
+type ListingIndexEntry = { name?: string; total: number; pages: string[] };
+
+type Manifest = {
+  version: number;
+  courses: number;
+  page_size: number;
+  course_index: Record<string, string>;
+  listings: { all: ListingIndexEntry } & Record<FacetKey, string>;
+  top_facets: string;
+};
+
+export type ListingPage = {
+  page: number;
+  pages: number;
+  total: number;
+  courses: Array<Record<string, any>>;
+};
+
+export type TopFacet = { id: string; name: string; coursesCounter: number };
+
+export type TopFacets = {
+  limit: number;
+  universities: TopFacet[];
+  locations: TopFacet[];
+  disciplines: TopFacet[];
+};
+
+const BASE = "/catalog";
+const SUPPORTED_VERSION = 1;
+
+let manifestPromise: Promise<Manifest | null> | null = null;
+const files = new Map<string, Promise<any>>();
+
+function loadManifest(): Promise<Manifest | null> {
+  if (!manifestPromise) {
+    manifestPromise = fetch(`${BASE}/manifest.json`, { cache: "no-cache" })
+      .then((res) => (res.ok ? res.json() : null))
+      .then((manifest) => (manifest && manifest.version === SUPPORTED_VERSION ? manifest : null))
+      .catch(() => null);
+  }
+  return manifestPromise;
+}
+
+/** Fetch a content-hashed file once per page load. */
+function loadFile<T>(file: string): Promise<T | null> {
+  let promise = files.get(file);
+  if (!promise) {
+    promise = fetch(`${BASE}/${file}`)
+      .then((res) => (res.ok ? res.json() : null))
+      .catch(() => null)
+      .then((data) => {
+        if (data === null) files.delete(file);
+        return data;
+      });
+    files.set(file, promise);
+  }
+  return promise;
+}
+
+/** The course document, or null if it is not in the static catalog. */
+export async function getStaticCourse(id: string): Promise<Record<string, any> | null> {
+  const manifest = await loadManifest();
+  const bucket = manifest?.course_index[String(id).slice(-2)];
+  if (!bucket) return null;
+  const index = await loadFile<Record<string, string>>(bucket);
+  const file = index?.[String(id)];
+  return file ? loadFile(file) : null;
+}
+
+async function listingEntry(facet: FacetKey | null, id: string): Promise<ListingIndexEntry | null> {
+  const manifest = await loadManifest();
+  if (!manifest) return null;
+  if (!facet) return manifest.listings.all;
+  const index = await loadFile<Record<string, ListingIndexEntry>>(manifest.listings[facet]);
+  // A facet id missing from the index has no courses; report an empty listing.
+  return index ? index[id] ?? { total: 0, pages: [] } : null;
+}
+
+/** Page size the static listings were built with, or null without bundles. */
+export async function getStaticPageSize(): Promise<number | null> {
+  return (await loadManifest())?.page_size ?? null;
+}
+
+/**
+ * One page (1-based) of the courses sorted by name, optionally restricted to
+ * a single facet value.
+ */
+export async function getStaticListingPage(
+  facet: FacetKey | null,
+  id: string,
+  page: number,
+): Promise<ListingPage | null> {
+  const entry = await listingEntry(facet, id);
+  if (!entry) return null;
+  if (page > entry.pages.length) return { page, pages: entry.pages.length, total: entry.total, courses: [] };
+  return loadFile<ListingPage>(entry.pages[page - 1]);
+}
+
+export async function getStaticTopFacets(): Promise<TopFacets | null> {
+  const manifest = await loadManifest();
+  return manifest ? loadFile<TopFacets>(manifest.top_facets) : null;
+}
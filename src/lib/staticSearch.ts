@@ -0,0 +1,143 @@
+/**
+ * Client-side autocomplete over the static shards built by
+ * pipelines/build_search_shards.py and served from /search.
+ *
+ * A query costs one fetch of the manifest per page load and one small,
+ * immutable shard per two-letter prefix; the CDN serves both.
+ */
+
+export type Suggestion = {
+  type: "location" | "university" | "course";
+  id: string;
+  title: string;
+  university?: string;
+  location?: string;
+};
+
+type Manifest = {
+  version: number;
+  prefix_length: number;
+  stopwords: string[];
+  shards: Record<string, { file: string; entries: number; bytes: number }>;
+};
+
+type Shard = {
+  v: number;
+  prefix: string;
+  labels: string[];
+  entries: Array<[Suggestion["type"], string, string, number?, number?]>;
+  terms: string[];
+  postings: number[][];
+};
+
+const BASE = "/search";
+const SUPPORTED_VERSION = 1;
+
+let manifestPromise: Promise<Manifest | null> | null = null;
+const shardPromises = new Map<string, Promise<Shard | null>>();
+
+/** Mirror of normalize() in pipelines/build_search_shards.py. */
+export function normalize(text: string): string {
+  return (text || "")
+    .normalize("NFD")
+    .replace(/[\u0300-\u036f]/g, "")
+    .toLowerCase()
+    .replace(/[^a-z0-9]+/g, " ")
+    .trim();
+}
+
+function loadManifest(): Promise<Manifest | null> {
+  if (!manifestPromise) {
+    manifestPromise = fetch(`${BASE}/manifest.json`, { cache: "no-cache" })
+      .then((res) => (res.ok ? res.json() : null))
+      .then((manifest) => (manifest && manifest.version === SUPPORTED_VERSION ? manifest : null))
+      .catch(() => null);
+  }
+  return manifestPromise;
+}
+
+function loadShard(file: string): Promise<Shard | null> {
+  let promise = shardPromises.get(file);
+  if (!promise) {
+    promise = fetch(`${BASE}/${file}`)
+      .then((res) => (res.ok ? res.json() : null))
+      .catch(() => null)
+      .then((shard) => {
+        // Let a failed shard be fetched again on the next keystroke.
+        if (!shard) shardPromises.delete(file);
+        return shard;
+      });
+    shardPromises.set(file, promise);
+  }
+  return promise;
+}
+
+function lowerBound(sorted: string[], value: string): number {
+  let lo = 0;
+  let hi = sorted.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (sorted[mid] < value) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+function toSuggestion(shard: Shard, entry: Shard["entries"][number]): Suggestion {
+  const [type, id, title, university, location] = entry;
+  if (type !== "course") return { type, id, title };
+  return {
+    type,
+    id,
+    title,
+    university: university !== undefined && university >= 0 ? shard.labels[university] : undefined,
+    location: location !== undefined && location >= 0 ? shard.labels[location] : undefined,
+  };
+}
+
+/**
+ * Suggestions for a partially typed query, in the same shape /api/search
+ * returns. Resolves to null when the static index is unavailable, so the
+ * caller can fall back to the API.
+ */
+export async function searchStatic(term: string, limit = 8): Promise<Suggestion[] | null> {
+  const manifest = await loadManifest();
+  if (!manifest) return null;
+
+  // Stopwords are not indexed, but the last word may still be the start of
+  // a longer one ("di" -> "diritto"), so it is always kept.
+  const stopwords = new Set(manifest.stopwords);
+  const words = normalize(term).split(" ").filter(Boolean);
+  const tokens = words.filter((token, i) => i === words.length - 1 || !stopwords.has(token));
+  const first = tokens.find((token) => token.length >= manifest.prefix_length);
+  if (!first) return [];
+
+  const info = manifest.shards[first.slice(0, manifest.prefix_length)];
+  if (!info) return [];
+  const shard = await loadShard(info.file);
+  if (!shard) return null;
+
+  // Every word in the shard that starts with the first query word.
+  const matched = new Set<number>();
+  for (let i = lowerBound(shard.terms, first); i < shard.terms.length && shard.terms[i].startsWith(first); i++) {
+    let position = 0;
+    for (const gap of shard.postings[i]) {
+      position += gap;
+      matched.add(position);
+    }
+  }
+
+  // Remaining query words must each prefix some word of the title.
+  const others = tokens.filter((token) => token !== first);
+  const results: Suggestion[] = [];
+  for (const index of Array.from(matched).sort((a, b) => a - b)) {
+    const entry = shard.entries[index];
+    if (others.length) {
+      const words = normalize(entry[2]).split(" ");
+      if (!others.every((token) => words.some((word) => word.startsWith(token)))) continue;
+    }
+    results.push(toSuggestion(shard, entry));
+    if (results.length >= limit) break;
+  }
+  return results;
+}